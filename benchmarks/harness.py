@@ -0,0 +1,238 @@
+import argparse
+import glob
+import json
+import os
+import platform
+import sys
+import time
+from typing import Callable, Dict, List, Optional
+
+from src.engines import ENGINES
+from src.frontend import leading_pragmas
+from src.generated_parser import parse_spans
+from src.optimizer import Optimizer
+from src.output import StreamOutput
+from src.spans import lex_spans, span_lexer
+
+PROGRAMS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "programs")
+
+PHASES = ("lex", "parse", "optimize", "evaluate")
+
+DEFAULT_REPEAT = 5
+DEFAULT_THRESHOLD = 0.25
+# slowdowns smaller than this are timer noise, whatever the ratio
+DEFAULT_MIN_SECONDS = 0.002
+
+Results = Dict[str, Dict[str, float]]
+
+
+# one long chain of additions and subtractions, for the parser and the
+# operator loops. It depends on the loop variable, so it is neither folded
+# nor hoisted
+def long_expression(terms: int = 3000) -> bytes:
+    operands = ["i" if i % 2 else str(i % 97) for i in range(terms)]
+    expression = operands[0]
+    for i, operand in enumerate(operands[1:]):
+        expression += f" {'-' if i % 3 == 0 else '+'} {operand}"
+    return (
+        "let x = 0;\n"
+        "for (let i = 0; i < 20; i = i + 1) {\n"
+        f"    x = x + {expression};\n"
+        "}\n"
+        "print(x);\n"
+    ).encode()
+
+
+# a long script of top-level statements, for the lexer and parser
+def large_script(blocks: int = 1500) -> bytes:
+    lines = ["let total = 0;"]
+    for i in range(blocks):
+        lines.append(f"func f{i}(a, b) {{ return a * {i % 7 + 1} + b; }}")
+        lines.append(f"let v{i} = f{i}({i}, total);")
+        lines.append(
+            f"if (v{i} > {i * 10}) {{ total = total + 1; }} else {{ total = total - 1; }}"
+        )
+    lines.append("print(total);")
+    return ("\n".join(lines) + "\n").encode()
+
+
+GENERATED: Dict[str, Callable[[], bytes]] = {
+    "long_expression": long_expression,
+    "large_script": large_script,
+}
+
+
+# every benchmark's source by name, the programs in benchmarks/programs and
+# the generated ones
+def benchmark_sources() -> Dict[str, bytes]:
+    sources = {}
+    for path in sorted(glob.glob(os.path.join(PROGRAMS_DIR, "*.lr"))):
+        with open(path, "rb") as program:
+            sources[os.path.basename(path)[: -len(".lr")]] = program.read()
+    for name, generate in GENERATED.items():
+        sources[name] = generate()
+    return sources
+
+
+# discards program output after it has been formatted
+class _NullStream:
+    def write(self, data: bytes) -> None:
+        pass
+
+    def flush(self) -> None:
+        pass
+
+
+# the fastest time of every phase over repeat runs, the least disturbed by
+# whatever else the machine is doing
+def time_phases(
+    source: bytes, engine: str = "tree", repeat: int = DEFAULT_REPEAT
+) -> Dict[str, float]:
+    span_lexer()
+    best = {phase: float("inf") for phase in PHASES}
+    _, position = leading_pragmas(source)
+    for _ in range(repeat):
+        start = time.perf_counter()
+        spans = lex_spans(source, position)
+        lexed = time.perf_counter()
+        ast = parse_spans(spans)
+        parsed = time.perf_counter()
+        Optimizer().optimize(ast)
+        optimized = time.perf_counter()
+        ENGINES[engine](ast, output=StreamOutput(_NullStream())).evaluate()
+        evaluated = time.perf_counter()
+
+        times = {
+            "lex": lexed - start,
+            "parse": parsed - lexed,
+            "optimize": optimized - parsed,
+            "evaluate": evaluated - optimized,
+        }
+        for phase, seconds in times.items():
+            best[phase] = min(best[phase], seconds)
+    return best
+
+
+def run_benchmarks(
+    names: Optional[List[str]] = None,
+    engine: str = "tree",
+    repeat: int = DEFAULT_REPEAT,
+) -> Results:
+    sources = benchmark_sources()
+    for name in names or []:
+        if name not in sources:
+            raise Exception(f"Unknown benchmark: {name}")
+    return {
+        name: time_phases(source, engine, repeat)
+        for name, source in sources.items()
+        if not names or name in names
+    }
+
+
+# the phases slower than in the baseline by more than threshold, as a
+# fraction of the baseline time, and by more than min_seconds
+def find_regressions(
+    baseline: Results,
+    results: Results,
+    threshold: float = DEFAULT_THRESHOLD,
+    min_seconds: float = DEFAULT_MIN_SECONDS,
+) -> List[str]:
+    regressions = []
+    for name, phases in results.items():
+        for phase, seconds in phases.items():
+            before = baseline.get(name, {}).get(phase)
+            if before is None:
+                continue
+            if seconds > before * (1 + threshold) and seconds - before > min_seconds:
+                regressions.append(f"{name} {phase}: {before:.6f}s -> {seconds:.6f}s")
+    return regressions
+
+
+def format_results(results: Results, baseline: Optional[Results] = None) -> str:
+    lines = [f"{'benchmark':<18}" + "".join(f"{phase:>14}" for phase in PHASES)]
+    for name, phases in results.items():
+        line = f"{name:<18}"
+        for phase in PHASES:
+            line += f"{phases[phase]:>13.6f}s"
+        lines.append(line)
+        if baseline is not None and name in baseline:
+            change = f"{'':<18}"
+            for phase in PHASES:
+                before = baseline[name].get(phase)
+                if before:
+                    change += f"{(phases[phase] / before - 1) * 100:>+13.0f}%"
+                else:
+                    change += f"{'-':>14}"
+            lines.append(change)
+    return "\n".join(lines)
+
+
+def main(argv: List[str]) -> int:
+    arg_parser = argparse.ArgumentParser(prog="python -m benchmarks.harness")
+    arg_parser.add_argument(
+        "names", nargs="*", metavar="NAME", help="benchmarks to run, all by default"
+    )
+    arg_parser.add_argument("--engine", choices=list(ENGINES), default="tree")
+    arg_parser.add_argument("--repeat", type=int, default=DEFAULT_REPEAT, metavar="N")
+    arg_parser.add_argument(
+        "--save", metavar="PATH", help="save the results as a baseline"
+    )
+    arg_parser.add_argument(
+        "--baseline",
+        metavar="PATH",
+        help="compare with a saved baseline, failing on regressions",
+    )
+    arg_parser.add_argument(
+        "--threshold",
+        type=float,
+        default=DEFAULT_THRESHOLD,
+        metavar="FRACTION",
+        help="slowdown allowed before a phase counts as a regression",
+    )
+    arg_parser.add_argument(
+        "--min-seconds",
+        type=float,
+        default=DEFAULT_MIN_SECONDS,
+        metavar="SECONDS",
+        help="slowdowns below this are ignored as noise",
+    )
+    args = arg_parser.parse_args(argv)
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as baseline_file:
+            saved = json.load(baseline_file)
+        if saved["engine"] != args.engine:
+            arg_parser.error(f"the baseline is for the {saved['engine']} engine")
+        baseline = saved["results"]
+
+    results = run_benchmarks(args.names, args.engine, args.repeat)
+    print(format_results(results, baseline))
+
+    if args.save:
+        with open(args.save, "w") as baseline_file:
+            json.dump(
+                {
+                    "engine": args.engine,
+                    "repeat": args.repeat,
+                    "python": platform.python_version(),
+                    "results": results,
+                },
+                baseline_file,
+                indent=2,
+            )
+            baseline_file.write("\n")
+
+    if baseline is not None:
+        regressions = find_regressions(
+            baseline, results, args.threshold, args.min_seconds
+        )
+        for regression in regressions:
+            print(f"regression: {regression}", file=sys.stderr)
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
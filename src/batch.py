@@ -0,0 +1,186 @@
+import argparse
+import glob
+import io
+import json
+import multiprocessing
+import os
+import signal
+import sys
+import time
+from typing import Any, Dict, Iterator, List, Optional, TextIO, Tuple
+
+from src.engines import ENGINES
+from src.frontend import lara_files, parse_file
+from src.output import StreamOutput
+from src.server import run_program, warm_up
+
+DEFAULT_SLOWEST = 5
+
+Task = Tuple[str, str, bool, bool]
+
+
+# the .lr files named by paths, each a file, a directory searched
+# recursively or a glob pattern, in order and without repeats
+def batch_files(paths: List[str]) -> List[str]:
+    files: Dict[str, None] = {}
+    for path in paths:
+        if os.path.exists(path):
+            matches = [path]
+        else:
+            matches = sorted(glob.glob(path, recursive=True))
+            if not matches:
+                raise Exception(f"No scripts match {path}")
+        for match in lara_files(matches):
+            files.setdefault(match)
+    return list(files)
+
+
+# the limit on each script's run time in this process
+_timeout: Optional[float] = None
+
+
+def _timed_out(signum: int, frame: Any) -> None:
+    raise Exception(f"Timed out after {_timeout:g}s")
+
+
+def _start_worker(timeout: Optional[float]) -> None:
+    global _timeout
+    _timeout = timeout
+    signal.signal(signal.SIGALRM, _timed_out)
+
+
+# runs one script, returns its result record
+def _run_script(task: Task) -> Dict[str, Any]:
+    path, engine, optimize, memoize = task
+    stdout = io.BytesIO()
+    status = 0
+    error = ""
+    start = time.perf_counter()
+    try:
+        if _timeout is not None:
+            signal.setitimer(signal.ITIMER_REAL, _timeout)
+        try:
+            run_program(
+                parse_file(path), engine, StreamOutput(stdout), optimize, memoize
+            )
+        finally:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+    except Exception as exception:
+        status = 1
+        error = str(exception)
+    return {
+        "path": path,
+        "status": status,
+        "seconds": round(time.perf_counter() - start, 6),
+        "output": stdout.getvalue().decode(),
+        "error": error,
+    }
+
+
+# Runs many scripts after warming up once. Workers are forked from the warm
+# process, so they share its loaded modules and tables copy-on-write, and
+# take scripts in chunks to keep the pool's overhead down. Results come back
+# in the order of paths
+def run_batch(
+    paths: List[str],
+    engine: str = "tree",
+    jobs: Optional[int] = None,
+    timeout: Optional[float] = None,
+    optimize: bool = True,
+    memoize: bool = False,
+) -> Iterator[Dict[str, Any]]:
+    if engine not in ENGINES:
+        raise Exception(f"Unknown engine: {engine}")
+    jobs = jobs or os.cpu_count() or 1
+    tasks = [(path, engine, optimize, memoize) for path in paths]
+
+    warm_up()
+    if jobs == 1 or len(tasks) < 2:
+        _start_worker(timeout or None)
+        yield from map(_run_script, tasks)
+        return
+
+    chunk_size = max(1, len(tasks) // (jobs * 8))
+    context = multiprocessing.get_context("fork")
+    with context.Pool(jobs, _start_worker, (timeout or None,)) as pool:
+        yield from pool.imap(_run_script, tasks, chunk_size)
+
+
+def format_summary(
+    results: List[Dict[str, Any]], seconds: float, slowest: int = DEFAULT_SLOWEST
+) -> str:
+    failed = sum(1 for result in results if result["status"] != 0)
+    rate = len(results) / seconds if seconds > 0 else 0.0
+    lines = [
+        f"ran {len(results)} script(s) in {seconds:.2f}s, {rate:.1f} scripts/s, "
+        f"{failed} failed"
+    ]
+    if results and slowest > 0:
+        lines.append("slowest:")
+        ranked = sorted(results, key=lambda result: result["seconds"], reverse=True)
+        for result in ranked[:slowest]:
+            lines.append(f"  {result['seconds']:8.3f}s  {result['path']}")
+    return "\n".join(lines)
+
+
+def _write_results(
+    results: Iterator[Dict[str, Any]], destination: TextIO
+) -> List[Dict[str, Any]]:
+    written = []
+    for result in results:
+        destination.write(json.dumps(result) + "\n")
+        written.append(result)
+    return written
+
+
+def main(argv: List[str]) -> int:
+    arg_parser = argparse.ArgumentParser(prog="lara run-batch")
+    arg_parser.add_argument(
+        "paths", nargs="+", metavar="PATH", help=".lr files, directories or globs"
+    )
+    arg_parser.add_argument("--engine", choices=list(ENGINES), default="tree")
+    arg_parser.add_argument(
+        "--jobs", type=int, metavar="N", help="worker processes, one per CPU by default"
+    )
+    arg_parser.add_argument(
+        "--timeout",
+        type=float,
+        metavar="SECONDS",
+        help="longest a script may run, no limit by default",
+    )
+    arg_parser.add_argument(
+        "--results",
+        default="-",
+        metavar="PATH",
+        help="JSON lines file of every script's result, standard output by default",
+    )
+    arg_parser.add_argument(
+        "--slowest",
+        type=int,
+        default=DEFAULT_SLOWEST,
+        metavar="N",
+        help="slowest scripts listed in the summary",
+    )
+    arg_parser.add_argument("--no-optimize", action="store_true")
+    arg_parser.add_argument("--memoize", action="store_true")
+    args = arg_parser.parse_args(argv)
+
+    paths = batch_files(args.paths)
+    start = time.perf_counter()
+    results = run_batch(
+        paths,
+        args.engine,
+        args.jobs,
+        args.timeout,
+        not args.no_optimize,
+        args.memoize,
+    )
+    if args.results == "-":
+        written = _write_results(results, sys.stdout)
+    else:
+        with open(args.results, "w") as destination:
+            written = _write_results(results, destination)
+    seconds = time.perf_counter() - start
+
+    print(format_summary(written, seconds, args.slowest), file=sys.stderr)
+    return 1 if any(result["status"] != 0 for result in written) else 0
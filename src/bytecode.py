@@ -0,0 +1,324 @@
+from __future__ import annotations
+from array import array
+from typing import Dict, List, Optional, Union
+
+from src.nodes import (
+    Assign,
+    BinOp,
+    Break,
+    Call,
+    CheckedLoad,
+    Expression,
+    For,
+    FunctionDef,
+    If,
+    Integer,
+    Let,
+    Load,
+    Print,
+    Program,
+    Return,
+    Statement,
+    While,
+)
+
+# OPCODES
+
+CONST = 0  # index -> push constants[index]
+LOAD_LOCAL = 1  # slot
+STORE_LOCAL = 2  # slot
+LOAD = 3  # depth, slot
+STORE = 4  # depth, slot
+ADD = 5
+SUBTRACT = 6
+MULTIPLY = 7
+DIVIDE = 8
+LESS = 9
+GREATER = 10
+LESS_EQUAL = 11
+GREATER_EQUAL = 12
+JUMP = 13  # target
+JUMP_IF_FALSE = 14  # target, pops the condition
+POP = 15
+MAKE_FUNCTION = 16  # index -> closure over constants[index] and the current frame
+CALL = 17  # argc, callee is below the arguments
+RETURN = 18  # returns the top of the stack
+RETURN_NONE = 19
+PRINT = 20
+HALT = 21
+TAIL_CALL = 22  # argc, like CALL but replaces the current frame
+LOAD_CHECKED = 23  # depth, slot, index -> LOAD, raising on constants[index] if unset
+
+OPCODE_NAMES = [
+    "CONST",
+    "LOAD_LOCAL",
+    "STORE_LOCAL",
+    "LOAD",
+    "STORE",
+    "ADD",
+    "SUBTRACT",
+    "MULTIPLY",
+    "DIVIDE",
+    "LESS",
+    "GREATER",
+    "LESS_EQUAL",
+    "GREATER_EQUAL",
+    "JUMP",
+    "JUMP_IF_FALSE",
+    "POP",
+    "MAKE_FUNCTION",
+    "CALL",
+    "RETURN",
+    "RETURN_NONE",
+    "PRINT",
+    "HALT",
+    "TAIL_CALL",
+    "LOAD_CHECKED",
+]
+
+OPERAND_COUNTS = [
+    1,
+    1,
+    1,
+    2,
+    2,
+    0,
+    0,
+    0,
+    0,
+    0,
+    0,
+    0,
+    0,
+    1,
+    1,
+    0,
+    1,
+    1,
+    0,
+    0,
+    0,
+    0,
+    1,
+    3,
+]
+
+BINARY_OPCODES = {
+    "PLUS": ADD,
+    "MINUS": SUBTRACT,
+    "MULTIPLY": MULTIPLY,
+    "DIVIDE": DIVIDE,
+    "LESS": LESS,
+    "GREATER": GREATER,
+    "LESS_EQUAL": LESS_EQUAL,
+    "GREATER_EQUAL": GREATER_EQUAL,
+}
+
+
+class CodeObject:
+    def __init__(self, name: str, num_params: int, frame_size: int):
+        self.name = name
+        self.num_params = num_params
+        self.frame_size = frame_size
+        # set for functions the purity analysis proved safe to memoize
+        self.pure = False
+        self.code = array("i")
+        # integer literals, the code objects of nested functions and the
+        # names of checked loads
+        self.constants: List[Union[int, str, CodeObject]] = []
+        self._constant_indices: Dict[int, int] = {}
+
+    def emit(self, opcode: int, *operands: int) -> int:
+        position = len(self.code)
+        self.code.append(opcode)
+        self.code.extend(operands)
+        return position
+
+    # points the jump emitted at position to target (defaults to the next instruction)
+    def patch(self, position: int, target: int = -1) -> None:
+        self.code[position + 1] = len(self.code) if target == -1 else target
+
+    def add_constant(self, value: Union[int, str, CodeObject]) -> int:
+        if isinstance(value, int):
+            if value not in self._constant_indices:
+                self._constant_indices[value] = len(self.constants)
+                self.constants.append(value)
+            return self._constant_indices[value]
+
+        self.constants.append(value)
+        return len(self.constants) - 1
+
+
+class BytecodeCompiler:
+    def __init__(self) -> None:
+        self.code = CodeObject("<main>", 0, 0)
+        # positions of the break jumps of each enclosing loop, patched on exit
+        self.loops: List[List[int]] = []
+
+    def _compile_load(self, depth: int, slot: int) -> None:
+        if depth == 0:
+            self.code.emit(LOAD_LOCAL, slot)
+        else:
+            self.code.emit(LOAD, depth, slot)
+
+    def _compile_store(self, depth: int, slot: int) -> None:
+        if depth == 0:
+            self.code.emit(STORE_LOCAL, slot)
+        else:
+            self.code.emit(STORE, depth, slot)
+
+    def _compile_checked_load(self, depth: int, slot: int, name: str) -> None:
+        self.code.emit(LOAD_CHECKED, depth, slot, self.code.add_constant(name))
+
+    def _compile_call(self, ast: Call, opcode: int = CALL) -> None:
+        if ast.checked:
+            self._compile_checked_load(ast.depth, ast.slot, ast.name)
+        else:
+            self._compile_load(ast.depth, ast.slot)
+        for arg in ast.args:
+            self._compile_expression(arg)
+        self.code.emit(opcode, len(ast.args))
+
+    # operands are pushed left to right, then the operators applied from the
+    # right since they are right associative
+    def _compile_expression(self, ast: Expression) -> None:
+        if isinstance(ast, Integer):
+            self.code.emit(CONST, self.code.add_constant(ast.value))
+        elif isinstance(ast, CheckedLoad):
+            self._compile_checked_load(ast.depth, ast.slot, ast.name)
+        elif isinstance(ast, Load):
+            self._compile_load(ast.depth, ast.slot)
+        elif isinstance(ast, Call):
+            self._compile_call(ast)
+        elif isinstance(ast, BinOp):
+            for operand in ast.operands:
+                self._compile_expression(operand)
+            for operator in reversed(ast.operators):
+                self.code.emit(BINARY_OPCODES[operator])
+        else:
+            raise Exception(f"Invalid expression: {type(ast).__name__}")
+
+    def _compile_if_block(self, ast: If) -> None:
+        end_jumps: List[int] = []
+        for condition, body in ast.branches:
+            self._compile_expression(condition)
+            skip = self.code.emit(JUMP_IF_FALSE, 0)
+            self._compile_statements(body)
+            end_jumps.append(self.code.emit(JUMP, 0))
+            self.code.patch(skip)
+        if ast.otherwise is not None:
+            self._compile_statements(ast.otherwise)
+
+        for jump in end_jumps:
+            self.code.patch(jump)
+
+    def _compile_loop(
+        self,
+        condition: Expression,
+        body: List[Statement],
+        step: Optional[Statement] = None,
+    ) -> None:
+        start = len(self.code.code)
+        self._compile_expression(condition)
+        exit_jump = self.code.emit(JUMP_IF_FALSE, 0)
+
+        self.loops.append([exit_jump])
+        self._compile_statements(body)
+        if step is not None:
+            self._compile_statement(step)
+        self.code.emit(JUMP, start)
+
+        for jump in self.loops.pop():
+            self.code.patch(jump)
+
+    def _compile_function_definition(self, ast: FunctionDef) -> None:
+        enclosing_code, enclosing_loops = self.code, self.loops
+        self.code = CodeObject(
+            ast.name or "<function>", len(ast.params), ast.frame_size
+        )
+        self.loops = []
+        self._compile_statements(ast.body)
+        self.code.emit(RETURN_NONE)
+        function_code = self.code
+        function_code.pure = ast.pure
+        self.code, self.loops = enclosing_code, enclosing_loops
+
+        self.code.emit(MAKE_FUNCTION, self.code.add_constant(function_code))
+        self.code.emit(STORE_LOCAL, ast.slot)
+
+    def _compile_statement(self, ast: Statement) -> None:
+        if isinstance(ast, Print):
+            self._compile_expression(ast.value)
+            self.code.emit(PRINT)
+        elif isinstance(ast, Let):
+            self._compile_expression(ast.value)
+            self.code.emit(STORE_LOCAL, ast.slot)
+        elif isinstance(ast, FunctionDef):
+            self._compile_function_definition(ast)
+        elif isinstance(ast, Return):
+            # If there is a return value provided
+            if ast.value is None:
+                self.code.emit(RETURN_NONE)
+            elif isinstance(ast.value, Call):
+                # `return f(...)` returns straight to the caller's caller. A
+                # memoized callee is called normally and returns here
+                self._compile_call(ast.value, TAIL_CALL)
+                self.code.emit(RETURN)
+            else:
+                self._compile_expression(ast.value)
+                self.code.emit(RETURN)
+        elif isinstance(ast, Assign):
+            self._compile_expression(ast.value)
+            self._compile_store(ast.depth, ast.slot)
+        elif isinstance(ast, If):
+            self._compile_if_block(ast)
+        elif isinstance(ast, For):
+            self._compile_statement(ast.init)
+            self._compile_loop(ast.condition, ast.body, ast.update)
+        elif isinstance(ast, Call):
+            self._compile_call(ast)
+            self.code.emit(POP)
+        elif isinstance(ast, Break):
+            self.loops[-1].append(self.code.emit(JUMP, 0))
+        elif isinstance(ast, While):
+            self._compile_loop(ast.condition, ast.body)
+        else:
+            raise Exception(f"Invalid Statement: {type(ast).__name__}")
+
+    def _compile_statements(self, ast: List[Statement]) -> None:
+        for statement in ast:
+            self._compile_statement(statement)
+
+    def compile(self, program: Program) -> CodeObject:
+        self.code.frame_size = program.frame_size
+        self._compile_statements(program.body)
+        self.code.emit(HALT)
+        return self.code
+
+
+def disassemble(code: CodeObject) -> str:
+    lines = [f"{code.name} (params={code.num_params}, frame={code.frame_size}):"]
+    functions: List[CodeObject] = []
+
+    pc = 0
+    while pc < len(code.code):
+        opcode = code.code[pc]
+        operands = list(code.code[pc + 1 : pc + 1 + OPERAND_COUNTS[opcode]])
+        line = f"{pc:>6} {OPCODE_NAMES[opcode]:<14}" + " ".join(map(str, operands))
+
+        if opcode in (CONST, MAKE_FUNCTION, LOAD_CHECKED):
+            constant = code.constants[operands[-1]]
+            if isinstance(constant, CodeObject):
+                functions.append(constant)
+                line += f" (<function {constant.name}>)"
+            else:
+                line += f" ({constant})"
+
+        lines.append(line.rstrip())
+        pc += 1 + OPERAND_COUNTS[opcode]
+
+    for function in functions:
+        lines.append("")
+        lines.append(disassemble(function))
+
+    return "\n".join(lines)
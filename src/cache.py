@@ -0,0 +1,120 @@
+import functools
+import hashlib
+import os
+import pickle
+import sys
+import time
+from typing import Callable, Dict, Iterator, Tuple, TypeVar
+
+import langtools
+
+T = TypeVar("T")
+
+# bump whenever the layout of cached objects changes
+CACHE_VERSION = 1
+
+CONFIG_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "config")
+
+# grammar and token definitions, the cache is rebuilt when any of them change
+DEFINITION_FILES = [
+    os.path.join(CONFIG_DIR, "lexer.py"),
+    os.path.join(CONFIG_DIR, "parser.py"),
+    os.path.join(CONFIG_DIR, "tokens.py"),
+]
+
+
+# the seconds each entry took to get this run and whether it was built,
+# by name
+LOADS: Dict[str, Tuple[float, bool]] = {}
+
+
+def cache_dir() -> str:
+    default = os.path.join(os.path.expanduser("~"), ".cache", "lara")
+    return os.environ.get("LARA_CACHE_DIR", default)
+
+
+def _langtools_files() -> Iterator[str]:
+    for path in langtools.__path__:
+        for root, dirs, files in os.walk(path):
+            dirs.sort()
+            for filename in sorted(files):
+                if filename.endswith(".py"):
+                    yield os.path.join(root, filename)
+
+
+@functools.lru_cache(maxsize=None)
+def definitions_hash() -> str:
+    digest = hashlib.sha256()
+    digest.update(f"{CACHE_VERSION}:{sys.version_info[:2]}".encode())
+    for path in [*DEFINITION_FILES, *_langtools_files()]:
+        with open(path, "rb") as definition:
+            digest.update(definition.read())
+    return digest.hexdigest()[:16]
+
+
+# tells apart the entries of checkouts sharing a cache directory
+@functools.lru_cache(maxsize=None)
+def checkout_hash() -> str:
+    source_dir = os.path.dirname(os.path.abspath(__file__))
+    return hashlib.sha256(source_dir.encode()).hexdigest()[:16]
+
+
+def _load(path: str) -> object:
+    with open(path, "rb") as cached:
+        return pickle.loads(cached.read())
+
+
+def _store(path: str, value: object) -> None:
+    data = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+
+    # write then rename, so concurrent runs never see a partial file
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    with open(temp_path, "wb") as cached:
+        cached.write(data)
+    os.replace(temp_path, path)
+
+    # this checkout's entries for older definitions are never read again.
+    # Other checkouts' entries and files still being written are left alone
+    prefix = os.path.basename(path).rsplit("-", 1)[0] + "-"
+    for filename in os.listdir(directory):
+        stale = os.path.join(directory, filename)
+        if filename.startswith(prefix) and filename.endswith(".pickle"):
+            if stale != path:
+                try:
+                    os.remove(stale)
+                except FileNotFoundError:
+                    # another run of this checkout removed it first
+                    pass
+
+
+def _load_or_build(name: str, build: Callable[[], T]) -> Tuple[T, bool]:
+    if os.environ.get("LARA_NO_CACHE"):
+        return build(), True
+
+    path = os.path.join(
+        cache_dir(), f"{name}-{checkout_hash()}-{definitions_hash()}.pickle"
+    )
+
+    try:
+        return _load(path), False  # type: ignore
+    except Exception:
+        # missing or unreadable entries are simply rebuilt
+        pass
+
+    value = build()
+    try:
+        _store(path, value)
+    except (OSError, RecursionError, pickle.PicklingError, TypeError, AttributeError):
+        # an unwritable cache or unpicklable value only costs the rebuild
+        pass
+    return value, True
+
+
+def load_or_build(name: str, build: Callable[[], T]) -> T:
+    start = time.perf_counter()
+    value, built = _load_or_build(name, build)
+    LOADS[name] = (time.perf_counter() - start, built)
+    return value
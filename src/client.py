@@ -0,0 +1,130 @@
+import argparse
+import json
+import os
+import socket
+import stat
+import struct
+import sys
+from typing import BinaryIO, List, Optional, Tuple
+
+# Kept free of interpreter imports, so `lara client` starts in the time it
+# takes Python to.
+#
+# A request is one line of JSON. The reply is a sequence of frames, a tag
+# byte and a big endian 32 bit length followed by that many bytes:
+#   OUTPUT - a chunk of the program's standard output
+#   ERROR  - an error message for standard error
+#   EXIT   - the exit status as text, always the last frame
+OUTPUT = b"O"
+ERROR = b"E"
+EXIT = b"X"
+
+HEADER = struct.Struct(">cI")
+
+# Without XDG_RUNTIME_DIR the default socket goes in a directory in /tmp only
+# the user can use, as a socket made there first by someone else would be
+# taken for the server
+FALLBACK_DIR = os.path.join("/tmp", f"lara-{os.getuid()}")
+if "XDG_RUNTIME_DIR" in os.environ:
+    DEFAULT_SOCKET = os.path.join(
+        os.environ["XDG_RUNTIME_DIR"], f"lara-{os.getuid()}.sock"
+    )
+else:
+    DEFAULT_SOCKET = os.path.join(FALLBACK_DIR, "lara.sock")
+
+
+# makes the fallback directory of a socket in it, refusing one made by
+# another user or that others can use
+def private_directory(socket_path: str) -> None:
+    directory = os.path.dirname(socket_path)
+    if directory != FALLBACK_DIR:
+        return
+    try:
+        os.mkdir(directory, 0o700)
+    except FileExistsError:
+        pass
+    info = os.lstat(directory)
+    if (
+        not stat.S_ISDIR(info.st_mode)
+        or info.st_uid != os.getuid()
+        or info.st_mode & 0o077
+    ):
+        raise Exception(f"{directory} must be a directory only you can access")
+
+
+def send_frame(connection: socket.socket, tag: bytes, data: bytes) -> None:
+    connection.sendall(HEADER.pack(tag, len(data)) + data)
+
+
+def _receive_exactly(connection: socket.socket, size: int) -> bytes:
+    data = bytearray()
+    while len(data) < size:
+        chunk = connection.recv(size - len(data))
+        if not chunk:
+            raise Exception("Lara server closed the connection")
+        data += chunk
+    return bytes(data)
+
+
+def receive_frame(connection: socket.socket) -> Tuple[bytes, bytes]:
+    tag, size = HEADER.unpack(_receive_exactly(connection, HEADER.size))
+    return tag, _receive_exactly(connection, size)
+
+
+# runs a script on the server, copying its output and errors as they arrive,
+# and returns its exit status
+def run_remote(
+    socket_path: str,
+    source: str,
+    engine: str = "tree",
+    optimize: bool = True,
+    memoize: bool = False,
+    line_buffered: bool = False,
+    stdout: Optional[BinaryIO] = None,
+    stderr: Optional[BinaryIO] = None,
+) -> int:
+    stdout = stdout or sys.stdout.buffer
+    stderr = stderr or sys.stderr.buffer
+    request = {
+        "source": source,
+        "engine": engine,
+        "optimize": optimize,
+        "memoize": memoize,
+        "line_buffered": line_buffered,
+    }
+    private_directory(socket_path)
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as connection:
+        connection.connect(socket_path)
+        connection.sendall(json.dumps(request).encode() + b"\n")
+        while True:
+            tag, data = receive_frame(connection)
+            if tag == OUTPUT:
+                stdout.write(data)
+                stdout.flush()
+            elif tag == ERROR:
+                stderr.write(data)
+                stderr.flush()
+            elif tag == EXIT:
+                return int(data)
+            else:
+                raise Exception(f"Unknown frame from Lara server: {tag!r}")
+
+
+def main(argv: List[str]) -> int:
+    arg_parser = argparse.ArgumentParser(prog="lara client")
+    arg_parser.add_argument("file")
+    arg_parser.add_argument("--socket", default=DEFAULT_SOCKET, metavar="PATH")
+    arg_parser.add_argument("--engine", default="tree")
+    arg_parser.add_argument("--no-optimize", action="store_true")
+    arg_parser.add_argument("--memoize", action="store_true")
+    args = arg_parser.parse_args(argv)
+
+    with open(args.file) as source:
+        return run_remote(
+            args.socket,
+            source.read(),
+            args.engine,
+            not args.no_optimize,
+            args.memoize,
+            sys.stdout.isatty(),
+        )
@@ -0,0 +1,355 @@
+from __future__ import annotations
+from typing import Callable, List, Optional, Tuple
+
+from langtools.ast.ast import ASTNode
+
+from src.eval import BINARY_OPERATORS, ScopeTreeNode, check_set
+from src.lower import lower
+from src.memo import MISSING, MemoConfig, Memoizer, memo_key
+from src.nodes import (
+    Assign,
+    BinOp,
+    Break,
+    Call,
+    CheckedLoad,
+    For,
+    FunctionDef,
+    If,
+    Integer,
+    Let,
+    Load,
+    Print,
+    Program,
+    Return,
+    While,
+)
+from src.nodes import Expression as ExpressionNode
+from src.nodes import Statement as StatementNode
+from src.output import Output, stdout_output
+
+# Compiled statements return None to continue, or one of these signals to
+# unwind to the nearest loop (BREAK) or function call (RETURN)
+BREAK = 1
+RETURN = 2
+
+# longest operator chain compiled into nested closures
+NESTED_CHAIN_LIMIT = 16
+
+Expression = Callable[[ScopeTreeNode], int]
+Statement = Callable[[ScopeTreeNode], Optional[int]]
+
+
+def _load(depth: int, slot: int) -> Expression:
+    if depth == 0:
+        return lambda scope: scope.slots[slot]
+    if depth == 1:
+        return lambda scope: scope.parent.slots[slot]
+
+    def load(scope: ScopeTreeNode) -> int:
+        for _ in range(depth):
+            scope = scope.parent
+        return scope.slots[slot]
+
+    return load
+
+
+def _checked_load(depth: int, slot: int, name: str) -> Expression:
+    load = _load(depth, slot)
+    return lambda scope: check_set(load(scope), name)
+
+
+def _store(depth: int, slot: int, value: Expression) -> Statement:
+    if depth == 0:
+
+        def store_local(scope: ScopeTreeNode) -> None:
+            scope.slots[slot] = value(scope)
+
+        return store_local
+
+    def store(scope: ScopeTreeNode) -> None:
+        result = value(scope)
+        for _ in range(depth):
+            scope = scope.parent
+        scope.slots[slot] = result
+
+    return store
+
+
+def _call(function: Expression, arguments: Tuple[Expression, ...]) -> Expression:
+    if not arguments:
+        return lambda scope: function(scope)([])
+    if len(arguments) == 1:
+        (argument,) = arguments
+        return lambda scope: function(scope)([argument(scope)])
+
+    return lambda scope: function(scope)([argument(scope) for argument in arguments])
+
+
+def _binary(operator: str, left: Expression, right: Expression) -> Expression:
+    if operator == "PLUS":
+        return lambda scope: left(scope) + right(scope)
+    if operator == "MINUS":
+        return lambda scope: left(scope) - right(scope)
+    if operator == "MULTIPLY":
+        return lambda scope: left(scope) * right(scope)
+    if operator == "DIVIDE":
+        return lambda scope: left(scope) // right(scope)
+    if operator == "LESS":
+        return lambda scope: 1 if left(scope) < right(scope) else 0
+    if operator == "GREATER":
+        return lambda scope: 1 if left(scope) > right(scope) else 0
+    if operator == "LESS_EQUAL":
+        return lambda scope: 1 if left(scope) <= right(scope) else 0
+    if operator == "GREATER_EQUAL":
+        return lambda scope: 1 if left(scope) >= right(scope) else 0
+    raise Exception(f"Invalid operator: {operator}")
+
+
+# Lowers the AST once into nested closures with operators, children and
+# constants already bound, so running a program never inspects a node
+class ClosureCompiler:
+    def __init__(self, output: Output, memoizer: Optional[Memoizer] = None):
+        self.output = output
+        self.memoizer = memoizer
+
+    def _compile_call(self, ast: Call) -> Expression:
+        arguments = tuple(self._compile_expression(arg) for arg in ast.args)
+        if ast.checked:
+            return _call(_checked_load(ast.depth, ast.slot, ast.name), arguments)
+        return _call(_load(ast.depth, ast.slot), arguments)
+
+    def _compile_binop(self, ast: BinOp) -> Expression:
+        operands = [self._compile_expression(operand) for operand in ast.operands]
+        # operators are right associative, so the results are combined from
+        # the right
+        if len(operands) <= NESTED_CHAIN_LIMIT:
+            result = operands.pop()
+            for operator in reversed(ast.operators):
+                result = _binary(operator, operands.pop(), result)
+            return result
+
+        # nested closures recurse once per operator, so long chains run in a loop
+        functions = [BINARY_OPERATORS[operator] for operator in ast.operators]
+        functions.reverse()
+
+        def chain(scope: ScopeTreeNode) -> int:
+            values = [operand(scope) for operand in operands]
+            result = values.pop()
+            for function in functions:
+                result = function(values.pop(), result)
+            return result
+
+        return chain
+
+    def _compile_expression(self, ast: ExpressionNode) -> Expression:
+        if isinstance(ast, Integer):
+            value = ast.value
+            return lambda scope: value
+        elif isinstance(ast, CheckedLoad):
+            return _checked_load(ast.depth, ast.slot, ast.name)
+        elif isinstance(ast, Load):
+            return _load(ast.depth, ast.slot)
+        elif isinstance(ast, BinOp):
+            return self._compile_binop(ast)
+        elif isinstance(ast, Call):
+            return self._compile_call(ast)
+        else:
+            raise Exception(f"Invalid expression: {type(ast).__name__}")
+
+    def _compile_return(self, ast: Return) -> Statement:
+        # If there is a return value provided
+        if ast.value is not None:
+            value = self._compile_expression(ast.value)
+
+            def return_value(scope: ScopeTreeNode) -> int:
+                scope.return_value = value(scope)
+                return RETURN
+
+            return return_value
+
+        return lambda scope: RETURN
+
+    def _compile_io(self, ast: Print) -> Statement:
+        value = self._compile_expression(ast.value)
+        write = self.output.write
+
+        def output(scope: ScopeTreeNode) -> None:
+            write(value(scope))
+
+        return output
+
+    def _compile_var_definition(self, ast: Let) -> Statement:
+        return _store(0, ast.slot, self._compile_expression(ast.value))
+
+    def _compile_var_mutation(self, ast: Assign) -> Statement:
+        return _store(ast.depth, ast.slot, self._compile_expression(ast.value))
+
+    def _compile_call_statement(self, ast: Call) -> Statement:
+        call = self._compile_call(ast)
+
+        def call_statement(scope: ScopeTreeNode) -> None:
+            call(scope)
+
+        return call_statement
+
+    def _compile_if_block(self, ast: If) -> Statement:
+        branches: List[Tuple[Expression, Statement]] = [
+            (self._compile_expression(condition), self._compile_statements(body))
+            for condition, body in ast.branches
+        ]
+        otherwise: Optional[Statement] = None
+        if ast.otherwise is not None:
+            otherwise = self._compile_statements(ast.otherwise)
+
+        if len(branches) == 1 and otherwise is None:
+            ((condition, body),) = branches
+            return lambda scope: body(scope) if condition(scope) else None
+
+        def if_block(scope: ScopeTreeNode) -> Optional[int]:
+            for condition, body in branches:
+                if condition(scope):
+                    return body(scope)
+            if otherwise is not None:
+                return otherwise(scope)
+            return None
+
+        return if_block
+
+    def _compile_for_block(self, ast: For) -> Statement:
+        var_def = self._compile_var_definition(ast.init)
+        condition = self._compile_expression(ast.condition)
+        var_mutation = self._compile_var_mutation(ast.update)
+        body = self._compile_statements(ast.body)
+
+        def for_block(scope: ScopeTreeNode) -> Optional[int]:
+            var_def(scope)
+            while condition(scope):
+                signal = body(scope)
+                if signal is not None:
+                    return RETURN if signal == RETURN else None
+                var_mutation(scope)
+            return None
+
+        return for_block
+
+    def _compile_while_block(self, ast: While) -> Statement:
+        condition = self._compile_expression(ast.condition)
+        body = self._compile_statements(ast.body)
+
+        def while_block(scope: ScopeTreeNode) -> Optional[int]:
+            while condition(scope):
+                signal = body(scope)
+                if signal is not None:
+                    return RETURN if signal == RETURN else None
+            return None
+
+        return while_block
+
+    def _compile_function_definition(self, ast: FunctionDef) -> Statement:
+        slot = ast.slot
+        frame_size = ast.frame_size
+        num_params = len(ast.params)
+        body = self._compile_statements(ast.body)
+
+        def function_definition(scope: ScopeTreeNode) -> None:
+            def function(args: List[int]) -> Optional[int]:
+                new_scope = ScopeTreeNode(scope, frame_size)
+                new_scope.slots[:num_params] = args[:num_params]
+                if len(args) < num_params:
+                    # missing arguments are None
+                    new_scope.slots[len(args) : num_params] = [None] * (
+                        num_params - len(args)
+                    )
+                body(new_scope)
+                return new_scope.return_value
+
+            scope.slots[slot] = function
+
+        memoizer = self.memoizer
+        if memoizer is None or not ast.pure:
+            return function_definition
+
+        name = ast.name
+
+        def memoized_function_definition(scope: ScopeTreeNode) -> None:
+            function_definition(scope)
+            function = scope.slots[slot]
+            cache = memoizer.new_cache(name)
+
+            def memoized(args: List[int]) -> Optional[int]:
+                key = memo_key(args)
+                if key is None:
+                    return function(args)
+                value = cache.lookup(key)
+                if value is MISSING:
+                    value = function(args)
+                    cache.store(key, value)
+                return value
+
+            scope.slots[slot] = memoized
+
+        return memoized_function_definition
+
+    def _compile_statement(self, ast: StatementNode) -> Statement:
+        if isinstance(ast, Print):
+            return self._compile_io(ast)
+        elif isinstance(ast, Let):
+            return self._compile_var_definition(ast)
+        elif isinstance(ast, FunctionDef):
+            return self._compile_function_definition(ast)
+        elif isinstance(ast, Return):
+            return self._compile_return(ast)
+        elif isinstance(ast, Assign):
+            return self._compile_var_mutation(ast)
+        elif isinstance(ast, If):
+            return self._compile_if_block(ast)
+        elif isinstance(ast, For):
+            return self._compile_for_block(ast)
+        elif isinstance(ast, Call):
+            return self._compile_call_statement(ast)
+        elif isinstance(ast, Break):
+            return lambda scope: BREAK
+        elif isinstance(ast, While):
+            return self._compile_while_block(ast)
+        else:
+            raise Exception(f"Invalid Statement: {type(ast).__name__}")
+
+    def _compile_statements(self, ast: List[StatementNode]) -> Statement:
+        statements = tuple(self._compile_statement(child) for child in ast)
+
+        if not statements:
+            return lambda scope: None
+        if len(statements) == 1:
+            return statements[0]
+
+        def block(scope: ScopeTreeNode) -> Optional[int]:
+            for statement in statements:
+                signal = statement(scope)
+                if signal is not None:
+                    return signal
+            return None
+
+        return block
+
+    def compile(self, program: Program) -> Statement:
+        return self._compile_statements(program.body)
+
+
+class ClosureEvaluator:
+    def __init__(
+        self,
+        ast: ASTNode,
+        memo: Optional[MemoConfig] = None,
+        output: Optional[Output] = None,
+    ):
+        program = lower(ast, purity=memo is not None)
+        self.memoizer = Memoizer(memo) if memo is not None else None
+        self.output = output if output is not None else stdout_output()
+        self.scope_tree = ScopeTreeNode(None, program.frame_size)
+        self.program = ClosureCompiler(self.output, self.memoizer).compile(program)
+
+    def evaluate(self) -> None:
+        try:
+            self.program(self.scope_tree)
+        finally:
+            self.output.flush()
@@ -1,5 +1,8 @@
+from typing import Dict
+
 from langtools.lexer.nfa import Atom, Concat, Epsilon, KleeneStar, Union
 from langtools.lexer.dfa import DFA
+from langtools.lexer.token import Token
 from langtools.lexer.basic_symbols import (
     DIGITS,
     NON_ZERO_DIGITS,
@@ -7,6 +10,7 @@ from langtools.lexer.basic_symbols import (
     UPPERCASE_ALPHABET,
 )
 
+from src.cache import load_or_build
 from src.config.tokens import (
     AssignToken,
     CommaToken,
@@ -84,28 +88,6 @@ IDENTIFIER = Concat(
 
 IDENTIFIER.add_token(IdentifierToken)
 
-# CONTROL FLOW
-
-IF = Concat(Atom("i"), Atom("f"))
-WHILE = Concat(Atom("w"), Atom("h"), Atom("i"), Atom("l"), Atom("e"))
-ELSE = Concat(Atom("e"), Atom("l"), Atom("s"), Atom("e"))
-ELIF = Concat(Atom("e"), Atom("l"), Atom("i"), Atom("f"))
-FUNC = Concat(Atom("f"), Atom("u"), Atom("n"), Atom("c"))
-FOR = Concat(Atom("f"), Atom("o"), Atom("r"))
-
-IF.add_token(IfToken)
-WHILE.add_token(WhileToken)
-ELSE.add_token(ElseToken)
-ELIF.add_token(ElifToken)
-FUNC.add_token(FuncToken)
-FOR.add_token(ForToken)
-
-RETURN = Concat(Atom("r"), Atom("e"), Atom("t"), Atom("u"), Atom("r"), Atom("n"))
-RETURN.add_token(ReturnToken)
-
-BREAK = Concat(Atom("b"), Atom("r"), Atom("e"), Atom("a"), Atom("k"))
-BREAK.add_token(BreakToken)
-
 # PUNCTUATION
 
 SEMI_COLON = Atom(";")
@@ -122,45 +104,47 @@ LEFT_PAREN.add_token(LeftParenToken)
 RIGHT_PAREN.add_token(RightParenToken)
 COMMA.add_token(CommaToken)
 
-# MISCELANEOUS KEYWORDS
-
-PRINT = Concat(Atom("p"), Atom("r"), Atom("i"), Atom("n"), Atom("t"))
-PRINT.add_token(PrintToken)
-
-LET = Concat(Atom("l"), Atom("e"), Atom("t"))
-LET.add_token(LetToken)
-
-
-TOKENIZER = DFA(
-    Union(
-        INTEGER,
-        PLUS,
-        MINUS,
-        MULTIPLY,
-        POWER,
-        DIVIDE,
-        IDENTIFIER,
-        IF,
-        WHILE,
-        ASSIGN,
-        ELSE,
-        ELIF,
-        FUNC,
-        FOR,
-        LET,
-        SEMI_COLON,
-        LEFT_CURLY,
-        RIGHT_CURLY,
-        LEFT_PAREN,
-        RIGHT_PAREN,
-        COMMA,
-        PRINT,
-        RETURN,
-        LESS,
-        LESS_EQUAL,
-        GREATER,
-        GREATER_EQUAL,
-        BREAK,
-        close=False,
-    )
+# KEYWORDS
+
+# words are lexed as identifiers and then looked up here, so the DFA needs
+# no states of its own for them
+KEYWORDS: Dict[str, Token] = {
+    "if": IfToken,
+    "while": WhileToken,
+    "else": ElseToken,
+    "elif": ElifToken,
+    "func": FuncToken,
+    "for": ForToken,
+    "return": ReturnToken,
+    "break": BreakToken,
+    "print": PrintToken,
+    "let": LetToken,
+}
+
+
+TOKENIZER = load_or_build(
+    "tokenizer",
+    lambda: DFA(
+        Union(
+            INTEGER,
+            PLUS,
+            MINUS,
+            MULTIPLY,
+            POWER,
+            DIVIDE,
+            IDENTIFIER,
+            ASSIGN,
+            SEMI_COLON,
+            LEFT_CURLY,
+            RIGHT_CURLY,
+            LEFT_PAREN,
+            RIGHT_PAREN,
+            COMMA,
+            LESS,
+            LESS_EQUAL,
+            GREATER,
+            GREATER_EQUAL,
+            close=False,
+        )
+    ),
 )
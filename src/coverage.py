@@ -0,0 +1,73 @@
+from typing import Dict, Iterable, List, Set
+
+from langtools.ast.ast import ASTNode
+
+from src.hooks import Hooks
+from src.nodes import Statement
+
+
+# the lines statements start on, without recursing
+def statement_lines(ast: ASTNode) -> Set[int]:
+    lines = set()
+    stack = [ast]
+    while stack:
+        node = stack.pop()
+        line = getattr(node, "line", None)
+        if line is not None:
+            lines.add(line)
+        stack.extend(node.children)
+    return lines
+
+
+# "1-3, 7" for [1, 2, 3, 7]
+def format_ranges(lines: List[int]) -> str:
+    ranges = []
+    for line in lines:
+        if ranges and ranges[-1][1] == line - 1:
+            ranges[-1][1] = line
+        else:
+            ranges.append([line, line])
+    return ", ".join(
+        str(first) if first == last else f"{first}-{last}" for first, last in ranges
+    )
+
+
+# Line coverage of one run, from the statement hook. The lines that can run
+# are those of the tree given to the engine, so code the optimizer removed
+# isn't counted as missed
+class Coverage(Hooks):
+    def __init__(self, lines: Iterable[int] = ()):
+        self.lines = set(lines)
+        # times each line's statements ran
+        self.hits: Dict[int, int] = {}
+
+    def statement(self, ast: Statement) -> None:
+        line = ast.line
+        if line is not None:
+            self.hits[line] = self.hits.get(line, 0) + 1
+
+    def missed(self) -> List[int]:
+        return sorted(self.lines.difference(self.hits))
+
+    def percent(self) -> float:
+        if not self.lines:
+            return 100.0
+        return 100.0 * len(self.lines.intersection(self.hits)) / len(self.lines)
+
+    def format(self, path: str) -> str:
+        covered = len(self.lines.intersection(self.hits))
+        line = f"{path}: {covered} of {len(self.lines)} lines, {self.percent():.1f}%"
+        missed = self.missed()
+        if missed:
+            line += f", missed {format_ranges(missed)}"
+        return line
+
+    # the lcov tracefile format coverage tools and editors read
+    def format_lcov(self, path: str) -> str:
+        lines = ["TN:", f"SF:{path}"]
+        for line in sorted(self.lines):
+            lines.append(f"DA:{line},{self.hits.get(line, 0)}")
+        lines.append(f"LH:{len(self.lines.intersection(self.hits))}")
+        lines.append(f"LF:{len(self.lines)}")
+        lines.append("end_of_record")
+        return "".join(line + "\n" for line in lines)
@@ -0,0 +1,18 @@
+from typing import Any, Callable, Dict
+
+from langtools.ast.ast import ASTNode
+
+from src.closures import ClosureEvaluator
+from src.eval import Evaluator
+from src.transpile import PythonEvaluator
+from src.vm import VirtualMachine
+
+# every engine is constructed from a flattened AST, which it lowers to
+# src.nodes, and run with evaluate(). Printed values go to the engine's
+# output, an src.output.Output, standard output by default
+ENGINES: Dict[str, Callable[[ASTNode], Any]] = {
+    "tree": Evaluator,
+    "closure": ClosureEvaluator,
+    "vm": VirtualMachine,
+    "python": PythonEvaluator,
+}
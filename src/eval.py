@@ -1,379 +1,337 @@
 from __future__ import annotations
-from typing import List, Optional, Callable, Dict, Union
+from typing import Any, Callable, Dict, List, Optional, Union
 
 from langtools.ast.ast import ASTNode
 
+from src.hooks import Hooks, install_hooks
+from src.lower import lower
+from src.memo import MISSING, MemoCache, MemoConfig, Memoizer, memo_key
+from src.memprofile import EvaluatorMemory
+from src.nodes import (
+    Assign,
+    BinOp,
+    Break,
+    Call,
+    CheckedLoad,
+    Expression,
+    For,
+    FunctionDef,
+    If,
+    Integer,
+    Let,
+    Load,
+    Print,
+    Return,
+    Statement,
+    While,
+)
+from src.output import Output, stdout_output
+from src.profiler import Profiler
+from src.stats import EvaluatorCounters
+
+BINARY_OPERATORS: Dict[str, Callable[[int, int], int]] = {
+    "PLUS": lambda left, right: left + right,
+    "MINUS": lambda left, right: left - right,
+    "MULTIPLY": lambda left, right: left * right,
+    # TODO handle floats at some point
+    "DIVIDE": lambda left, right: left // right,
+    "LESS": lambda left, right: 1 if left < right else 0,
+    "GREATER": lambda left, right: 1 if left > right else 0,
+    "LESS_EQUAL": lambda left, right: 1 if left <= right else 0,
+    "GREATER_EQUAL": lambda left, right: 1 if left >= right else 0,
+}
+
+
+# the value of a slot until its declaration runs
+UNSET = object()
+
+
+def check_set(value: Any, name: str) -> Any:
+    if value is UNSET:
+        raise Exception(f"Use of undefined symbol {name}")
+    return value
+
 
 class ScopeTreeNode:
-    def __init__(self, parent: Optional[ScopeTreeNode]):
-        self.parent = parent
-        # $RETURN store return values and cannot conflict with other identifiers ($)
-        # $RETURN flag is set to true once a return statement in encountered
-        self.symbols: Dict[str, Union[Function, int, None, bool]] = {
-            "$RETURN": None,
-            "$RETURN_FLAG": False,
-            "$BREAK_FLAG": False,
-        }
-        self.children: List[ScopeTreeNode] = []
-
-    def get_symbol(self, identifier: str) -> int:
-        if identifier in self.symbols:
-            return self.symbols[identifier]
-        elif self.parent is not None:
-            return self.parent.get_symbol(identifier)
-        else:
-            raise Exception(f"Use of undefined symbol {identifier}")
+    __slots__ = ("parent", "slots", "return_value", "return_flag", "break_flag")
 
-    def set_symbol(self, identifier: str, value: int) -> None:
-        if identifier in self.symbols:
-            self.symbols[identifier] = value
-        elif self.parent is not None:
-            self.parent.set_symbol(identifier, value)
-        else:
-            raise Exception(f"Reference of undefined symbol {identifier}")
+    def __init__(self, parent: Optional[ScopeTreeNode], size: int):
+        self.parent = parent
+        # symbols live in fixed slots assigned by the resolver
+        self.slots: List[Union[Function, int, None]] = [UNSET] * size
+        # return_flag is set to true once a return statement in encountered
+        self.return_value: Optional[int] = None
+        self.return_flag = False
+        self.break_flag = False
+
+    def get_symbol(self, depth: int, slot: int) -> Union[Function, int, None]:
+        scope = self
+        while depth:
+            scope = scope.parent
+            depth -= 1
+        return scope.slots[slot]
+
+    def set_symbol(self, depth: int, slot: int, value: int) -> None:
+        scope = self
+        while depth:
+            scope = scope.parent
+            depth -= 1
+        scope.slots[slot] = value
 
 
 class Function:
     def __init__(
-        self, ast: ASTNode, arg_parse_func: Callable[[List[int], ScopeTreeNode], None]
+        self, ast: FunctionDef, scope: ScopeTreeNode, cache: Optional[MemoCache] = None
     ):
-        assert ast.name == "FUNCTION_DEF"
-
         self.ast = ast
-        self.arg_parse_func = arg_parse_func
+        # the scope the function was defined in, parent of every call's scope
+        self.scope = scope
+        self.num_params = len(ast.params)
+        # results by arguments, only for pure functions when memoizing
+        self.cache = cache
 
     def __call__(self, evaluator: Evaluator, args: List[int]) -> Optional[int]:
-        new_scope = ScopeTreeNode(evaluator.curr_scope)
-        self.arg_parse_func(args, new_scope)
+        if self.cache is not None:
+            key = memo_key(args)
+            if key is not None:
+                value = self.cache.lookup(key)
+                if value is MISSING:
+                    value = self._call(evaluator, args)
+                    self.cache.store(key, value)
+                return value
+
+        return self._call(evaluator, args)
+
+    def _call(self, evaluator: Evaluator, args: List[int]) -> Optional[int]:
+        new_scope = evaluator.scope_type(self.scope, self.ast.frame_size)
+        new_scope.slots[: self.num_params] = args[: self.num_params]
+        if len(args) < self.num_params:
+            # missing arguments are None
+            new_scope.slots[len(args) : self.num_params] = [None] * (
+                self.num_params - len(args)
+            )
+
+        caller_scope = evaluator.curr_scope
         evaluator.curr_scope = new_scope
-        evaluator._evaluate_statements(self.ast.children[6], True)
+        evaluator._evaluate_statements(self.ast.body)
+        evaluator.curr_scope = caller_scope
 
-        return new_scope.symbols["$RETURN"]
+        return new_scope.return_value
 
 
 class Evaluator:
-    def __init__(self, ast: ASTNode):
-        self.ast = ast
-        self.scope_tree = ScopeTreeNode(None)
-        self.curr_scope = self.scope_tree
+    # what scopes and functions are made of, memory profiling and hooks
+    # subclass them
+    scope_type = ScopeTreeNode
+    function_type = Function
 
-    def _evaluate_arguments(self, ast: ASTNode) -> List[int]:
-        assert ast.name == "ARGUMENTS"
-        result: List[int] = []
-        for child in ast.children:
-            if child.name == "ARGUMENT":
-                result.append(self._evaluate_expression(child.children[0]))
-        return result
-
-    def _evaluate_arguments_def(self, ast: ASTNode) -> List[str]:
-        assert ast.name == "ARGUMENTS_DEF"
-
-        result: List[str] = []
-        for child in ast.children:
-            if child.name == "ARGUMENT_DEF":
-                identifier_lexme = child.children[0].lexme
-                if identifier_lexme is None:
-                    raise Exception("Identifier missing lexme")
-                result.append(identifier_lexme)
+    def __init__(
+        self,
+        ast: ASTNode,
+        memo: Optional[MemoConfig] = None,
+        output: Optional[Output] = None,
+        profiler: Optional[Profiler] = None,
+        counters: Optional[EvaluatorCounters] = None,
+        memory: Optional[EvaluatorMemory] = None,
+        hooks: Optional[List[Hooks]] = None,
+    ):
+        self.program = lower(ast, purity=memo is not None)
+        self.memoizer = Memoizer(memo) if memo is not None else None
+        self.output = output if output is not None else stdout_output()
+        self.scope_tree = ScopeTreeNode(None, self.program.frame_size)
+        self.curr_scope = self.scope_tree
+        self.profiler = profiler
+        if profiler is not None:
+            # only a profiled run pays for timing
+            self._evaluate_call = self._profile_call
+            self._evaluate_statement = self._profile_statement
+        if counters is not None:
+            counters.install(self)
+        if memory is not None:
+            memory.install(self)
+        if hooks:
+            install_hooks(self, hooks)
+
+    def _evaluate_call(self, ast: Call) -> Optional[int]:
+        function = self.curr_scope.get_symbol(ast.depth, ast.slot)
+        if function is UNSET:
+            raise Exception(f"Use of undefined symbol {ast.name}")
+        return function(self, [self._evaluate_expression(arg) for arg in ast.args])
+
+    # the function's time starts once its arguments are evaluated
+    def _profile_call(self, ast: Call) -> Optional[int]:
+        function = self.curr_scope.get_symbol(ast.depth, ast.slot)
+        if function is UNSET:
+            raise Exception(f"Use of undefined symbol {ast.name}")
+        args = [self._evaluate_expression(arg) for arg in ast.args]
+        self.profiler.enter(function.ast)
+        value = function(self, args)
+        self.profiler.exit()
+        return value
+
+    # operands are evaluated left to right, and since operators are right
+    # associative the results are combined from the right
+    def _evaluate_binop(self, ast: BinOp) -> int:
+        values = [self._evaluate_expression(operand) for operand in ast.operands]
+        result = values.pop()
+        for operator in reversed(ast.operators):
+            result = BINARY_OPERATORS[operator](values.pop(), result)
         return result
 
-    def _evaluate_var_definition(self, ast: ASTNode) -> None:
-        assert ast.name == "VAR_DEF"
-
-        identifier_lexme = ast.children[1].lexme
-        if identifier_lexme is None:
-            raise Exception("Identifier lexme missing")
-
-        value = self._evaluate_expression(ast.children[-1])
-
-        if identifier_lexme in self.curr_scope.symbols:
-            raise Exception(f"Duplicate definition of symbol: {identifier_lexme}")
-
-        self.curr_scope.symbols[identifier_lexme] = value
-
-    def _evaluate_var_reference(self, ast: ASTNode) -> int:
-        assert ast.name == "VAR_REF"
-
-        identifier, call = ast.children
-
-        if identifier.lexme is None:
-            raise Exception("Missing lexme on identifier")
-
-        symbol = self.curr_scope.get_symbol(identifier.lexme)
-
-        if call.children:
-            return symbol(self, self._evaluate_arguments(call.children[1]))
-
-        return symbol
-
-    def _evaluate_factor(self, ast: ASTNode) -> int:
-        assert ast.name == "FACTOR"
-
-        # FACTOR -> left_paren, EXPRESSION, left_paren
-        if len(ast.children) == 3:
-            return self._evaluate_expression(ast.children[1])
-        elif ast.children[0].name == "INTEGER":
-            if ast.children[0].lexme is None:
-                raise Exception("Integer node missing lexme")
-            return int(ast.children[0].lexme)
-        elif ast.children[0].name == "VAR_REF":
-            return self._evaluate_var_reference(ast.children[0])
+    def _evaluate_expression(self, ast: Expression) -> int:
+        kind = type(ast)
+        if kind is Integer:
+            return ast.value
+        elif kind is Load:
+            return self.curr_scope.get_symbol(ast.depth, ast.slot)
+        elif kind is BinOp:
+            return self._evaluate_binop(ast)
+        elif kind is Call:
+            return self._evaluate_call(ast)
+        elif kind is CheckedLoad:
+            return check_set(self.curr_scope.get_symbol(ast.depth, ast.slot), ast.name)
         else:
-            raise Exception("Invalid factor children")
-
-    def _evaluate_term(self, ast: ASTNode) -> int:
-        assert ast.name == "TERM"
-
-        factor, factor_operator = ast.children
-        result = self._evaluate_factor(factor)
-
-        if factor_operator.children:
-            if factor_operator.children[0].name == "MULTIPLY":
-                result *= self._evaluate_term(factor_operator.children[1])
-            elif factor_operator.children[0].name == "DIVIDE":
-                # TODO handle floats at some point
-                result //= self._evaluate_term(factor_operator.children[1])
-            else:
-                raise Exception(
-                    f"Invalid factor operator: {factor_operator.children[0].name}"
-                )
-
-        return result
-
-    def _evaluate_operand(self, ast: ASTNode) -> int:
-        assert ast.name == "OPERAND"
-
-        term, term_operator = ast.children
-        result = self._evaluate_term(term)
-
-        # if operator found
-        if term_operator.children:
-            if term_operator.children[0].name == "PLUS":
-                result += self._evaluate_operand(term_operator.children[1])
-            elif term_operator.children[0].name == "MINUS":
-                result -= self._evaluate_operand(term_operator.children[1])
-            else:
-                raise Exception(f"Invalid Term Operator: {term.children[0].name}")
-
-        return result
-
-    def _evaluate_expression(self, ast: ASTNode) -> int:
-        assert ast.name == "EXPRESSION"
-
-        operand, operand_operator = ast.children
-        result = self._evaluate_operand(operand)
-
-        # if operator found
-        if operand_operator.children:
-            if operand_operator.children[0].name == "LESS":
-                result = (
-                    1
-                    if result < self._evaluate_expression(operand_operator.children[1])
-                    else 0
-                )
-            elif operand_operator.children[0].name == "GREATER":
-                result = (
-                    1
-                    if result > self._evaluate_expression(operand_operator.children[1])
-                    else 0
-                )
-            elif operand_operator.children[0].name == "LESS_EQUAL":
-                result = (
-                    1
-                    if result <= self._evaluate_expression(operand_operator.children[1])
-                    else 0
-                )
-            elif operand_operator.children[0].name == "GREATER_EQUAL":
-                result = (
-                    1
-                    if result >= self._evaluate_expression(operand_operator.children[1])
-                    else 0
-                )
-            else:
-                raise Exception(
-                    f"Invalid Operand Operator: {operand_operator.children[0].name}"
-                )
-
-        return result
-
-    def _bool_cast_expression(self, ast: ASTNode) -> bool:
-        assert ast.name == "EXPRESSION"
-        return bool(self._evaluate_expression(ast))
-
-    def _evaluate_return(self, ast: ASTNode) -> None:
-        assert ast.name == "RETURN_STATEMENT"
+            raise Exception(f"Invalid expression: {kind.__name__}")
 
+    def _evaluate_return(self, ast: Return) -> None:
         retval = None
 
         # If there is a return value provided
-        if ast.children[1].children:
+        if ast.value is not None:
             # Evaluate it
-            retval = self._evaluate_expression(ast.children[1].children[0])
-
-        self.curr_scope.symbols["$RETURN"] = retval
-        self.curr_scope.symbols["$RETURN_FLAG"] = True
-
-    def _evaluate_break(self, ast: ASTNode) -> None:
-        assert ast.name == "BREAK_STATEMENT"
-
-        self.curr_scope.symbols["$BREAK_FLAG"] = True
-
-    def _evaluate_var_mutation(self, ast: ASTNode) -> None:
-        assert ast.name == "VAR_ASSIGN"
-
-        identifier_lexme = ast.children[0].lexme
+            retval = self._evaluate_expression(ast.value)
 
-        if identifier_lexme is None:
-            raise Exception("Missing identifier lexme")
+        self.curr_scope.return_value = retval
+        self.curr_scope.return_flag = True
 
-        value = self._evaluate_expression(ast.children[2])
-        self.curr_scope.set_symbol(identifier_lexme, value)
-
-    def _evaluate_io(self, ast: ASTNode) -> None:
-        assert ast.name == "OUTPUT"
-
-        print(self._evaluate_expression(ast.children[2]))
-
-    def _evaluate_if_block(self, ast: ASTNode) -> None:
-        assert ast.name == "IF_BLOCK"
-
-        path_taken = False
-        for child in ast.children:
-            if child.name == "IF":
-                if self._bool_cast_expression(child.children[1]):
-                    self._evaluate_statements(child.children[4])
-                    path_taken = True
-            elif child.name == "ELIF":
-                if not path_taken and self._bool_cast_expression(child.children[1]):
-                    self._evaluate_statements(child.children[4])
-                    path_taken = True
-            elif child.name == "ELSE":
-                if not path_taken:
-                    self._evaluate_statements(child.children[1])
-            else:
-                raise Exception(f"Invalid conditional branch name: {child.name}")
-
-    def _evaluate_for_block(self, ast: ASTNode) -> None:
-        assert ast.name == "FOR_BLOCK"
-
-        var_def = ast.children[2]
-        condition = ast.children[4]
-        var_mutation = ast.children[6]
+    def _evaluate_if_block(self, ast: If) -> None:
+        for condition, body in ast.branches:
+            if self._evaluate_expression(condition):
+                self._evaluate_statements(body)
+                return
+        if ast.otherwise is not None:
+            self._evaluate_statements(ast.otherwise)
 
-        self._evaluate_var_definition(var_def)
+    def _evaluate_for_block(self, ast: For) -> None:
+        self.curr_scope.slots[ast.init.slot] = self._evaluate_expression(ast.init.value)
 
-        scope_when_loop_started = self.curr_scope
+        if ast.counted is not None and self._evaluate_counted_loop(ast):
+            return
 
-        while self._bool_cast_expression(condition):
-            self._evaluate_statements(ast.children[9])
+        while self._evaluate_expression(ast.condition):
+            self._evaluate_statements(ast.body)
 
-            if self.curr_scope.symbols["$RETURN_FLAG"]:
+            if self.curr_scope.return_flag:
                 return
-            if self.curr_scope.symbols["$BREAK_FLAG"]:
-                self.curr_scope.symbols["$BREAK_FLAG"] = False
+            if self.curr_scope.break_flag:
+                self.curr_scope.break_flag = False
                 return
 
-            self._evaluate_var_mutation(var_mutation)
-
-    def _evaluate_while_block(self, ast: ASTNode) -> None:
-        assert ast.name == "WHILE_BLOCK"
-
-        condition = ast.children[2]
-        scope_when_loop_started = self.curr_scope
-
-        while self._bool_cast_expression(condition):
-            self._evaluate_statements(ast.children[5])
-
-            if self.curr_scope.symbols["$RETURN_FLAG"]:
+            self._evaluate_assignment(ast.update)
+
+    # returns False without running anything when the loop's values aren't
+    # integers, leaving it to the generic path
+    def _evaluate_counted_loop(self, ast: For) -> bool:
+        counted = ast.counted
+        assert counted is not None
+
+        slots = self.curr_scope.slots
+        slot = ast.init.slot
+        start = slots[slot]
+        bound = self._evaluate_expression(counted.bound)
+        if type(start) is not int or type(bound) is not int:
+            return False
+
+        if counted.comparison == "LESS_EQUAL":
+            bound += 1
+        elif counted.comparison == "GREATER_EQUAL":
+            bound -= 1
+        values = range(start, bound, counted.step)
+
+        for value in values:
+            slots[slot] = value
+            self._evaluate_statements(ast.body)
+
+            if self.curr_scope.return_flag:
+                return True
+            if self.curr_scope.break_flag:
+                self.curr_scope.break_flag = False
+                return True
+
+        # where the generic loop would leave the variable
+        slots[slot] = values[-1] + counted.step if values else start
+        return True
+
+    def _evaluate_while_block(self, ast: While) -> None:
+        while self._evaluate_expression(ast.condition):
+            self._evaluate_statements(ast.body)
+
+            if self.curr_scope.return_flag:
                 return
-            if self.curr_scope.symbols["$BREAK_FLAG"]:
-                self.curr_scope.symbols["$BREAK_FLAG"] = False
+            if self.curr_scope.break_flag:
+                self.curr_scope.break_flag = False
                 return
 
-    # A less than ideal hack to maintain an LL1 parseable grammar
-    def _evaluate_root_var_ref(self, ast: ASTNode) -> None:
-        assert ast.name == "ROOT_VAR_REF"
-
-        identifier_lexme = ast.children[0].lexme
-
-        if identifier_lexme is None:
-            raise Exception("Identifier lexme is missing")
-
-        root_var_ref_operator = ast.children[1]
-
-        if root_var_ref_operator.children[0].name == "LEFT_PAREN":
-            self.curr_scope.get_symbol(identifier_lexme)(
-                self, self._evaluate_arguments(root_var_ref_operator.children[1])
-            )
-        elif root_var_ref_operator.children[0].name == "ASSIGN":
-            self.curr_scope.set_symbol(
-                identifier_lexme,
-                self._evaluate_expression(root_var_ref_operator.children[1]),
-            )
-
-    def _evaluate_statement(self, ast: ASTNode) -> None:
-        assert ast.name == "STATEMENT"
-
-        if ast.children[0].name == "OUTPUT":
-            self._evaluate_io(ast.children[0])
-        elif ast.children[0].name == "VAR_DEF":
-            self._evaluate_var_definition(ast.children[0])
-        elif ast.children[0].name == "FUNCTION_DEF":
-            self._evaluate_function_definition(ast.children[0])
-        elif ast.children[0].name == "RETURN_STATEMENT":
-            self._evaluate_return(ast.children[0])
-        elif ast.children[0].name == "VAR_ASSIGN":
-            self._evaluate_var_mutation(ast.children[0])
-        elif ast.children[0].name == "IF_BLOCK":
-            self._evaluate_if_block(ast.children[0])
-        elif ast.children[0].name == "FOR_BLOCK":
-            self._evaluate_for_block(ast.children[0])
-        elif ast.children[0].name == "ROOT_VAR_REF":
-            self._evaluate_root_var_ref(ast.children[0])
-        elif ast.children[0].name == "BREAK_STATEMENT":
-            self._evaluate_break(ast.children[0])
-        elif ast.children[0].name == "WHILE_BLOCK":
-            self._evaluate_while_block(ast.children[0])
+    def _evaluate_assignment(self, ast: Assign) -> None:
+        value = self._evaluate_expression(ast.value)
+        self.curr_scope.set_symbol(ast.depth, ast.slot, value)
+
+    def _evaluate_function_definition(self, ast: FunctionDef) -> None:
+        cache = None
+        if self.memoizer is not None and ast.pure:
+            cache = self.memoizer.new_cache(ast.name)
+        self.curr_scope.slots[ast.slot] = self.function_type(
+            ast, self.curr_scope, cache
+        )
+
+    def _evaluate_statement(self, ast: Statement) -> None:
+        kind = type(ast)
+        if kind is Print:
+            self.output.write(self._evaluate_expression(ast.value))
+        elif kind is Let:
+            self.curr_scope.slots[ast.slot] = self._evaluate_expression(ast.value)
+        elif kind is Assign:
+            self._evaluate_assignment(ast)
+        elif kind is Call:
+            self._evaluate_call(ast)
+        elif kind is If:
+            self._evaluate_if_block(ast)
+        elif kind is For:
+            self._evaluate_for_block(ast)
+        elif kind is While:
+            self._evaluate_while_block(ast)
+        elif kind is Return:
+            self._evaluate_return(ast)
+        elif kind is Break:
+            self.curr_scope.break_flag = True
+        elif kind is FunctionDef:
+            self._evaluate_function_definition(ast)
         else:
-            raise Exception(f"Invalid Statement: {ast.children[0].name}")
+            raise Exception(f"Invalid Statement: {kind.__name__}")
 
-    def _evaluate_statements(
-        self, ast: ASTNode, direct_child_of_func_call=False
-    ) -> None:
-        assert ast.name == "STATEMENTS"
+    def _profile_statement(self, ast: Statement) -> None:
+        self.profiler.enter(ast.line)
+        Evaluator._evaluate_statement(self, ast)
+        self.profiler.exit()
 
-        for statement in ast.children:
+    def _evaluate_statements(self, ast: List[Statement]) -> None:
+        for statement in ast:
             self._evaluate_statement(statement)
-            if self.curr_scope.symbols["$RETURN_FLAG"]:
-                if direct_child_of_func_call:
-                    if self.curr_scope.parent is not None:
-                        self.curr_scope = self.curr_scope.parent
-                    else:
-                        raise Exception("Use of return outside of function")
+            if self.curr_scope.return_flag or self.curr_scope.break_flag:
                 break
 
-            if self.curr_scope.symbols["$BREAK_FLAG"]:
-                break
-
-    def _evaluate_function_definition(self, ast: ASTNode) -> None:
-        assert ast.name == "FUNCTION_DEF"
-
-        identifier_lexme = ast.children[1].lexme
-
-        if identifier_lexme is None:
-            raise Exception("Identifier lexme is missing")
-
-        if identifier_lexme in self.curr_scope.symbols:
-            raise Exception(f"Duplicate function definition: {identifier_lexme}")
-
-        identifier_list = self._evaluate_arguments_def(ast.children[3])
-
-        def augment_scope(args: List[int], scope: ScopeTreeNode):
-            for identifier, arg in zip(identifier_list, args):
-                scope.symbols[identifier] = arg
-
-        new_function = Function(ast, augment_scope)
-        self.curr_scope.symbols[identifier_lexme] = new_function
-
     def evaluate(self) -> None:
-        self._evaluate_statements(self.ast.children[1].children[0])
+        try:
+            self._evaluate_statements(self.program.body)
+        finally:
+            self.output.flush()
+
+    # runs more top-level statements after growing the global frame, for
+    # streaming
+    def evaluate_statements(self, statements: List[Statement], frame_size: int) -> None:
+        slots = self.scope_tree.slots
+        slots.extend([UNSET] * (frame_size - len(slots)))
+        try:
+            self._evaluate_statements(statements)
+        finally:
+            self.output.flush()
@@ -0,0 +1,181 @@
+import io
+import os
+import sys
+from typing import Iterator, List, Optional, TextIO, Tuple
+
+from langtools.ast.ast import ASTNode
+from langtools.lexer.lexer import tokenize
+from langtools.lexer.token import Token
+
+from src.config.lexer import KEYWORDS, TOKENIZER
+from src.generated_parser import parse as parse_tokens
+from src.generated_parser import parse_spans
+from src.larac import load_compiled, store_compiled
+from src.spans import (
+    PARALLEL_THRESHOLD,
+    WHITE_SPACE,
+    Buffer,
+    lex_file,
+    lex_spans,
+    mapped_file,
+    span_lexer,
+)
+from src.stats import NO_STATS, Stats
+
+# the nodes spliced into their parent, applied by src/parsegen.py as the
+# generated parser builds the tree
+FLATTEN_RULES = {
+    "STATEMENTS": {"STATEMENTS"},
+    "ARGUMENTS": {"ANOTHER_ARGUMENT", "ARGUMENTS"},
+    "ANOTHER_ARGUMENT": {"ARGUMENTS"},
+    "ARGUMENTS_DEF": {"ANOTHER_ARGUMENT_DEF", "ARGUMENTS_DEF"},
+    "ANOTHER_ARGUMENT_DEF": {"ARGUMENTS_DEF"},
+    "IF_BLOCK": {"IF_BLOCK_CONTINUE"},
+    # "EXPRESSION": {"TERM_OPERATOR"},
+}
+
+# the nodes that record the source line they start on, when parsed from a
+# buffer
+LINE_NODES = frozenset({"STATEMENT"})
+
+PRAGMA_PREFIX = "#pragma"
+
+
+# leading `#pragma NAME ARGS...` lines, blanked out of the source so the lexer
+# never sees them and line numbers stay the same
+def split_pragmas(source: str) -> Tuple[Tuple[Tuple[str, ...], ...], str]:
+    pragmas = []
+    lines = source.split("\n")
+    for i, line in enumerate(lines):
+        stripped = line.strip()
+        if stripped.startswith(PRAGMA_PREFIX):
+            pragmas.append(tuple(stripped[len(PRAGMA_PREFIX) :].split()))
+            lines[i] = ""
+        elif stripped:
+            break
+    return tuple(pragmas), "\n".join(lines)
+
+
+# the DFA lexes keywords as identifiers, they are told apart by a table
+# lookup. Identifier names are interned, so every later lookup of a name
+# compares pointers
+def lex(text: str) -> List[Token]:
+    tokens = tokenize(io.StringIO(text), TOKENIZER, white_space_delimit=True)
+    intern = sys.intern
+    for token in tokens:
+        if token.name == "IDENTIFIER":
+            keyword = KEYWORDS.get(token.lexme)
+            if keyword is None:
+                token.lexme = intern(token.lexme)
+            else:
+                token.name = keyword.name
+                token.priority = keyword.priority
+    return tokens
+
+
+def parse(source: TextIO) -> ASTNode:
+    pragmas, text = split_pragmas(source.read())
+    tokens = lex(text)
+    ast = parse_tokens(tokens)
+    ast.pragmas = pragmas
+    return ast
+
+
+# split_pragmas for a byte buffer, returns the pragmas and the offset lexing
+# starts from. Lines are only copied while they may be pragmas
+def leading_pragmas(source: Buffer) -> Tuple[Tuple[Tuple[str, ...], ...], int]:
+    pragmas = []
+    position = 0
+    prefix = PRAGMA_PREFIX.encode()
+    while position < len(source):
+        start = position
+        while start < len(source) and source[start] in WHITE_SPACE:
+            start += 1
+        if source[start : start + len(prefix)] != prefix:
+            break
+        end = source.find(b"\n", start)
+        if end < 0:
+            end = len(source)
+        line = bytes(source[start + len(prefix) : end])
+        pragmas.append(tuple(line.decode().split()))
+        position = end + 1
+    return tuple(pragmas), min(position, len(source))
+
+
+# parses a byte buffer with the span lexer, only identifier and integer
+# text is ever decoded. A buffer mapped from path may be lexed by jobs
+# processes when it is large. Phases are timed into stats
+def parse_buffer(
+    source: Buffer,
+    path: Optional[str] = None,
+    jobs: Optional[int] = None,
+    stats: Stats = NO_STATS,
+) -> ASTNode:
+    # the DFA's tables are built on first use
+    with stats.phase("lexer-tables"):
+        span_lexer()
+    with stats.phase("lex"):
+        pragmas, position = leading_pragmas(source)
+        if path is None:
+            spans = lex_spans(source, position)
+        else:
+            spans = lex_file(path, source, position, jobs)
+    with stats.phase("parse"):
+        ast = parse_spans(spans)
+    ast.pragmas = pragmas
+    stats.count("tokens", len(spans))
+    return ast
+
+
+# parses a script with the span lexer, so statements know their lines,
+# reusing its compiled form when the source is unchanged. mapped lexes the
+# file in place from a memory map instead of reading it, which large files
+# always are. Phases are timed into stats
+def parse_file(
+    path: str,
+    mapped: bool = False,
+    jobs: Optional[int] = None,
+    stats: Stats = NO_STATS,
+) -> ASTNode:
+    if mapped or os.path.getsize(path) >= PARALLEL_THRESHOLD:
+        with mapped_file(path) as mapped_source:
+            with stats.phase("load-compiled"):
+                ast = load_compiled(path, mapped_source)
+            if ast is None:
+                ast = parse_buffer(mapped_source, path, jobs, stats)
+                with stats.phase("store-compiled"):
+                    store_compiled(path, mapped_source, ast)
+            return ast
+
+    with stats.phase("load-compiled"):
+        with open(path, "rb") as source_file:
+            source = source_file.read()
+        ast = load_compiled(path, source)
+    if ast is None:
+        ast = parse_buffer(source, stats=stats)
+        with stats.phase("store-compiled"):
+            store_compiled(path, source, ast)
+    return ast
+
+
+def lara_files(paths: List[str]) -> Iterator[str]:
+    for path in paths:
+        if os.path.isdir(path):
+            for root, dirs, files in os.walk(path):
+                dirs.sort()
+                for filename in sorted(files):
+                    if filename.endswith(".lr"):
+                        yield os.path.join(root, filename)
+        else:
+            yield path
+
+
+# compiles every .lr file under paths ahead of time, returns how many were stored
+def precompile(paths: List[str]) -> int:
+    compiled = 0
+    for path in lara_files(paths):
+        with open(path, "rb") as source_file:
+            source = source_file.read()
+        if store_compiled(path, source, parse_buffer(source)):
+            compiled += 1
+    return compiled
@@ -0,0 +1,1469 @@
+# Generated by src/parsegen.py from src/config/parser.py, do not edit.
+# Regenerate with `python -m src.parsegen` after changing the grammar.
+from typing import Callable, List, Optional, Sequence
+
+from langtools.ast.ast import ASTNode
+from langtools.lexer.token import Token
+
+from src.spans import TokenSpans
+
+
+# sets only what the parser knows, anything else ASTNode's constructor sets
+# is a class default
+class _Node(ASTNode):
+    def __init__(self, name: str, children: List[ASTNode], lexme: Optional[str] = None):
+        self.name = name
+        self.children = children
+        self.lexme = lexme
+
+
+for _name, _value in vars(ASTNode.from_dict_literal({"START": []})).items():
+    if _name not in ("name", "children", "lexme"):
+        setattr(_Node, _name, _value)
+
+
+def _no_line(index: int) -> Optional[int]:
+    return None
+
+
+class Parser:
+    # kinds are the token names, lexme gives the text of the token at an index
+    # and line the source line it starts on, when known
+    def __init__(
+        self,
+        kinds: List[str],
+        lexme: Callable[[int], Optional[str]],
+        line: Callable[[int], Optional[int]] = _no_line,
+    ):
+        self.kinds = kinds + ["EOF"]
+        self.count = len(kinds)
+        self.lexme = lexme
+        self.line = line
+        self.position = 0
+
+    def _error(self, *expected: str) -> None:
+        found = self.kinds[self.position]
+        raise Exception(
+            f"Parse error at token {self.position}: expected "
+            f"{' or '.join(expected)}, found {found}"
+        )
+
+    # the current token, already known to be of the right kind
+    def _shift(self) -> ASTNode:
+        position = self.position
+        self.position += 1
+        return _Node(self.kinds[position], [], self.lexme(position))
+
+    def _terminal(self, name: str) -> ASTNode:
+        if self.kinds[self.position] != name:
+            self._error(name)
+        return self._shift()
+
+    def _start(self) -> List[ASTNode]:
+        result: List[ASTNode] = []
+        children = result
+        state = 0
+        while True:
+            if state == 0:  # START
+                children.append(_Node("STATEMENTS", []))
+                children = children[-1].children
+                state = 1
+            elif state == 1:  # STATEMENTS
+                kind = self.kinds[self.position]
+                if kind in (
+                    "BREAK",
+                    "FOR",
+                    "FUNC",
+                    "IDENTIFIER",
+                    "IF",
+                    "LET",
+                    "PRINT",
+                    "RETURN",
+                    "WHILE",
+                ):
+                    line = self.line(self.position)
+                    children.append(_Node("STATEMENT", self._statement()))
+                    children[-1].line = line
+                    state = 1
+                elif kind in ("EOF", "RIGHT_CURLY"):
+                    return result
+                else:
+                    self._error(
+                        "BREAK",
+                        "EOF",
+                        "FOR",
+                        "FUNC",
+                        "IDENTIFIER",
+                        "IF",
+                        "LET",
+                        "PRINT",
+                        "RETURN",
+                        "RIGHT_CURLY",
+                        "WHILE",
+                    )
+
+    def _statements(self) -> List[ASTNode]:
+        result: List[ASTNode] = []
+        children = result
+        state = 0
+        while True:
+            if state == 0:  # STATEMENTS
+                kind = self.kinds[self.position]
+                if kind in (
+                    "BREAK",
+                    "FOR",
+                    "FUNC",
+                    "IDENTIFIER",
+                    "IF",
+                    "LET",
+                    "PRINT",
+                    "RETURN",
+                    "WHILE",
+                ):
+                    line = self.line(self.position)
+                    children.append(_Node("STATEMENT", self._statement()))
+                    children[-1].line = line
+                    state = 0
+                elif kind in ("EOF", "RIGHT_CURLY"):
+                    return result
+                else:
+                    self._error(
+                        "BREAK",
+                        "EOF",
+                        "FOR",
+                        "FUNC",
+                        "IDENTIFIER",
+                        "IF",
+                        "LET",
+                        "PRINT",
+                        "RETURN",
+                        "RIGHT_CURLY",
+                        "WHILE",
+                    )
+
+    def _another_statement(self) -> List[ASTNode]:
+        result: List[ASTNode] = []
+        children = result
+        state = 0
+        while True:
+            if state == 0:  # ANOTHER_STATEMENT
+                children.append(_Node("STATEMENTS", []))
+                children = children[-1].children
+                state = 1
+            elif state == 1:  # STATEMENTS
+                kind = self.kinds[self.position]
+                if kind in (
+                    "BREAK",
+                    "FOR",
+                    "FUNC",
+                    "IDENTIFIER",
+                    "IF",
+                    "LET",
+                    "PRINT",
+                    "RETURN",
+                    "WHILE",
+                ):
+                    line = self.line(self.position)
+                    children.append(_Node("STATEMENT", self._statement()))
+                    children[-1].line = line
+                    state = 1
+                elif kind in ("EOF", "RIGHT_CURLY"):
+                    return result
+                else:
+                    self._error(
+                        "BREAK",
+                        "EOF",
+                        "FOR",
+                        "FUNC",
+                        "IDENTIFIER",
+                        "IF",
+                        "LET",
+                        "PRINT",
+                        "RETURN",
+                        "RIGHT_CURLY",
+                        "WHILE",
+                    )
+
+    def _statement(self) -> List[ASTNode]:
+        result: List[ASTNode] = []
+        children = result
+        state = 0
+        while True:
+            if state == 0:  # STATEMENT
+                kind = self.kinds[self.position]
+                if kind == "LET":
+                    children.append(_Node("VAR_DEF", self._var_def()))
+                    children.append(self._terminal("SEMI_COLON"))
+                    return result
+                elif kind == "IDENTIFIER":
+                    children.append(_Node("ROOT_VAR_REF", self._root_var_ref()))
+                    children.append(self._terminal("SEMI_COLON"))
+                    return result
+                elif kind == "IF":
+                    children.append(_Node("IF_BLOCK", []))
+                    children = children[-1].children
+                    state = 1
+                elif kind == "FOR":
+                    children.append(_Node("FOR_BLOCK", []))
+                    children = children[-1].children
+                    state = 2
+                elif kind == "WHILE":
+                    children.append(_Node("WHILE_BLOCK", []))
+                    children = children[-1].children
+                    state = 3
+                elif kind == "FUNC":
+                    children.append(_Node("FUNCTION_DEF", []))
+                    children = children[-1].children
+                    state = 4
+                elif kind == "PRINT":
+                    children.append(_Node("OUTPUT", []))
+                    children = children[-1].children
+                    state = 5
+                elif kind == "RETURN":
+                    children.append(_Node("RETURN_STATEMENT", self._return_statement()))
+                    children.append(self._terminal("SEMI_COLON"))
+                    return result
+                elif kind == "BREAK":
+                    children.append(_Node("BREAK_STATEMENT", self._break_statement()))
+                    children.append(self._terminal("SEMI_COLON"))
+                    return result
+                else:
+                    self._error(
+                        "BREAK",
+                        "FOR",
+                        "FUNC",
+                        "IDENTIFIER",
+                        "IF",
+                        "LET",
+                        "PRINT",
+                        "RETURN",
+                        "WHILE",
+                    )
+            elif state == 1:  # IF_BLOCK
+                children.append(_Node("IF", self._if()))
+                state = 6
+            elif state == 2:  # FOR_BLOCK
+                children.append(self._terminal("FOR"))
+                children.append(self._terminal("LEFT_PAREN"))
+                children.append(_Node("VAR_DEF", self._var_def()))
+                children.append(self._terminal("SEMI_COLON"))
+                children.append(_Node("EXPRESSION", self._expression()))
+                children.append(self._terminal("SEMI_COLON"))
+                children.append(_Node("VAR_ASSIGN", self._var_assign()))
+                children.append(self._terminal("RIGHT_PAREN"))
+                children.append(self._terminal("LEFT_CURLY"))
+                children.append(_Node("STATEMENTS", self._statements()))
+                children.append(self._terminal("RIGHT_CURLY"))
+                return result
+            elif state == 3:  # WHILE_BLOCK
+                children.append(self._terminal("WHILE"))
+                children.append(self._terminal("LEFT_PAREN"))
+                children.append(_Node("EXPRESSION", self._expression()))
+                children.append(self._terminal("RIGHT_PAREN"))
+                children.append(self._terminal("LEFT_CURLY"))
+                children.append(_Node("STATEMENTS", self._statements()))
+                children.append(self._terminal("RIGHT_CURLY"))
+                return result
+            elif state == 4:  # FUNCTION_DEF
+                children.append(self._terminal("FUNC"))
+                children.append(self._terminal("IDENTIFIER"))
+                children.append(self._terminal("LEFT_PAREN"))
+                children.append(_Node("ARGUMENTS_DEF", self._arguments_def()))
+                children.append(self._terminal("RIGHT_PAREN"))
+                children.append(self._terminal("LEFT_CURLY"))
+                children.append(_Node("STATEMENTS", self._statements()))
+                children.append(self._terminal("RIGHT_CURLY"))
+                return result
+            elif state == 5:  # OUTPUT
+                children.append(self._terminal("PRINT"))
+                children.append(self._terminal("LEFT_PAREN"))
+                children.append(_Node("EXPRESSION", self._expression()))
+                children.append(self._terminal("RIGHT_PAREN"))
+                children.append(self._terminal("SEMI_COLON"))
+                return result
+            elif state == 6:  # IF_BLOCK_CONTINUE
+                kind = self.kinds[self.position]
+                if kind in (
+                    "BREAK",
+                    "EOF",
+                    "FOR",
+                    "FUNC",
+                    "IDENTIFIER",
+                    "IF",
+                    "LET",
+                    "PRINT",
+                    "RETURN",
+                    "RIGHT_CURLY",
+                    "WHILE",
+                ):
+                    return result
+                elif kind == "ELSE":
+                    children.append(_Node("ELSE", []))
+                    children = children[-1].children
+                    state = 7
+                elif kind == "ELIF":
+                    children.append(_Node("ELIF", self._elif()))
+                    state = 6
+                else:
+                    self._error(
+                        "BREAK",
+                        "ELIF",
+                        "ELSE",
+                        "EOF",
+                        "FOR",
+                        "FUNC",
+                        "IDENTIFIER",
+                        "IF",
+                        "LET",
+                        "PRINT",
+                        "RETURN",
+                        "RIGHT_CURLY",
+                        "WHILE",
+                    )
+            elif state == 7:  # ELSE
+                self._terminal("ELSE")
+                children.append(self._terminal("LEFT_CURLY"))
+                children.append(_Node("STATEMENTS", self._statements()))
+                children.append(self._terminal("RIGHT_CURLY"))
+                return result
+
+    def _root_var_ref(self) -> List[ASTNode]:
+        result: List[ASTNode] = []
+        children = result
+        state = 0
+        while True:
+            if state == 0:  # ROOT_VAR_REF
+                children.append(self._terminal("IDENTIFIER"))
+                children.append(_Node("ROOT_VAR_REF_OPERATOR", []))
+                children = children[-1].children
+                state = 1
+            elif state == 1:  # ROOT_VAR_REF_OPERATOR
+                kind = self.kinds[self.position]
+                if kind == "LEFT_PAREN":
+                    children.append(self._shift())
+                    children.append(_Node("ARGUMENTS", self._arguments()))
+                    children.append(self._terminal("RIGHT_PAREN"))
+                    return result
+                elif kind == "ASSIGN":
+                    children.append(self._shift())
+                    children.append(_Node("EXPRESSION", []))
+                    children = children[-1].children
+                    state = 2
+                else:
+                    self._error("ASSIGN", "LEFT_PAREN")
+            elif state == 2:  # EXPRESSION
+                children.append(_Node("OPERAND", self._operand()))
+                children.append(_Node("OPERAND_OPERATOR", []))
+                children = children[-1].children
+                state = 3
+            elif state == 3:  # OPERAND_OPERATOR
+                kind = self.kinds[self.position]
+                if kind == "GREATER":
+                    children.append(self._shift())
+                    children.append(_Node("EXPRESSION", []))
+                    children = children[-1].children
+                    state = 2
+                elif kind == "LESS":
+                    children.append(self._shift())
+                    children.append(_Node("EXPRESSION", []))
+                    children = children[-1].children
+                    state = 2
+                elif kind == "LESS_EQUAL":
+                    children.append(self._shift())
+                    children.append(_Node("EXPRESSION", []))
+                    children = children[-1].children
+                    state = 2
+                elif kind == "GREATER_EQUAL":
+                    children.append(self._shift())
+                    children.append(_Node("EXPRESSION", []))
+                    children = children[-1].children
+                    state = 2
+                elif kind in ("COMMA", "RIGHT_PAREN", "SEMI_COLON"):
+                    return result
+                else:
+                    self._error(
+                        "COMMA",
+                        "GREATER",
+                        "GREATER_EQUAL",
+                        "LESS",
+                        "LESS_EQUAL",
+                        "RIGHT_PAREN",
+                        "SEMI_COLON",
+                    )
+
+    def _root_var_ref_operator(self) -> List[ASTNode]:
+        result: List[ASTNode] = []
+        children = result
+        state = 0
+        while True:
+            if state == 0:  # ROOT_VAR_REF_OPERATOR
+                kind = self.kinds[self.position]
+                if kind == "LEFT_PAREN":
+                    children.append(self._shift())
+                    children.append(_Node("ARGUMENTS", self._arguments()))
+                    children.append(self._terminal("RIGHT_PAREN"))
+                    return result
+                elif kind == "ASSIGN":
+                    children.append(self._shift())
+                    children.append(_Node("EXPRESSION", []))
+                    children = children[-1].children
+                    state = 1
+                else:
+                    self._error("ASSIGN", "LEFT_PAREN")
+            elif state == 1:  # EXPRESSION
+                children.append(_Node("OPERAND", self._operand()))
+                children.append(_Node("OPERAND_OPERATOR", []))
+                children = children[-1].children
+                state = 2
+            elif state == 2:  # OPERAND_OPERATOR
+                kind = self.kinds[self.position]
+                if kind == "GREATER":
+                    children.append(self._shift())
+                    children.append(_Node("EXPRESSION", []))
+                    children = children[-1].children
+                    state = 1
+                elif kind == "LESS":
+                    children.append(self._shift())
+                    children.append(_Node("EXPRESSION", []))
+                    children = children[-1].children
+                    state = 1
+                elif kind == "LESS_EQUAL":
+                    children.append(self._shift())
+                    children.append(_Node("EXPRESSION", []))
+                    children = children[-1].children
+                    state = 1
+                elif kind == "GREATER_EQUAL":
+                    children.append(self._shift())
+                    children.append(_Node("EXPRESSION", []))
+                    children = children[-1].children
+                    state = 1
+                elif kind in ("COMMA", "RIGHT_PAREN", "SEMI_COLON"):
+                    return result
+                else:
+                    self._error(
+                        "COMMA",
+                        "GREATER",
+                        "GREATER_EQUAL",
+                        "LESS",
+                        "LESS_EQUAL",
+                        "RIGHT_PAREN",
+                        "SEMI_COLON",
+                    )
+
+    def _if_block(self) -> List[ASTNode]:
+        result: List[ASTNode] = []
+        children = result
+        state = 0
+        while True:
+            if state == 0:  # IF_BLOCK
+                children.append(_Node("IF", self._if()))
+                state = 1
+            elif state == 1:  # IF_BLOCK_CONTINUE
+                kind = self.kinds[self.position]
+                if kind in (
+                    "BREAK",
+                    "EOF",
+                    "FOR",
+                    "FUNC",
+                    "IDENTIFIER",
+                    "IF",
+                    "LET",
+                    "PRINT",
+                    "RETURN",
+                    "RIGHT_CURLY",
+                    "WHILE",
+                ):
+                    return result
+                elif kind == "ELSE":
+                    children.append(_Node("ELSE", []))
+                    children = children[-1].children
+                    state = 2
+                elif kind == "ELIF":
+                    children.append(_Node("ELIF", self._elif()))
+                    state = 1
+                else:
+                    self._error(
+                        "BREAK",
+                        "ELIF",
+                        "ELSE",
+                        "EOF",
+                        "FOR",
+                        "FUNC",
+                        "IDENTIFIER",
+                        "IF",
+                        "LET",
+                        "PRINT",
+                        "RETURN",
+                        "RIGHT_CURLY",
+                        "WHILE",
+                    )
+            elif state == 2:  # ELSE
+                self._terminal("ELSE")
+                children.append(self._terminal("LEFT_CURLY"))
+                children.append(_Node("STATEMENTS", self._statements()))
+                children.append(self._terminal("RIGHT_CURLY"))
+                return result
+
+    def _if_block_continue(self) -> List[ASTNode]:
+        result: List[ASTNode] = []
+        children = result
+        state = 0
+        while True:
+            if state == 0:  # IF_BLOCK_CONTINUE
+                kind = self.kinds[self.position]
+                if kind in (
+                    "BREAK",
+                    "EOF",
+                    "FOR",
+                    "FUNC",
+                    "IDENTIFIER",
+                    "IF",
+                    "LET",
+                    "PRINT",
+                    "RETURN",
+                    "RIGHT_CURLY",
+                    "WHILE",
+                ):
+                    return result
+                elif kind == "ELSE":
+                    children.append(_Node("ELSE", []))
+                    children = children[-1].children
+                    state = 1
+                elif kind == "ELIF":
+                    children.append(_Node("ELIF", self._elif()))
+                    state = 0
+                else:
+                    self._error(
+                        "BREAK",
+                        "ELIF",
+                        "ELSE",
+                        "EOF",
+                        "FOR",
+                        "FUNC",
+                        "IDENTIFIER",
+                        "IF",
+                        "LET",
+                        "PRINT",
+                        "RETURN",
+                        "RIGHT_CURLY",
+                        "WHILE",
+                    )
+            elif state == 1:  # ELSE
+                self._terminal("ELSE")
+                children.append(self._terminal("LEFT_CURLY"))
+                children.append(_Node("STATEMENTS", self._statements()))
+                children.append(self._terminal("RIGHT_CURLY"))
+                return result
+
+    def _for_block(self) -> List[ASTNode]:
+        result: List[ASTNode] = []
+        children = result
+        children.append(self._terminal("FOR"))
+        children.append(self._terminal("LEFT_PAREN"))
+        children.append(_Node("VAR_DEF", self._var_def()))
+        children.append(self._terminal("SEMI_COLON"))
+        children.append(_Node("EXPRESSION", self._expression()))
+        children.append(self._terminal("SEMI_COLON"))
+        children.append(_Node("VAR_ASSIGN", self._var_assign()))
+        children.append(self._terminal("RIGHT_PAREN"))
+        children.append(self._terminal("LEFT_CURLY"))
+        children.append(_Node("STATEMENTS", self._statements()))
+        children.append(self._terminal("RIGHT_CURLY"))
+        return result
+
+    def _while_block(self) -> List[ASTNode]:
+        result: List[ASTNode] = []
+        children = result
+        children.append(self._terminal("WHILE"))
+        children.append(self._terminal("LEFT_PAREN"))
+        children.append(_Node("EXPRESSION", self._expression()))
+        children.append(self._terminal("RIGHT_PAREN"))
+        children.append(self._terminal("LEFT_CURLY"))
+        children.append(_Node("STATEMENTS", self._statements()))
+        children.append(self._terminal("RIGHT_CURLY"))
+        return result
+
+    def _function_def(self) -> List[ASTNode]:
+        result: List[ASTNode] = []
+        children = result
+        children.append(self._terminal("FUNC"))
+        children.append(self._terminal("IDENTIFIER"))
+        children.append(self._terminal("LEFT_PAREN"))
+        children.append(_Node("ARGUMENTS_DEF", self._arguments_def()))
+        children.append(self._terminal("RIGHT_PAREN"))
+        children.append(self._terminal("LEFT_CURLY"))
+        children.append(_Node("STATEMENTS", self._statements()))
+        children.append(self._terminal("RIGHT_CURLY"))
+        return result
+
+    def _expression(self) -> List[ASTNode]:
+        result: List[ASTNode] = []
+        children = result
+        state = 0
+        while True:
+            if state == 0:  # EXPRESSION
+                children.append(_Node("OPERAND", self._operand()))
+                children.append(_Node("OPERAND_OPERATOR", []))
+                children = children[-1].children
+                state = 1
+            elif state == 1:  # OPERAND_OPERATOR
+                kind = self.kinds[self.position]
+                if kind == "GREATER":
+                    children.append(self._shift())
+                    children.append(_Node("EXPRESSION", []))
+                    children = children[-1].children
+                    state = 0
+                elif kind == "LESS":
+                    children.append(self._shift())
+                    children.append(_Node("EXPRESSION", []))
+                    children = children[-1].children
+                    state = 0
+                elif kind == "LESS_EQUAL":
+                    children.append(self._shift())
+                    children.append(_Node("EXPRESSION", []))
+                    children = children[-1].children
+                    state = 0
+                elif kind == "GREATER_EQUAL":
+                    children.append(self._shift())
+                    children.append(_Node("EXPRESSION", []))
+                    children = children[-1].children
+                    state = 0
+                elif kind in ("COMMA", "RIGHT_PAREN", "SEMI_COLON"):
+                    return result
+                else:
+                    self._error(
+                        "COMMA",
+                        "GREATER",
+                        "GREATER_EQUAL",
+                        "LESS",
+                        "LESS_EQUAL",
+                        "RIGHT_PAREN",
+                        "SEMI_COLON",
+                    )
+
+    def _operand_operator(self) -> List[ASTNode]:
+        result: List[ASTNode] = []
+        children = result
+        state = 0
+        while True:
+            if state == 0:  # OPERAND_OPERATOR
+                kind = self.kinds[self.position]
+                if kind == "GREATER":
+                    children.append(self._shift())
+                    children.append(_Node("EXPRESSION", []))
+                    children = children[-1].children
+                    state = 1
+                elif kind == "LESS":
+                    children.append(self._shift())
+                    children.append(_Node("EXPRESSION", []))
+                    children = children[-1].children
+                    state = 1
+                elif kind == "LESS_EQUAL":
+                    children.append(self._shift())
+                    children.append(_Node("EXPRESSION", []))
+                    children = children[-1].children
+                    state = 1
+                elif kind == "GREATER_EQUAL":
+                    children.append(self._shift())
+                    children.append(_Node("EXPRESSION", []))
+                    children = children[-1].children
+                    state = 1
+                elif kind in ("COMMA", "RIGHT_PAREN", "SEMI_COLON"):
+                    return result
+                else:
+                    self._error(
+                        "COMMA",
+                        "GREATER",
+                        "GREATER_EQUAL",
+                        "LESS",
+                        "LESS_EQUAL",
+                        "RIGHT_PAREN",
+                        "SEMI_COLON",
+                    )
+            elif state == 1:  # EXPRESSION
+                children.append(_Node("OPERAND", self._operand()))
+                children.append(_Node("OPERAND_OPERATOR", []))
+                children = children[-1].children
+                state = 0
+
+    def _operand(self) -> List[ASTNode]:
+        result: List[ASTNode] = []
+        children = result
+        state = 0
+        while True:
+            if state == 0:  # OPERAND
+                children.append(_Node("TERM", self._term()))
+                children.append(_Node("TERM_OPERATOR", []))
+                children = children[-1].children
+                state = 1
+            elif state == 1:  # TERM_OPERATOR
+                kind = self.kinds[self.position]
+                if kind == "PLUS":
+                    children.append(self._shift())
+                    children.append(_Node("OPERAND", []))
+                    children = children[-1].children
+                    state = 0
+                elif kind == "MINUS":
+                    children.append(self._shift())
+                    children.append(_Node("OPERAND", []))
+                    children = children[-1].children
+                    state = 0
+                elif kind in (
+                    "COMMA",
+                    "GREATER",
+                    "GREATER_EQUAL",
+                    "LESS",
+                    "LESS_EQUAL",
+                    "RIGHT_PAREN",
+                    "SEMI_COLON",
+                ):
+                    return result
+                else:
+                    self._error(
+                        "COMMA",
+                        "GREATER",
+                        "GREATER_EQUAL",
+                        "LESS",
+                        "LESS_EQUAL",
+                        "MINUS",
+                        "PLUS",
+                        "RIGHT_PAREN",
+                        "SEMI_COLON",
+                    )
+
+    def _term_operator(self) -> List[ASTNode]:
+        result: List[ASTNode] = []
+        children = result
+        state = 0
+        while True:
+            if state == 0:  # TERM_OPERATOR
+                kind = self.kinds[self.position]
+                if kind == "PLUS":
+                    children.append(self._shift())
+                    children.append(_Node("OPERAND", []))
+                    children = children[-1].children
+                    state = 1
+                elif kind == "MINUS":
+                    children.append(self._shift())
+                    children.append(_Node("OPERAND", []))
+                    children = children[-1].children
+                    state = 1
+                elif kind in (
+                    "COMMA",
+                    "GREATER",
+                    "GREATER_EQUAL",
+                    "LESS",
+                    "LESS_EQUAL",
+                    "RIGHT_PAREN",
+                    "SEMI_COLON",
+                ):
+                    return result
+                else:
+                    self._error(
+                        "COMMA",
+                        "GREATER",
+                        "GREATER_EQUAL",
+                        "LESS",
+                        "LESS_EQUAL",
+                        "MINUS",
+                        "PLUS",
+                        "RIGHT_PAREN",
+                        "SEMI_COLON",
+                    )
+            elif state == 1:  # OPERAND
+                children.append(_Node("TERM", self._term()))
+                children.append(_Node("TERM_OPERATOR", []))
+                children = children[-1].children
+                state = 0
+
+    def _term(self) -> List[ASTNode]:
+        result: List[ASTNode] = []
+        children = result
+        state = 0
+        while True:
+            if state == 0:  # TERM
+                children.append(_Node("FACTOR", self._factor()))
+                children.append(_Node("FACTOR_OPERATOR", []))
+                children = children[-1].children
+                state = 1
+            elif state == 1:  # FACTOR_OPERATOR
+                kind = self.kinds[self.position]
+                if kind == "MULTIPLY":
+                    children.append(self._shift())
+                    children.append(_Node("TERM", []))
+                    children = children[-1].children
+                    state = 0
+                elif kind == "DIVIDE":
+                    children.append(self._shift())
+                    children.append(_Node("TERM", []))
+                    children = children[-1].children
+                    state = 0
+                elif kind in (
+                    "COMMA",
+                    "GREATER",
+                    "GREATER_EQUAL",
+                    "LESS",
+                    "LESS_EQUAL",
+                    "MINUS",
+                    "PLUS",
+                    "RIGHT_PAREN",
+                    "SEMI_COLON",
+                ):
+                    return result
+                else:
+                    self._error(
+                        "COMMA",
+                        "DIVIDE",
+                        "GREATER",
+                        "GREATER_EQUAL",
+                        "LESS",
+                        "LESS_EQUAL",
+                        "MINUS",
+                        "MULTIPLY",
+                        "PLUS",
+                        "RIGHT_PAREN",
+                        "SEMI_COLON",
+                    )
+
+    def _factor_operator(self) -> List[ASTNode]:
+        result: List[ASTNode] = []
+        children = result
+        state = 0
+        while True:
+            if state == 0:  # FACTOR_OPERATOR
+                kind = self.kinds[self.position]
+                if kind == "MULTIPLY":
+                    children.append(self._shift())
+                    children.append(_Node("TERM", []))
+                    children = children[-1].children
+                    state = 1
+                elif kind == "DIVIDE":
+                    children.append(self._shift())
+                    children.append(_Node("TERM", []))
+                    children = children[-1].children
+                    state = 1
+                elif kind in (
+                    "COMMA",
+                    "GREATER",
+                    "GREATER_EQUAL",
+                    "LESS",
+                    "LESS_EQUAL",
+                    "MINUS",
+                    "PLUS",
+                    "RIGHT_PAREN",
+                    "SEMI_COLON",
+                ):
+                    return result
+                else:
+                    self._error(
+                        "COMMA",
+                        "DIVIDE",
+                        "GREATER",
+                        "GREATER_EQUAL",
+                        "LESS",
+                        "LESS_EQUAL",
+                        "MINUS",
+                        "MULTIPLY",
+                        "PLUS",
+                        "RIGHT_PAREN",
+                        "SEMI_COLON",
+                    )
+            elif state == 1:  # TERM
+                children.append(_Node("FACTOR", self._factor()))
+                children.append(_Node("FACTOR_OPERATOR", []))
+                children = children[-1].children
+                state = 0
+
+    def _factor(self) -> List[ASTNode]:
+        result: List[ASTNode] = []
+        children = result
+        state = 0
+        while True:
+            if state == 0:  # FACTOR
+                kind = self.kinds[self.position]
+                if kind == "LEFT_PAREN":
+                    children.append(self._shift())
+                    children.append(_Node("EXPRESSION", self._expression()))
+                    children.append(self._terminal("RIGHT_PAREN"))
+                    return result
+                elif kind == "INTEGER":
+                    children.append(self._shift())
+                    return result
+                elif kind == "IDENTIFIER":
+                    children.append(_Node("VAR_REF", []))
+                    children = children[-1].children
+                    state = 1
+                else:
+                    self._error("IDENTIFIER", "INTEGER", "LEFT_PAREN")
+            elif state == 1:  # VAR_REF
+                children.append(self._terminal("IDENTIFIER"))
+                children.append(_Node("CALL", []))
+                children = children[-1].children
+                state = 2
+            elif state == 2:  # CALL
+                kind = self.kinds[self.position]
+                if kind == "LEFT_PAREN":
+                    children.append(self._shift())
+                    children.append(_Node("ARGUMENTS", self._arguments()))
+                    children.append(self._terminal("RIGHT_PAREN"))
+                    return result
+                elif kind in (
+                    "COMMA",
+                    "DIVIDE",
+                    "GREATER",
+                    "GREATER_EQUAL",
+                    "LESS",
+                    "LESS_EQUAL",
+                    "MINUS",
+                    "MULTIPLY",
+                    "PLUS",
+                    "RIGHT_PAREN",
+                    "SEMI_COLON",
+                ):
+                    return result
+                else:
+                    self._error(
+                        "COMMA",
+                        "DIVIDE",
+                        "GREATER",
+                        "GREATER_EQUAL",
+                        "LEFT_PAREN",
+                        "LESS",
+                        "LESS_EQUAL",
+                        "MINUS",
+                        "MULTIPLY",
+                        "PLUS",
+                        "RIGHT_PAREN",
+                        "SEMI_COLON",
+                    )
+
+    def _var_ref(self) -> List[ASTNode]:
+        result: List[ASTNode] = []
+        children = result
+        state = 0
+        while True:
+            if state == 0:  # VAR_REF
+                children.append(self._terminal("IDENTIFIER"))
+                children.append(_Node("CALL", []))
+                children = children[-1].children
+                state = 1
+            elif state == 1:  # CALL
+                kind = self.kinds[self.position]
+                if kind == "LEFT_PAREN":
+                    children.append(self._shift())
+                    children.append(_Node("ARGUMENTS", self._arguments()))
+                    children.append(self._terminal("RIGHT_PAREN"))
+                    return result
+                elif kind in (
+                    "COMMA",
+                    "DIVIDE",
+                    "GREATER",
+                    "GREATER_EQUAL",
+                    "LESS",
+                    "LESS_EQUAL",
+                    "MINUS",
+                    "MULTIPLY",
+                    "PLUS",
+                    "RIGHT_PAREN",
+                    "SEMI_COLON",
+                ):
+                    return result
+                else:
+                    self._error(
+                        "COMMA",
+                        "DIVIDE",
+                        "GREATER",
+                        "GREATER_EQUAL",
+                        "LEFT_PAREN",
+                        "LESS",
+                        "LESS_EQUAL",
+                        "MINUS",
+                        "MULTIPLY",
+                        "PLUS",
+                        "RIGHT_PAREN",
+                        "SEMI_COLON",
+                    )
+
+    def _call(self) -> List[ASTNode]:
+        result: List[ASTNode] = []
+        children = result
+        kind = self.kinds[self.position]
+        if kind == "LEFT_PAREN":
+            children.append(self._shift())
+            children.append(_Node("ARGUMENTS", self._arguments()))
+            children.append(self._terminal("RIGHT_PAREN"))
+            return result
+        elif kind in (
+            "COMMA",
+            "DIVIDE",
+            "GREATER",
+            "GREATER_EQUAL",
+            "LESS",
+            "LESS_EQUAL",
+            "MINUS",
+            "MULTIPLY",
+            "PLUS",
+            "RIGHT_PAREN",
+            "SEMI_COLON",
+        ):
+            return result
+        else:
+            self._error(
+                "COMMA",
+                "DIVIDE",
+                "GREATER",
+                "GREATER_EQUAL",
+                "LEFT_PAREN",
+                "LESS",
+                "LESS_EQUAL",
+                "MINUS",
+                "MULTIPLY",
+                "PLUS",
+                "RIGHT_PAREN",
+                "SEMI_COLON",
+            )
+
+    def _var_def(self) -> List[ASTNode]:
+        result: List[ASTNode] = []
+        children = result
+        state = 0
+        while True:
+            if state == 0:  # VAR_DEF
+                children.append(self._terminal("LET"))
+                children.append(self._terminal("IDENTIFIER"))
+                children.append(self._terminal("ASSIGN"))
+                children.append(_Node("EXPRESSION", []))
+                children = children[-1].children
+                state = 1
+            elif state == 1:  # EXPRESSION
+                children.append(_Node("OPERAND", self._operand()))
+                children.append(_Node("OPERAND_OPERATOR", []))
+                children = children[-1].children
+                state = 2
+            elif state == 2:  # OPERAND_OPERATOR
+                kind = self.kinds[self.position]
+                if kind == "GREATER":
+                    children.append(self._shift())
+                    children.append(_Node("EXPRESSION", []))
+                    children = children[-1].children
+                    state = 1
+                elif kind == "LESS":
+                    children.append(self._shift())
+                    children.append(_Node("EXPRESSION", []))
+                    children = children[-1].children
+                    state = 1
+                elif kind == "LESS_EQUAL":
+                    children.append(self._shift())
+                    children.append(_Node("EXPRESSION", []))
+                    children = children[-1].children
+                    state = 1
+                elif kind == "GREATER_EQUAL":
+                    children.append(self._shift())
+                    children.append(_Node("EXPRESSION", []))
+                    children = children[-1].children
+                    state = 1
+                elif kind in ("COMMA", "RIGHT_PAREN", "SEMI_COLON"):
+                    return result
+                else:
+                    self._error(
+                        "COMMA",
+                        "GREATER",
+                        "GREATER_EQUAL",
+                        "LESS",
+                        "LESS_EQUAL",
+                        "RIGHT_PAREN",
+                        "SEMI_COLON",
+                    )
+
+    def _var_assign(self) -> List[ASTNode]:
+        result: List[ASTNode] = []
+        children = result
+        state = 0
+        while True:
+            if state == 0:  # VAR_ASSIGN
+                children.append(self._terminal("IDENTIFIER"))
+                children.append(self._terminal("ASSIGN"))
+                children.append(_Node("EXPRESSION", []))
+                children = children[-1].children
+                state = 1
+            elif state == 1:  # EXPRESSION
+                children.append(_Node("OPERAND", self._operand()))
+                children.append(_Node("OPERAND_OPERATOR", []))
+                children = children[-1].children
+                state = 2
+            elif state == 2:  # OPERAND_OPERATOR
+                kind = self.kinds[self.position]
+                if kind == "GREATER":
+                    children.append(self._shift())
+                    children.append(_Node("EXPRESSION", []))
+                    children = children[-1].children
+                    state = 1
+                elif kind == "LESS":
+                    children.append(self._shift())
+                    children.append(_Node("EXPRESSION", []))
+                    children = children[-1].children
+                    state = 1
+                elif kind == "LESS_EQUAL":
+                    children.append(self._shift())
+                    children.append(_Node("EXPRESSION", []))
+                    children = children[-1].children
+                    state = 1
+                elif kind == "GREATER_EQUAL":
+                    children.append(self._shift())
+                    children.append(_Node("EXPRESSION", []))
+                    children = children[-1].children
+                    state = 1
+                elif kind in ("COMMA", "RIGHT_PAREN", "SEMI_COLON"):
+                    return result
+                else:
+                    self._error(
+                        "COMMA",
+                        "GREATER",
+                        "GREATER_EQUAL",
+                        "LESS",
+                        "LESS_EQUAL",
+                        "RIGHT_PAREN",
+                        "SEMI_COLON",
+                    )
+
+    def _arguments(self) -> List[ASTNode]:
+        result: List[ASTNode] = []
+        children = result
+        state = 0
+        while True:
+            if state == 0:  # ARGUMENTS
+                kind = self.kinds[self.position]
+                if kind in ("IDENTIFIER", "INTEGER", "LEFT_PAREN"):
+                    children.append(_Node("ARGUMENT", self._argument()))
+                    state = 1
+                elif kind == "RIGHT_PAREN":
+                    return result
+                else:
+                    self._error("IDENTIFIER", "INTEGER", "LEFT_PAREN", "RIGHT_PAREN")
+            elif state == 1:  # ANOTHER_ARGUMENT
+                kind = self.kinds[self.position]
+                if kind == "COMMA":
+                    children.append(self._shift())
+                    state = 0
+                elif kind == "RIGHT_PAREN":
+                    return result
+                else:
+                    self._error("COMMA", "RIGHT_PAREN")
+
+    def _argument(self) -> List[ASTNode]:
+        result: List[ASTNode] = []
+        children = result
+        state = 0
+        while True:
+            if state == 0:  # ARGUMENT
+                children.append(_Node("EXPRESSION", []))
+                children = children[-1].children
+                state = 1
+            elif state == 1:  # EXPRESSION
+                children.append(_Node("OPERAND", self._operand()))
+                children.append(_Node("OPERAND_OPERATOR", []))
+                children = children[-1].children
+                state = 2
+            elif state == 2:  # OPERAND_OPERATOR
+                kind = self.kinds[self.position]
+                if kind == "GREATER":
+                    children.append(self._shift())
+                    children.append(_Node("EXPRESSION", []))
+                    children = children[-1].children
+                    state = 1
+                elif kind == "LESS":
+                    children.append(self._shift())
+                    children.append(_Node("EXPRESSION", []))
+                    children = children[-1].children
+                    state = 1
+                elif kind == "LESS_EQUAL":
+                    children.append(self._shift())
+                    children.append(_Node("EXPRESSION", []))
+                    children = children[-1].children
+                    state = 1
+                elif kind == "GREATER_EQUAL":
+                    children.append(self._shift())
+                    children.append(_Node("EXPRESSION", []))
+                    children = children[-1].children
+                    state = 1
+                elif kind in ("COMMA", "RIGHT_PAREN", "SEMI_COLON"):
+                    return result
+                else:
+                    self._error(
+                        "COMMA",
+                        "GREATER",
+                        "GREATER_EQUAL",
+                        "LESS",
+                        "LESS_EQUAL",
+                        "RIGHT_PAREN",
+                        "SEMI_COLON",
+                    )
+
+    def _another_argument(self) -> List[ASTNode]:
+        result: List[ASTNode] = []
+        children = result
+        state = 0
+        while True:
+            if state == 0:  # ANOTHER_ARGUMENT
+                kind = self.kinds[self.position]
+                if kind == "COMMA":
+                    children.append(self._shift())
+                    state = 1
+                elif kind == "RIGHT_PAREN":
+                    return result
+                else:
+                    self._error("COMMA", "RIGHT_PAREN")
+            elif state == 1:  # ARGUMENTS
+                kind = self.kinds[self.position]
+                if kind in ("IDENTIFIER", "INTEGER", "LEFT_PAREN"):
+                    children.append(_Node("ARGUMENT", self._argument()))
+                    state = 0
+                elif kind == "RIGHT_PAREN":
+                    return result
+                else:
+                    self._error("IDENTIFIER", "INTEGER", "LEFT_PAREN", "RIGHT_PAREN")
+
+    def _arguments_def(self) -> List[ASTNode]:
+        result: List[ASTNode] = []
+        children = result
+        state = 0
+        while True:
+            if state == 0:  # ARGUMENTS_DEF
+                kind = self.kinds[self.position]
+                if kind == "IDENTIFIER":
+                    children.append(_Node("ARGUMENT_DEF", self._argument_def()))
+                    state = 1
+                elif kind == "RIGHT_PAREN":
+                    return result
+                else:
+                    self._error("IDENTIFIER", "RIGHT_PAREN")
+            elif state == 1:  # ANOTHER_ARGUMENT_DEF
+                kind = self.kinds[self.position]
+                if kind == "COMMA":
+                    children.append(self._shift())
+                    state = 0
+                elif kind == "RIGHT_PAREN":
+                    return result
+                else:
+                    self._error("COMMA", "RIGHT_PAREN")
+
+    def _argument_def(self) -> List[ASTNode]:
+        result: List[ASTNode] = []
+        children = result
+        children.append(self._terminal("IDENTIFIER"))
+        return result
+
+    def _another_argument_def(self) -> List[ASTNode]:
+        result: List[ASTNode] = []
+        children = result
+        state = 0
+        while True:
+            if state == 0:  # ANOTHER_ARGUMENT_DEF
+                kind = self.kinds[self.position]
+                if kind == "COMMA":
+                    children.append(self._shift())
+                    state = 1
+                elif kind == "RIGHT_PAREN":
+                    return result
+                else:
+                    self._error("COMMA", "RIGHT_PAREN")
+            elif state == 1:  # ARGUMENTS_DEF
+                kind = self.kinds[self.position]
+                if kind == "IDENTIFIER":
+                    children.append(_Node("ARGUMENT_DEF", self._argument_def()))
+                    state = 0
+                elif kind == "RIGHT_PAREN":
+                    return result
+                else:
+                    self._error("IDENTIFIER", "RIGHT_PAREN")
+
+    def _if(self) -> List[ASTNode]:
+        result: List[ASTNode] = []
+        children = result
+        self._terminal("IF")
+        children.append(self._terminal("LEFT_PAREN"))
+        children.append(_Node("EXPRESSION", self._expression()))
+        children.append(self._terminal("RIGHT_PAREN"))
+        children.append(self._terminal("LEFT_CURLY"))
+        children.append(_Node("STATEMENTS", self._statements()))
+        children.append(self._terminal("RIGHT_CURLY"))
+        return result
+
+    def _elif(self) -> List[ASTNode]:
+        result: List[ASTNode] = []
+        children = result
+        self._terminal("ELIF")
+        children.append(self._terminal("LEFT_PAREN"))
+        children.append(_Node("EXPRESSION", self._expression()))
+        children.append(self._terminal("RIGHT_PAREN"))
+        children.append(self._terminal("LEFT_CURLY"))
+        children.append(_Node("STATEMENTS", self._statements()))
+        children.append(self._terminal("RIGHT_CURLY"))
+        return result
+
+    def _else(self) -> List[ASTNode]:
+        result: List[ASTNode] = []
+        children = result
+        self._terminal("ELSE")
+        children.append(self._terminal("LEFT_CURLY"))
+        children.append(_Node("STATEMENTS", self._statements()))
+        children.append(self._terminal("RIGHT_CURLY"))
+        return result
+
+    def _output(self) -> List[ASTNode]:
+        result: List[ASTNode] = []
+        children = result
+        children.append(self._terminal("PRINT"))
+        children.append(self._terminal("LEFT_PAREN"))
+        children.append(_Node("EXPRESSION", self._expression()))
+        children.append(self._terminal("RIGHT_PAREN"))
+        children.append(self._terminal("SEMI_COLON"))
+        return result
+
+    def _return_statement(self) -> List[ASTNode]:
+        result: List[ASTNode] = []
+        children = result
+        state = 0
+        while True:
+            if state == 0:  # RETURN_STATEMENT
+                children.append(self._terminal("RETURN"))
+                children.append(_Node("RETURN_VALUE", []))
+                children = children[-1].children
+                state = 1
+            elif state == 1:  # RETURN_VALUE
+                kind = self.kinds[self.position]
+                if kind in ("IDENTIFIER", "INTEGER", "LEFT_PAREN"):
+                    children.append(_Node("EXPRESSION", []))
+                    children = children[-1].children
+                    state = 2
+                elif kind == "SEMI_COLON":
+                    return result
+                else:
+                    self._error("IDENTIFIER", "INTEGER", "LEFT_PAREN", "SEMI_COLON")
+            elif state == 2:  # EXPRESSION
+                children.append(_Node("OPERAND", self._operand()))
+                children.append(_Node("OPERAND_OPERATOR", []))
+                children = children[-1].children
+                state = 3
+            elif state == 3:  # OPERAND_OPERATOR
+                kind = self.kinds[self.position]
+                if kind == "GREATER":
+                    children.append(self._shift())
+                    children.append(_Node("EXPRESSION", []))
+                    children = children[-1].children
+                    state = 2
+                elif kind == "LESS":
+                    children.append(self._shift())
+                    children.append(_Node("EXPRESSION", []))
+                    children = children[-1].children
+                    state = 2
+                elif kind == "LESS_EQUAL":
+                    children.append(self._shift())
+                    children.append(_Node("EXPRESSION", []))
+                    children = children[-1].children
+                    state = 2
+                elif kind == "GREATER_EQUAL":
+                    children.append(self._shift())
+                    children.append(_Node("EXPRESSION", []))
+                    children = children[-1].children
+                    state = 2
+                elif kind in ("COMMA", "RIGHT_PAREN", "SEMI_COLON"):
+                    return result
+                else:
+                    self._error(
+                        "COMMA",
+                        "GREATER",
+                        "GREATER_EQUAL",
+                        "LESS",
+                        "LESS_EQUAL",
+                        "RIGHT_PAREN",
+                        "SEMI_COLON",
+                    )
+
+    def _return_value(self) -> List[ASTNode]:
+        result: List[ASTNode] = []
+        children = result
+        state = 0
+        while True:
+            if state == 0:  # RETURN_VALUE
+                kind = self.kinds[self.position]
+                if kind in ("IDENTIFIER", "INTEGER", "LEFT_PAREN"):
+                    children.append(_Node("EXPRESSION", []))
+                    children = children[-1].children
+                    state = 1
+                elif kind == "SEMI_COLON":
+                    return result
+                else:
+                    self._error("IDENTIFIER", "INTEGER", "LEFT_PAREN", "SEMI_COLON")
+            elif state == 1:  # EXPRESSION
+                children.append(_Node("OPERAND", self._operand()))
+                children.append(_Node("OPERAND_OPERATOR", []))
+                children = children[-1].children
+                state = 2
+            elif state == 2:  # OPERAND_OPERATOR
+                kind = self.kinds[self.position]
+                if kind == "GREATER":
+                    children.append(self._shift())
+                    children.append(_Node("EXPRESSION", []))
+                    children = children[-1].children
+                    state = 1
+                elif kind == "LESS":
+                    children.append(self._shift())
+                    children.append(_Node("EXPRESSION", []))
+                    children = children[-1].children
+                    state = 1
+                elif kind == "LESS_EQUAL":
+                    children.append(self._shift())
+                    children.append(_Node("EXPRESSION", []))
+                    children = children[-1].children
+                    state = 1
+                elif kind == "GREATER_EQUAL":
+                    children.append(self._shift())
+                    children.append(_Node("EXPRESSION", []))
+                    children = children[-1].children
+                    state = 1
+                elif kind in ("COMMA", "RIGHT_PAREN", "SEMI_COLON"):
+                    return result
+                else:
+                    self._error(
+                        "COMMA",
+                        "GREATER",
+                        "GREATER_EQUAL",
+                        "LESS",
+                        "LESS_EQUAL",
+                        "RIGHT_PAREN",
+                        "SEMI_COLON",
+                    )
+
+    def _break_statement(self) -> List[ASTNode]:
+        result: List[ASTNode] = []
+        children = result
+        children.append(self._terminal("BREAK"))
+        return result
+
+    def parse(self) -> ASTNode:
+        start = _Node("START", self._start())
+        if self.position != self.count:
+            self._error("EOF")
+        return _Node("S-Prime", [_Node("BOF", []), start, _Node("EOF", [])])
+
+    # parses the tokens as exactly one node of the given nonterminal, which
+    # records its line
+    def parse_node(self, name: str) -> ASTNode:
+        method = getattr(self, "_" + name.lower().replace("-", "_"))
+        line = self.line(self.position)
+        node = _Node(name, method())
+        node.line = line
+        if self.position != self.count:
+            self._error("EOF")
+        return node
+
+
+def parse(tokens: Sequence[Token]) -> ASTNode:
+    tokens = list(tokens)
+    kinds = [token.name for token in tokens]
+    return Parser(kinds, lambda index: tokens[index].lexme).parse()
+
+
+def parse_spans(spans: TokenSpans) -> ASTNode:
+    return Parser(spans.kind_names(), spans.lexme, spans.line).parse()
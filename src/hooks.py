@@ -0,0 +1,109 @@
+from typing import Any, Callable, Dict, List, Optional, Union
+
+from src.nodes import For, FunctionDef, Statement, While
+from src.output import Output
+
+
+# Execution events of the tree engine, for tracers, debuggers and coverage.
+# Subclass it and override the events wanted, then pass instances to the
+# Evaluator for one run. Only the events some hook overrides are hooked, and
+# a run without hooks runs the plain evaluator
+class Hooks:
+    # before a statement runs
+    def statement(self, ast: Statement) -> None:
+        pass
+
+    # once a function's arguments are evaluated, before it runs
+    def call(self, function: FunctionDef, args: List[Any]) -> None:
+        pass
+
+    # after a function ran, with what it returned
+    def returned(self, function: FunctionDef, value: Any) -> None:
+        pass
+
+    # before every turn of a loop's body
+    def iteration(self, loop: Union[For, While]) -> None:
+        pass
+
+    # before a value is printed
+    def print(self, value: Any) -> None:
+        pass
+
+
+# the overrides of an event, in the order the hooks were given
+def _handlers(hooks: List[Hooks], event: str) -> List[Callable[..., None]]:
+    return [
+        getattr(hook, event)
+        for hook in hooks
+        if getattr(type(hook), event) is not getattr(Hooks, event)
+    ]
+
+
+# tells the print hooks about every value before passing it on
+class HookedOutput(Output):
+    def __init__(self, output: Output, handlers: List[Callable[[Any], None]]):
+        self.output = output
+        self.handlers = handlers
+
+    def write(self, value: Any) -> None:
+        for handler in self.handlers:
+            handler(value)
+        self.output.write(value)
+
+    def flush(self) -> None:
+        self.output.flush()
+
+
+# Wraps the methods of one Evaluator that the hooked events happen in, like
+# EvaluatorCounters does, and makes its functions from a subclass that
+# reports calls. A loop's body is a list of statements run once per turn, so
+# loops are recognised by their body when it is run
+def install_hooks(evaluator: Any, hooks: List[Hooks]) -> None:
+    statement_handlers = _handlers(hooks, "statement")
+    call_handlers = _handlers(hooks, "call")
+    returned_handlers = _handlers(hooks, "returned")
+    iteration_handlers = _handlers(hooks, "iteration")
+    print_handlers = _handlers(hooks, "print")
+
+    evaluate_statement = evaluator._evaluate_statement
+    evaluate_statements = evaluator._evaluate_statements
+    # loops by the id of their body, the loop keeps the body alive
+    loops: Dict[int, Union[For, While]] = {}
+
+    if statement_handlers or iteration_handlers:
+
+        def hooked_statement(ast: Statement) -> None:
+            if iteration_handlers and type(ast) in (For, While):
+                loops[id(ast.body)] = ast
+            for handler in statement_handlers:
+                handler(ast)
+            evaluate_statement(ast)
+
+        evaluator._evaluate_statement = hooked_statement
+
+    if iteration_handlers:
+
+        def hooked_statements(ast: List[Statement]) -> None:
+            loop: Optional[Union[For, While]] = loops.get(id(ast))
+            if loop is not None:
+                for handler in iteration_handlers:
+                    handler(loop)
+            evaluate_statements(ast)
+
+        evaluator._evaluate_statements = hooked_statements
+
+    if call_handlers or returned_handlers:
+
+        class HookedFunction(evaluator.function_type):
+            def __call__(self, evaluator: Any, args: List[Any]) -> Any:
+                for handler in call_handlers:
+                    handler(self.ast, args)
+                value = super().__call__(evaluator, args)
+                for handler in returned_handlers:
+                    handler(self.ast, value)
+                return value
+
+        evaluator.function_type = HookedFunction
+
+    if print_handlers:
+        evaluator.output = HookedOutput(evaluator.output, print_handlers)
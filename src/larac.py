@@ -0,0 +1,147 @@
+import gc
+import hashlib
+import marshal
+import os
+from array import array
+from typing import Dict, List, Optional, Tuple
+
+from langtools.ast.ast import ASTNode
+
+from src.cache import cache_dir, definitions_hash
+from src.spans import Buffer
+
+# bump whenever the encoding changes
+MAGIC = b"LARAC\x01"
+
+# the code that builds the parse tree, a compiled program is stale when it
+# changes
+FRONTEND_FILES = tuple(
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), name)
+    for name in ("frontend.py", "generated_parser.py", "spans.py")
+)
+
+
+# Nodes are written in postorder as (attribute set, child count) pairs, where
+# an attribute set is every attribute of the node except its children. Most
+# nodes share a handful of attribute sets, so the encoding stays small and
+# decoding is a single loop over an array
+def encode_ast(ast: ASTNode) -> bytes:
+    attribute_ids: Dict[Tuple, int] = {}
+    attributes: List[Dict] = []
+    shape = array("I")
+
+    stack: List[Tuple[ASTNode, bool]] = [(ast, False)]
+    while stack:
+        node, visited = stack.pop()
+        if not visited:
+            stack.append((node, True))
+            stack.extend((child, False) for child in reversed(node.children))
+            continue
+
+        items = tuple(
+            sorted(
+                (key, value) for key, value in vars(node).items() if key != "children"
+            )
+        )
+        if items not in attribute_ids:
+            attribute_ids[items] = len(attributes)
+            attributes.append(dict(items))
+
+        shape.append(attribute_ids[items])
+        shape.append(len(node.children))
+
+    return MAGIC + marshal.dumps((attributes, shape.tobytes()))
+
+
+def decode_ast(data: bytes) -> ASTNode:
+    if not data.startswith(MAGIC):
+        raise Exception("Not a compiled Lara program")
+
+    attributes, shape_bytes = marshal.loads(data[len(MAGIC) :])
+    shape = array("I")
+    shape.frombytes(shape_bytes)
+
+    new_node = ASTNode.__new__
+    stack: List[ASTNode] = []
+    push = stack.append
+
+    # nothing built here can form a cycle, so skip the collector's passes over
+    # the ever growing tree
+    gc_was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        for attribute_id, num_children in zip(shape[0::2], shape[1::2]):
+            node = new_node(ASTNode)
+            if num_children:
+                children = stack[-num_children:]
+                del stack[-num_children:]
+            else:
+                children = []
+            node.__dict__ = {**attributes[attribute_id], "children": children}
+            push(node)
+    finally:
+        if gc_was_enabled:
+            gc.enable()
+
+    (ast,) = stack
+    return ast
+
+
+# entries start with a hash of the script's path, so storing a new version
+# of a script can drop the old ones
+def _path_prefix(path: str) -> str:
+    return hashlib.sha256(os.path.abspath(path).encode()).hexdigest()[:16] + "-"
+
+
+def _program_path(path: str, source: Buffer) -> str:
+    digest = hashlib.sha256(source)
+    digest.update(definitions_hash().encode())
+    for frontend_path in FRONTEND_FILES:
+        with open(frontend_path, "rb") as frontend:
+            digest.update(frontend.read())
+    filename = f"{_path_prefix(path)}{digest.hexdigest()[:32]}.larac"
+    return os.path.join(cache_dir(), "programs", filename)
+
+
+def load_compiled(path: str, source: Buffer) -> Optional[ASTNode]:
+    if os.environ.get("LARA_NO_CACHE"):
+        return None
+
+    try:
+        with open(_program_path(path, source), "rb") as compiled:
+            return decode_ast(compiled.read())
+    except Exception:
+        # missing or unreadable entries are simply parsed again
+        return None
+
+
+def store_compiled(path: str, source: Buffer, ast: ASTNode) -> bool:
+    if os.environ.get("LARA_NO_CACHE"):
+        return False
+
+    entry = _program_path(path, source)
+    directory = os.path.dirname(entry)
+    try:
+        data = encode_ast(ast)
+        os.makedirs(directory, exist_ok=True)
+        # write then rename, so concurrent runs never see a partial file
+        temp_path = f"{entry}.{os.getpid()}.tmp"
+        with open(temp_path, "wb") as compiled:
+            compiled.write(data)
+        os.replace(temp_path, entry)
+    except (OSError, ValueError, TypeError):
+        # attributes marshal can't encode, or an unwritable cache
+        return False
+
+    # older versions of the script are never read again
+    prefix = _path_prefix(path)
+    try:
+        for filename in os.listdir(directory):
+            stale = os.path.join(directory, filename)
+            if filename.startswith(prefix) and filename.endswith(".larac"):
+                if stale != entry:
+                    os.remove(stale)
+    except OSError:
+        # removed by another run first, it is only tidying up
+        pass
+    return True
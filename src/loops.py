@@ -0,0 +1,624 @@
+import copy
+from typing import AbstractSet, Callable, Dict, List, Optional, Set, Tuple
+
+from langtools.ast.ast import ASTNode
+
+# (depth, slot) of a variable, relative to the frame the loop runs in
+Variable = Tuple[int, int]
+
+CHAIN_OPERATORS = {
+    "EXPRESSION": "OPERAND_OPERATOR",
+    "OPERAND": "TERM_OPERATOR",
+    "TERM": "FACTOR_OPERATOR",
+}
+LOWER = {"EXPRESSION": "OPERAND", "OPERAND": "TERM", "TERM": "FACTOR"}
+
+
+def _node(name: str, children: Optional[List[ASTNode]] = None, **attributes) -> ASTNode:
+    node = ASTNode.from_dict_literal({name: []})
+    node.children = children or []
+    for key, value in attributes.items():
+        setattr(node, key, value)
+    return node
+
+
+def _token(name: str, lexme: Optional[str] = None) -> ASTNode:
+    return _node(name, lexme=lexme)
+
+
+# wraps an EXPRESSION, OPERAND, TERM or FACTOR in the levels above it, up to level
+def _lift(ast: ASTNode, level: str = "EXPRESSION") -> ASTNode:
+    while ast.name != level:
+        upper = next(name for name, lower in LOWER.items() if lower == ast.name)
+        ast = _node(upper, [ast, _node(CHAIN_OPERATORS[upper])])
+    return ast
+
+
+def _parenthesize(ast: ASTNode) -> ASTNode:
+    return _node(
+        "FACTOR", [_token("LEFT_PAREN", "("), _lift(ast), _token("RIGHT_PAREN", ")")]
+    )
+
+
+def _variable(name: str, slot: int) -> ASTNode:
+    var_ref = _node(
+        "VAR_REF", [_token("IDENTIFIER", name), _node("CALL")], depth=0, slot=slot
+    )
+    return _node("FACTOR", [var_ref])
+
+
+def literal_value(ast: ASTNode) -> Optional[int]:
+    while ast.name != "FACTOR":
+        if ast.children[1].children:
+            return None
+        ast = ast.children[0]
+    if ast.children[0].name != "INTEGER":
+        return None
+    return int(ast.children[0].lexme)
+
+
+def assigns(node: ASTNode) -> bool:
+    return node.name == "VAR_ASSIGN" or (
+        node.name == "ROOT_VAR_REF" and node.children[1].children[0].name == "ASSIGN"
+    )
+
+
+# slots of the frame assigned from functions nested in it, which any call
+# in a loop may change
+def captured_writes(body: ASTNode) -> Set[int]:
+    captured: Set[int] = set()
+    stack: List[Tuple[ASTNode, int]] = [(body, 0)]
+    while stack:
+        node, level = stack.pop()
+        if node.name == "FUNCTION_DEF":
+            stack.append((node.children[6], level + 1))
+            continue
+        if level and assigns(node) and node.depth == level:
+            captured.add(node.slot)
+        stack.extend((child, level) for child in node.children)
+    return captured
+
+
+# the variables a loop writes and whether it calls anything, ignoring the
+# bodies of functions defined in it
+def loop_effects(parts: List[ASTNode]) -> Tuple[Set[Variable], bool]:
+    writes: Set[Variable] = set()
+    calls = False
+    stack = list(parts)
+    while stack:
+        node = stack.pop()
+        if node.name in ("VAR_DEF", "FUNCTION_DEF"):
+            writes.add((0, node.slot))
+            if node.name == "FUNCTION_DEF":
+                continue
+        elif assigns(node):
+            writes.add((node.depth, node.slot))
+        elif node.name == "VAR_REF" and node.children[1].children:
+            calls = True
+        elif node.name == "ROOT_VAR_REF":
+            calls = True
+        stack.extend(node.children)
+    return writes, calls
+
+
+# whether each node below root has the same value on every iteration.
+# Only call free integer arithmetic qualifies, and division only by a
+# non zero literal. It can still fail on operands that aren't integers, so
+# it is only moved out of code that runs whenever the loop does
+def invariance(root: ASTNode, mutable: Callable[[int, int], bool]) -> Dict[int, bool]:
+    invariant: Dict[int, bool] = {}
+    stack: List[Tuple[ASTNode, bool]] = [(root, False)]
+    while stack:
+        node, visited = stack.pop()
+        if not visited:
+            stack.append((node, True))
+            if node.name != "FUNCTION_DEF":
+                stack.extend((child, False) for child in node.children)
+            continue
+
+        if node.name == "VAR_REF":
+            result = not node.children[1].children and not mutable(
+                node.depth, node.slot
+            )
+        elif node.name in ("FUNCTION_DEF", "ROOT_VAR_REF"):
+            result = False
+        elif node.name == "FACTOR_OPERATOR" and node.children:
+            result = invariant[id(node.children[1])]
+            if node.children[0].name == "DIVIDE":
+                result = result and literal_value(node.children[1]) not in (
+                    None,
+                    0,
+                )
+        else:
+            result = all(invariant[id(child)] for child in node.children)
+        invariant[id(node)] = result
+    return invariant
+
+
+def mutability(parts: List[ASTNode], captured: Set[int]) -> Callable[[int, int], bool]:
+    writes, calls = loop_effects(parts)
+
+    def mutable(depth: int, slot: int) -> bool:
+        if (depth, slot) in writes:
+            return True
+        # a call may run a nested function that assigns the variable
+        return calls and (depth > 0 or slot in captured)
+
+    return mutable
+
+
+# whether running ast may leave the loop it is in, ignoring the bodies of
+# functions defined in it and breaks out of loops nested in it
+def leaves(ast: ASTNode) -> bool:
+    stack = [(ast, False)]
+    while stack:
+        node, nested = stack.pop()
+        if node.name == "RETURN_STATEMENT" or (
+            node.name == "BREAK_STATEMENT" and not nested
+        ):
+            return True
+        if node.name == "FUNCTION_DEF":
+            continue
+        nested = nested or node.name in ("FOR_BLOCK", "WHILE_BLOCK")
+        stack.extend((child, nested) for child in node.children)
+    return False
+
+
+# The parts of a loop evaluated on every turn: the condition and the body's
+# statements up to the first that may leave the loop, without the branches
+# and loop bodies nested in them. Also whether the body always runs to its
+# end, after which a for loop's update runs
+def each_turn(condition: ASTNode, body: ASTNode) -> Tuple[List[ASTNode], bool]:
+    parts = [condition]
+    for statement in body.children:
+        inner = statement.children[0]
+        if inner.name == "IF_BLOCK":
+            parts.append(inner.children[0].children[1])
+        elif inner.name == "FOR_BLOCK":
+            parts.extend([inner.children[2], inner.children[4]])
+        elif inner.name == "WHILE_BLOCK":
+            parts.append(inner.children[2])
+        elif inner.name != "FUNCTION_DEF":
+            parts.append(inner)
+        if leaves(inner):
+            return parts, False
+    return parts, True
+
+
+def plain_variable(ast: ASTNode) -> Optional[Variable]:
+    if ast.name == "TERM":
+        if ast.children[1].children:
+            return None
+        ast = ast.children[0]
+    if len(ast.children) != 1 or ast.children[0].name != "VAR_REF":
+        return None
+    var_ref = ast.children[0]
+    if var_ref.children[1].children:
+        return None
+    return var_ref.depth, var_ref.slot
+
+
+# Moves loop invariant expressions into variables set before the loop (licm)
+# and replaces products of a for loop's variable with a variable that is
+# advanced by addition alongside it (strength-reduction). Works on a resolved
+# tree; new variables get fresh slots in the enclosing frame. Unless they are
+# literals or the loop always runs, the variables are set in an if on the
+# loop's condition before it, so they are only computed when the loop would
+# have. The loop itself, and a for loop's variable, stay outside the if.
+class LoopOptimizer:
+    # fold evaluates a constant expression, replacing it by a literal
+    def __init__(
+        self,
+        licm: bool = True,
+        strength_reduction: bool = True,
+        fold: Callable[[ASTNode], Optional[int]] = literal_value,
+    ):
+        self.licm = licm
+        self.strength_reduction = strength_reduction
+        self.fold = fold
+        self.used_names: Set[str] = set()
+        self.next_name = 0
+        # ids of the statements defining hoisted invariants
+        self.invariant_statements: Set[int] = set()
+
+    def _fresh_name(self, prefix: str) -> str:
+        while True:
+            name = f"{prefix}{self.next_name}"
+            self.next_name += 1
+            if name not in self.used_names:
+                self.used_names.add(name)
+                return name
+
+    def _new_variable(
+        self, frame: ASTNode, prefix: str, value: ASTNode
+    ) -> Tuple[ASTNode, str, int]:
+        slot = frame.frame_size
+        frame.frame_size += 1
+        name = self._fresh_name(prefix)
+        var_def = _node(
+            "VAR_DEF",
+            [
+                _token("LET", "let"),
+                _token("IDENTIFIER", name),
+                _token("ASSIGN", "="),
+                _lift(value),
+            ],
+            slot=slot,
+        )
+        return _node("STATEMENT", [var_def, _token("SEMI_COLON", ";")]), name, slot
+
+    def _hoist(
+        self,
+        parts: List[ASTNode],
+        invariant: Dict[int, bool],
+        frame: ASTNode,
+        hoisted: List[ASTNode],
+    ) -> None:
+        stack = list(parts)
+        while stack:
+            node = stack.pop()
+            if node.name == "FUNCTION_DEF":
+                continue
+            if (
+                node.name in CHAIN_OPERATORS
+                and node.children[1].children
+                and invariant[id(node)]
+            ):
+                moved = _node(node.name, node.children)
+                statement, name, slot = self._new_variable(frame, "invariant", moved)
+                self.invariant_statements.add(id(statement))
+                hoisted.append(statement)
+                node.children = _lift(_variable(name, slot), node.name).children
+                continue
+            stack.extend(node.children)
+
+    # `i = i + step` or `i = i - step` with an invariant step
+    def _step(
+        self, var_mutation: ASTNode, invariant: Dict[int, bool]
+    ) -> Optional[Tuple[str, ASTNode]]:
+        expression = var_mutation.children[2]
+        if expression.children[1].children:
+            return None
+        term, term_operator = expression.children[0].children
+        if not term_operator.children:
+            return None
+        operator, step = term_operator.children
+        if plain_variable(term) != (var_mutation.depth, var_mutation.slot):
+            return None
+        if not invariant[id(step)]:
+            return None
+        return operator.name, step
+
+    # the factor multiplied with the loop variable, for `i * k` and `k * i`
+    def _multiplier(
+        self, term: ASTNode, induction: Variable, invariant: Dict[int, bool]
+    ) -> Optional[ASTNode]:
+        factor, factor_operator = term.children
+        if (
+            not factor_operator.children
+            or factor_operator.children[0].name != "MULTIPLY"
+        ):
+            return None
+        rhs = factor_operator.children[1]
+        if plain_variable(factor) == induction and invariant[id(rhs)]:
+            return rhs
+        if plain_variable(rhs) == induction and invariant[id(factor)]:
+            return factor
+        return None
+
+    def _reduce_strength(
+        self,
+        for_block: ASTNode,
+        invariant: Dict[int, bool],
+        frame: ASTNode,
+        hoisted: List[ASTNode],
+        captured: Set[int],
+    ) -> None:
+        var_def = for_block.children[2]
+        var_mutation = for_block.children[6]
+        induction = (0, var_def.slot)
+        if (var_mutation.depth, var_mutation.slot) != induction:
+            return
+
+        # the loop variable may only change in the for header
+        writes, calls = loop_effects([for_block.children[4], for_block.children[9]])
+        if induction in writes or (calls and var_def.slot in captured):
+            return
+        step = self._step(var_mutation, invariant)
+        if step is None:
+            return
+        operator, step_operand = step
+
+        # the initial value is evaluated again, so it must not call anything
+        _, init_calls = loop_effects([var_def.children[-1]])
+        if init_calls:
+            return
+
+        updates: List[ASTNode] = []
+        stack, _ = each_turn(for_block.children[4], for_block.children[9])
+        while stack:
+            node = stack.pop()
+            if node.name == "FUNCTION_DEF":
+                continue
+            multiplier = (
+                self._multiplier(node, induction, invariant)
+                if node.name == "TERM"
+                else None
+            )
+            if multiplier is None:
+                stack.extend(node.children)
+                continue
+
+            # t = init * k before the loop, t = t + step * k after each iteration
+            initial = self._product(var_def.children[-1], multiplier)
+            statement, name, slot = self._new_variable(frame, "induction", initial)
+            hoisted.append(statement)
+
+            increment = self._product(step_operand, multiplier)
+            value = _node(
+                "OPERAND",
+                [
+                    _lift(_variable(name, slot), "TERM"),
+                    _node(
+                        "TERM_OPERATOR",
+                        [_token(operator, operator), _lift(increment, "OPERAND")],
+                    ),
+                ],
+            )
+            root_var_ref = _node(
+                "ROOT_VAR_REF",
+                [
+                    _token("IDENTIFIER", name),
+                    _node(
+                        "ROOT_VAR_REF_OPERATOR",
+                        [_token("ASSIGN", "="), _lift(value)],
+                    ),
+                ],
+                depth=0,
+                slot=slot,
+            )
+            updates.append(
+                _node("STATEMENT", [root_var_ref, _token("SEMI_COLON", ";")])
+            )
+
+            node.children = _lift(_variable(name, slot), "TERM").children
+
+        body = for_block.children[9]
+        body.children = body.children + updates
+
+    def _literal(self, value: int) -> ASTNode:
+        return _node("FACTOR", [_token("INTEGER", str(value))])
+
+    # a TERM computing value * multiplier, simplified when either is a literal
+    def _product(self, value: ASTNode, multiplier: ASTNode) -> ASTNode:
+        value_literal = literal_value(value)
+        multiplier_literal = literal_value(multiplier)
+        if value_literal is not None and multiplier_literal is not None:
+            return _lift(self._literal(value_literal * multiplier_literal), "TERM")
+        if value_literal == 0:
+            return _lift(self._literal(0), "TERM")
+        if value_literal == 1:
+            return _lift(copy.deepcopy(multiplier), "TERM")
+        return _node(
+            "TERM",
+            [
+                _parenthesize(copy.deepcopy(value)),
+                _node(
+                    "FACTOR_OPERATOR",
+                    [_token("MULTIPLY", "*"), _lift(copy.deepcopy(multiplier), "TERM")],
+                ),
+            ],
+        )
+
+    # the loop's condition as it is first evaluated, None when evaluating it
+    # an extra time could call something
+    def _entry_condition(self, loop: ASTNode) -> Optional[ASTNode]:
+        if loop.name == "WHILE_BLOCK":
+            condition = loop.children[2]
+            if loop_effects([condition])[1]:
+                return None
+            return copy.deepcopy(condition)
+
+        var_def, condition = loop.children[2], loop.children[4]
+        initial = var_def.children[-1]
+        if loop_effects([initial, condition])[1]:
+            return None
+
+        # the loop variable holds its initial value
+        condition = copy.deepcopy(condition)
+        value = literal_value(initial)
+        stack = [condition]
+        while stack:
+            node = stack.pop()
+            if node.name == "FACTOR" and plain_variable(node) == (0, var_def.slot):
+                if value is not None:
+                    node.children = self._literal(value).children
+                else:
+                    node.children = _parenthesize(copy.deepcopy(initial)).children
+                continue
+            stack.extend(node.children)
+        return condition
+
+    # if (condition) { hoisted }
+    def _guard(
+        self, statement: ASTNode, condition: ASTNode, hoisted: List[ASTNode]
+    ) -> ASTNode:
+        branch = _node(
+            "IF",
+            [
+                _token("LEFT_PAREN", "("),
+                condition,
+                _token("RIGHT_PAREN", ")"),
+                _token("LEFT_CURLY", "{"),
+                _node("STATEMENTS", hoisted),
+                _token("RIGHT_CURLY", "}"),
+            ],
+        )
+        return _node(
+            "STATEMENT",
+            [_node("IF_BLOCK", [branch])],
+            line=getattr(statement, "line", None),
+        )
+
+    def _optimize_loop(
+        self, statement: ASTNode, frame: ASTNode, captured: Set[int]
+    ) -> List[ASTNode]:
+        loop = statement.children[0]
+        if loop.name == "FOR_BLOCK":
+            parts = [loop.children[4], loop.children[6], loop.children[9]]
+        else:
+            parts = [loop.children[2], loop.children[5]]
+        body = parts[-1]
+
+        condition = self._entry_condition(loop)
+        if condition is None:
+            return [statement]
+        entered = self.fold(condition)
+        if entered == 0:
+            return [statement]
+
+        hoisted: List[ASTNode] = []
+        if self.strength_reduction and loop.name == "FOR_BLOCK":
+            invariant = invariance(loop, mutability(parts, captured))
+            self._reduce_strength(loop, invariant, frame, hoisted, captured)
+
+        if self.licm:
+            # variables an inner loop hoisted into this body are set once, so
+            # they move further out whole when this loop doesn't change them
+            mutable = mutability(parts, captured)
+            statements = []
+            for child in body.children:
+                if id(child) in self.invariant_statements:
+                    value = child.children[0].children[-1]
+                    if invariance(value, mutable)[id(value)]:
+                        hoisted.append(child)
+                        continue
+                statements.append(child)
+            body.children = statements
+
+            mutable = mutability(parts, captured)
+            turn, completes = each_turn(parts[0], body)
+            if loop.name == "FOR_BLOCK" and completes:
+                turn.append(parts[1])
+            for part in turn:
+                self._hoist([part], invariance(part, mutable), frame, hoisted)
+
+        if entered is not None or all(
+            literal_value(child.children[0].children[-1]) is not None
+            for child in hoisted
+        ):
+            return hoisted + [statement]
+        return [self._guard(statement, condition, hoisted), statement]
+
+    def _optimize_block(self, ast: ASTNode, frame: ASTNode, captured: Set[int]) -> None:
+        assert ast.name == "STATEMENTS"
+
+        statements: List[ASTNode] = []
+        for statement in ast.children:
+            inner = statement.children[0]
+            if inner.name == "FUNCTION_DEF":
+                self._optimize_frame(inner.children[6], inner)
+            elif inner.name == "IF_BLOCK":
+                for branch in inner.children:
+                    self._optimize_block(
+                        branch.children[1 if branch.name == "ELSE" else 4],
+                        frame,
+                        captured,
+                    )
+            elif inner.name in ("FOR_BLOCK", "WHILE_BLOCK"):
+                # inner loops first, so what they hoist can move further out
+                body = inner.children[9 if inner.name == "FOR_BLOCK" else 5]
+                self._optimize_block(body, frame, captured)
+                statements.extend(self._optimize_loop(statement, frame, captured))
+                continue
+            statements.append(statement)
+        ast.children = statements
+
+    def _optimize_frame(
+        self, body: ASTNode, frame: ASTNode, captured: AbstractSet[int] = frozenset()
+    ) -> None:
+        self._optimize_block(body, frame, captured_writes(body) | captured)
+
+    # captured adds global slots assigned by functions defined outside ast,
+    # for programs optimized a statement at a time
+    def optimize(self, ast: ASTNode, captured: AbstractSet[int] = frozenset()) -> None:
+        stack = [ast]
+        while stack:
+            node = stack.pop()
+            if node.name == "IDENTIFIER":
+                self.used_names.add(node.lexme)
+            stack.extend(node.children)
+
+        self._optimize_frame(ast.children[1].children[0], ast, captured)
+
+
+class CountedLoop:
+    def __init__(self, comparison: str, bound: ASTNode, step: int):
+        # the loop runs while `i comparison bound`, then does `i = i + step`
+        self.comparison = comparison
+        self.bound = bound
+        self.step = step
+
+
+# Finds for loops shaped `for (let i = A; i < B; i = i + C)`, with any
+# comparison, a literal step going towards the bound, a bound that stays the
+# same while the loop runs and a body that never assigns i. Engines can count
+# through a range for them instead of evaluating the header every iteration.
+# Must run after the Resolver; sets `counted` on every FOR_BLOCK node, None
+# for other loops.
+class CountedLoopAnalyzer:
+    def _counted(self, for_block: ASTNode, captured: Set[int]) -> Optional[CountedLoop]:
+        var_def = for_block.children[2]
+        condition = for_block.children[4]
+        var_mutation = for_block.children[6]
+        induction = (0, var_def.slot)
+        if (var_mutation.depth, var_mutation.slot) != induction:
+            return None
+
+        operand, operand_operator = condition.children
+        if not operand_operator.children or operand.children[1].children:
+            return None
+        if plain_variable(operand.children[0]) != induction:
+            return None
+
+        parts = [condition, var_mutation, for_block.children[9]]
+        writes, calls = loop_effects([condition, for_block.children[9]])
+        if induction in writes or (calls and var_def.slot in captured):
+            return None
+
+        comparison, bound = operand_operator.children
+        invariant = invariance(for_block, mutability(parts, captured))
+        if not invariant[id(bound)]:
+            return None
+
+        expression = var_mutation.children[2]
+        if expression.children[1].children:
+            return None
+        term, term_operator = expression.children[0].children
+        if not term_operator.children or plain_variable(term) != induction:
+            return None
+        operator, step = term_operator.children
+        value = literal_value(step)
+        if value is None:
+            return None
+        if operator.name == "MINUS":
+            value = -value
+        if (value > 0) != (comparison.name in ("LESS", "LESS_EQUAL")) or not value:
+            return None
+        return CountedLoop(comparison.name, bound, value)
+
+    # captured is as for LoopOptimizer.optimize
+    def analyze(self, ast: ASTNode, captured: AbstractSet[int] = frozenset()) -> None:
+        body = ast.children[1].children[0]
+        stack: List[Tuple[ASTNode, Set[int]]] = [
+            (body, captured_writes(body) | captured)
+        ]
+        while stack:
+            node, captured = stack.pop()
+            if node.name == "FUNCTION_DEF":
+                body = node.children[6]
+                stack.append((body, captured_writes(body)))
+                continue
+            if node.name == "FOR_BLOCK":
+                node.counted = self._counted(node, captured)
+            stack.extend((child, captured) for child in node.children)
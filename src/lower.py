@@ -0,0 +1,221 @@
+from typing import List
+
+from langtools.ast.ast import ASTNode
+
+from src.loops import CountedLoopAnalyzer
+from src.nodes import (
+    Assign,
+    BinOp,
+    Break,
+    Call,
+    CheckedLoad,
+    CountedRange,
+    Expression,
+    For,
+    FunctionDef,
+    If,
+    Integer,
+    Let,
+    Load,
+    Print,
+    Program,
+    Return,
+    Statement,
+    While,
+)
+from src.purity import PurityAnalyzer
+from src.resolver import Resolver
+
+
+# Turns a resolved parse tree into the src.nodes tree the engines run
+class Lowerer:
+    def _arguments(self, ast: ASTNode) -> List[Expression]:
+        assert ast.name == "ARGUMENTS"
+        return [
+            self._expression(child.children[0])
+            for child in ast.children
+            if child.name == "ARGUMENT"
+        ]
+
+    def _factor(self, ast: ASTNode) -> Expression:
+        assert ast.name == "FACTOR"
+
+        # FACTOR -> left_paren, EXPRESSION, left_paren
+        if len(ast.children) == 3:
+            return self._expression(ast.children[1])
+        elif ast.children[0].name == "INTEGER":
+            if ast.children[0].lexme is None:
+                raise Exception("Integer node missing lexme")
+            return Integer(int(ast.children[0].lexme))
+        elif ast.children[0].name == "VAR_REF":
+            var_ref = ast.children[0]
+            name = var_ref.children[0].lexme
+            call = var_ref.children[1]
+            checked = getattr(var_ref, "checked", False)
+            if call.children:
+                arguments = self._arguments(call.children[1])
+                return Call(name, var_ref.depth, var_ref.slot, arguments, checked)
+            if checked:
+                return CheckedLoad(name, var_ref.depth, var_ref.slot)
+            return Load(name, var_ref.depth, var_ref.slot)
+        else:
+            raise Exception("Invalid factor children")
+
+    # TERM, OPERAND and EXPRESSION share the shape [lhs, OPERATOR -> op rhs],
+    # where rhs is of the same kind, so a chain is collected along its right
+    # spine in a loop
+    def _expression(self, ast: ASTNode) -> Expression:
+        if ast.name == "FACTOR":
+            return self._factor(ast)
+
+        operands: List[Expression] = []
+        operators: List[str] = []
+        while True:
+            lhs, operator = ast.children
+            operands.append(self._expression(lhs))
+            if not operator.children:
+                break
+            op, ast = operator.children
+            operators.append(op.name)
+
+        if not operators:
+            return operands[0]
+        return BinOp(operands, operators)
+
+    def _if_block(self, ast: ASTNode) -> If:
+        assert ast.name == "IF_BLOCK"
+
+        lowered = If([], None)
+        for child in ast.children:
+            if child.name in ("IF", "ELIF"):
+                lowered.branches.append(
+                    (
+                        self._expression(child.children[1]),
+                        self._statements(child.children[4]),
+                    )
+                )
+            elif child.name == "ELSE":
+                lowered.otherwise = self._statements(child.children[1])
+            else:
+                raise Exception(f"Invalid conditional branch name: {child.name}")
+        return lowered
+
+    def _for_block(self, ast: ASTNode) -> For:
+        assert ast.name == "FOR_BLOCK"
+
+        counted = None
+        loop = getattr(ast, "counted", None)
+        if loop is not None:
+            counted = CountedRange(
+                loop.comparison, self._expression(loop.bound), loop.step
+            )
+
+        init = self._statement(ast.children[2])
+        update = self._statement(ast.children[6])
+        assert isinstance(init, Let) and isinstance(update, Assign)
+        return For(
+            init,
+            self._expression(ast.children[4]),
+            update,
+            self._statements(ast.children[9]),
+            counted,
+        )
+
+    def _function_definition(self, ast: ASTNode) -> FunctionDef:
+        assert ast.name == "FUNCTION_DEF"
+
+        params = [
+            child.children[0].lexme
+            for child in ast.children[3].children
+            if child.name == "ARGUMENT_DEF"
+        ]
+        return FunctionDef(
+            ast.children[1].lexme,
+            ast.slot,
+            params,
+            ast.frame_size,
+            self._statements(ast.children[6]),
+            getattr(ast, "pure", False),
+        )
+
+    def _statement(self, ast: ASTNode) -> Statement:
+        statement = ast.children[0] if ast.name == "STATEMENT" else ast
+
+        if statement.name == "OUTPUT":
+            return Print(self._expression(statement.children[2]))
+        elif statement.name == "VAR_DEF":
+            name = statement.children[1].lexme
+            return Let(name, statement.slot, self._expression(statement.children[-1]))
+        elif statement.name == "FUNCTION_DEF":
+            return self._function_definition(statement)
+        elif statement.name == "RETURN_STATEMENT":
+            # If there is a return value provided
+            if statement.children[1].children:
+                return Return(self._expression(statement.children[1].children[0]))
+            return Return(None)
+        elif statement.name == "VAR_ASSIGN":
+            return Assign(
+                statement.children[0].lexme,
+                statement.depth,
+                statement.slot,
+                self._expression(statement.children[2]),
+            )
+        elif statement.name == "IF_BLOCK":
+            return self._if_block(statement)
+        elif statement.name == "FOR_BLOCK":
+            return self._for_block(statement)
+        elif statement.name == "ROOT_VAR_REF":
+            name = statement.children[0].lexme
+            root_var_ref_operator = statement.children[1]
+            if root_var_ref_operator.children[0].name == "LEFT_PAREN":
+                arguments = self._arguments(root_var_ref_operator.children[1])
+                return Call(
+                    name,
+                    statement.depth,
+                    statement.slot,
+                    arguments,
+                    getattr(statement, "checked", False),
+                )
+            return Assign(
+                name,
+                statement.depth,
+                statement.slot,
+                self._expression(root_var_ref_operator.children[1]),
+            )
+        elif statement.name == "BREAK_STATEMENT":
+            return Break()
+        elif statement.name == "WHILE_BLOCK":
+            return While(
+                self._expression(statement.children[2]),
+                self._statements(statement.children[5]),
+            )
+        else:
+            raise Exception(f"Invalid Statement: {statement.name}")
+
+    def _statements(self, ast: ASTNode) -> List[Statement]:
+        assert ast.name == "STATEMENTS"
+        statements = []
+        for child in ast.children:
+            statement = self._statement(child)
+            # statements the optimizer made have no line
+            statement.line = getattr(child, "line", None)
+            statements.append(statement)
+        return statements
+
+    def lower(self, ast: ASTNode) -> Program:
+        return Program(
+            self._statements(ast.children[1].children[0]),
+            ast.frame_size,
+            getattr(ast, "pragmas", ()),
+        )
+
+
+# runs the analyses the engines rely on, then lowers. Purity is only worked
+# out when memoizing
+def lower(ast: ASTNode, purity: bool = False) -> Program:
+    # undefined and duplicate symbols are reported here, before execution
+    Resolver().resolve(ast)
+    if purity:
+        PurityAnalyzer().analyze(ast)
+    CountedLoopAnalyzer().analyze(ast)
+    return Lowerer().lower(ast)
@@ -0,0 +1,106 @@
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+EVICTION_POLICIES = ("lru", "fifo")
+DEFAULT_MEMO_SIZE = 1024
+
+# returned by MemoCache.lookup when a key is not cached, since None is a
+# valid Lara return value
+MISSING = object()
+
+
+class MemoConfig:
+    # size None keeps every result
+    def __init__(self, size: Optional[int] = DEFAULT_MEMO_SIZE, eviction: str = "lru"):
+        if size is not None and size < 0:
+            raise Exception(f"Invalid memoization cache size: {size}")
+        if eviction not in EVICTION_POLICIES:
+            raise Exception(f"Unknown eviction policy: {eviction}")
+        self.size = size
+        self.eviction = eviction
+
+
+class MemoCache:
+    __slots__ = ("name", "size", "lru", "entries", "hits", "misses")
+
+    def __init__(self, name: str, config: MemoConfig):
+        self.name = name
+        self.size = config.size
+        # fifo evicts in insertion order and skips reordering on every hit
+        self.lru = config.eviction == "lru"
+        self.entries: "OrderedDict[Tuple[int, ...], Any]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def lookup(self, key: Tuple[int, ...]) -> Any:
+        value = self.entries.get(key, MISSING)
+        if value is MISSING:
+            self.misses += 1
+        else:
+            self.hits += 1
+            if self.lru:
+                self.entries.move_to_end(key)
+        return value
+
+    def store(self, key: Tuple[int, ...], value: Any) -> None:
+        self.entries[key] = value
+        if self.size is not None and len(self.entries) > self.size:
+            self.entries.popitem(last=False)
+
+
+# only calls whose arguments are all integers are memoized
+def memo_key(args: Sequence[Any]) -> Optional[Tuple[int, ...]]:
+    for arg in args:
+        if type(arg) is not int:
+            return None
+    return tuple(args)
+
+
+# hands out one cache per function value, so closures made by different calls
+# never share results, and keeps them around for reporting
+class Memoizer:
+    def __init__(self, config: MemoConfig):
+        self.config = config
+        self.caches: List[MemoCache] = []
+
+    def new_cache(self, name: str) -> MemoCache:
+        cache = MemoCache(name, self.config)
+        self.caches.append(cache)
+        return cache
+
+    # hits, misses and cached entries summed per function name
+    def stats(self) -> Dict[str, Tuple[int, int, int]]:
+        totals: Dict[str, Tuple[int, int, int]] = {}
+        for cache in self.caches:
+            hits, misses, entries = totals.get(cache.name, (0, 0, 0))
+            totals[cache.name] = (
+                hits + cache.hits,
+                misses + cache.misses,
+                entries + len(cache.entries),
+            )
+        return totals
+
+    def format_stats(self) -> str:
+        lines = [f"{'function':<20} {'hits':>10} {'misses':>10} {'entries':>10}"]
+        for name, (hits, misses, entries) in sorted(self.stats().items()):
+            lines.append(f"{name:<20} {hits:>10} {misses:>10} {entries:>10}")
+        return "\n".join(lines)
+
+
+# `#pragma memoize [SIZE] [lru|fifo]` at the top of a script turns memoization on
+def memo_config_from_pragmas(
+    pragmas: Sequence[Sequence[str]],
+) -> Optional[MemoConfig]:
+    config = None
+    for pragma in pragmas:
+        if not pragma or pragma[0] != "memoize":
+            continue
+        size: Optional[int] = DEFAULT_MEMO_SIZE
+        eviction = "lru"
+        for option in pragma[1:]:
+            if option.isdigit():
+                size = int(option) or None
+            else:
+                eviction = option
+        config = MemoConfig(size, eviction)
+    return config
@@ -0,0 +1,227 @@
+import contextlib
+import sys
+import tracemalloc
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from src.profiler import Entry, entry_label
+from src.stats import Stats
+
+DEFAULT_TOP = 5
+
+# allocations made by the tracing itself or by imports aren't the program's
+_IGNORED = (
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, __file__),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+    tracemalloc.Filter(False, "<unknown>"),
+)
+
+
+def _take_snapshot() -> tracemalloc.Snapshot:
+    return tracemalloc.take_snapshot().filter_traces(_IGNORED)
+
+
+def _kib(size: int) -> str:
+    return f"{size / 1024:.1f} KiB"
+
+
+# Live scope and function objects of the tree engine and the memory used
+# while each Lara function and statement ran. Scopes and functions are made
+# from subclasses that count themselves in and out, and statements and
+# calls are wrapped like EvaluatorCounters does, so only a profiled run pays
+# for either. An entry's peak is the most memory in use while it ran, above
+# what was in use when it started; its retained memory is what is still in
+# use once it finished, counted like the profiler's inclusive time only at
+# the outermost of recursive entries
+class EvaluatorMemory:
+    def __init__(self):
+        # live, most live, and the same in bytes, by kind of object
+        self.live: Dict[str, List[int]] = {
+            kind: [0, 0, 0, 0] for kind in ("scopes", "functions")
+        }
+        # calls, largest peak and total retained bytes by entry
+        self.entries: Dict[Entry, List[int]] = {}
+        # the open entries, what was in use when each started and its peak
+        self.stack: List[List[Any]] = []
+        self.active: Dict[Entry, int] = {}
+
+    def _created(self, kind: str, size: int) -> None:
+        live = self.live[kind]
+        live[0] += 1
+        live[1] = max(live[1], live[0])
+        live[2] += size
+        live[3] = max(live[3], live[2])
+
+    def _freed(self, kind: str, size: int) -> None:
+        live = self.live[kind]
+        live[0] -= 1
+        live[2] -= size
+
+    # the memory in use now, after folding the peak since the last sample
+    # into the innermost open entry
+    def _sample(self) -> int:
+        in_use, peak = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        if self.stack:
+            self.stack[-1][2] = max(self.stack[-1][2], peak)
+        return in_use
+
+    def enter(self, entry: Entry) -> None:
+        in_use = self._sample()
+        self.stack.append([entry, in_use, in_use])
+        self.active[entry] = self.active.get(entry, 0) + 1
+
+    def exit(self) -> None:
+        in_use = self._sample()
+        entry, start, peak = self.stack.pop()
+        stats = self.entries.get(entry)
+        if stats is None:
+            stats = self.entries[entry] = [0, 0, 0]
+        stats[0] += 1
+        stats[1] = max(stats[1], peak - start)
+        self.active[entry] -= 1
+        if not self.active[entry]:
+            stats[2] += in_use - start
+        if self.stack:
+            self.stack[-1][2] = max(self.stack[-1][2], peak)
+
+    def install(self, evaluator: Any) -> None:
+        memory = self
+
+        class TrackedScope(evaluator.scope_type):
+            __slots__ = ("size",)
+
+            def __init__(self, parent: Any, size: int):
+                super().__init__(parent, size)
+                self.size = sys.getsizeof(self) + sys.getsizeof(self.slots)
+                memory._created("scopes", self.size)
+
+            def __del__(self) -> None:
+                memory._freed("scopes", self.size)
+
+        class TrackedFunction(evaluator.function_type):
+            def __init__(self, *args: Any):
+                super().__init__(*args)
+                self.size = sys.getsizeof(self) + sys.getsizeof(self.__dict__)
+                memory._created("functions", self.size)
+
+            def __del__(self) -> None:
+                memory._freed("functions", self.size)
+
+        evaluator.scope_type = TrackedScope
+        evaluator.function_type = TrackedFunction
+        # the global scope is already there, and outlives the program
+        scope = evaluator.scope_tree
+        self._created("scopes", sys.getsizeof(scope) + sys.getsizeof(scope.slots))
+
+        evaluate_statement = evaluator._evaluate_statement
+        evaluate_call = evaluator._evaluate_call
+
+        def tracked_statement(ast: Any) -> None:
+            memory.enter(ast.line)
+            evaluate_statement(ast)
+            memory.exit()
+
+        def tracked_call(ast: Any) -> Any:
+            memory.enter(evaluator.curr_scope.get_symbol(ast.depth, ast.slot).ast)
+            value = evaluate_call(ast)
+            memory.exit()
+            return value
+
+        evaluator._evaluate_statement = tracked_statement
+        evaluator._evaluate_call = tracked_call
+
+    def report(self) -> Dict[str, Any]:
+        return {
+            "live": {
+                kind: {"now": now, "most": most, "bytes": size, "most_bytes": most_size}
+                for kind, (now, most, size, most_size) in self.live.items()
+            },
+            "entries": [
+                {
+                    "entry": entry_label(entry),
+                    "calls": calls,
+                    "peak_bytes": peak,
+                    "retained_bytes": retained,
+                }
+                for entry, (calls, peak, retained) in sorted(
+                    self.entries.items(), key=lambda item: item[1][1], reverse=True
+                )
+            ],
+        }
+
+    def format(self, limit: Optional[int] = None) -> str:
+        lines = [f"{'objects':<10} {'live':>8} {'most live':>10} {'most memory':>14}"]
+        for kind, (now, most, _, most_size) in self.live.items():
+            lines.append(f"{kind:<10} {now:>8} {most:>10} {_kib(most_size):>14}")
+        lines.append("")
+        lines.append(f"{'calls':>10} {'peak':>14} {'retained':>14}  entry")
+        for row in self.report()["entries"][:limit]:
+            lines.append(
+                f"{row['calls']:>10} {_kib(row['peak_bytes']):>14} "
+                f"{_kib(row['retained_bytes']):>14}  {row['entry']}"
+            )
+        return "\n".join(lines)
+
+
+# Stats with memory traced, and a tracemalloc snapshot taken as every phase
+# ends, to show which lines of the interpreter the memory each phase kept
+# was allocated by
+class MemoryProfile(Stats):
+    def __init__(self, top: int = DEFAULT_TOP):
+        super().__init__(trace_memory=True)
+        self.top = top
+        self.snapshots: List[Tuple[str, tracemalloc.Snapshot]] = [
+            ("start", _take_snapshot())
+        ]
+        self.evaluation: Optional[EvaluatorMemory] = None
+
+    @contextlib.contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        with super().phase(name):
+            yield
+        self.snapshots.append((name, _take_snapshot()))
+
+    # the memory in use after every phase, and the sites whose memory grew
+    # the most during it
+    def growth(self) -> List[Tuple[str, int, List[Tuple[str, int]]]]:
+        phases = []
+        for (_, before), (name, after) in zip(self.snapshots, self.snapshots[1:]):
+            in_use = sum(stat.size for stat in after.statistics("filename"))
+            sites = []
+            for stat in after.compare_to(before, "lineno")[: self.top]:
+                if stat.size_diff <= 0:
+                    break
+                frame = stat.traceback[0]
+                sites.append((f"{frame.filename}:{frame.lineno}", stat.size_diff))
+            phases.append((name, in_use, sites))
+        return phases
+
+    def report(self) -> Dict[str, Any]:
+        report = super().report()
+        report["snapshots"] = [
+            {
+                "phase": name,
+                "in_use_bytes": in_use,
+                "growth": [{"site": site, "bytes": size} for site, size in sites],
+            }
+            for name, in_use, sites in self.growth()
+        ]
+        if self.evaluation is not None:
+            report["evaluation"] = self.evaluation.report()
+        return report
+
+    def format(self, stats_format: str = "text") -> str:
+        if stats_format != "text":
+            return super().format(stats_format)
+
+        lines = [super().format(stats_format), ""]
+        for name, in_use, sites in self.growth():
+            lines.append(f"after {name}: {_kib(in_use)} in use")
+            for site, size in sites:
+                lines.append(f"  {'+' + _kib(size):>14}  {site}")
+        if self.evaluation is not None:
+            lines.append("")
+            lines.append(self.evaluation.format(self.top * 4))
+        return "\n".join(lines)
@@ -0,0 +1,199 @@
+from __future__ import annotations
+from typing import List, Optional, Tuple, Union
+
+# The tree every engine runs, lowered from the parse tree by src.lower. Only
+# what execution needs is kept: no punctuation, no empty helper nodes, and
+# names, slots and analysis results are plain attributes. Statements keep
+# the source line they start on, when the parser knew it, for the profiler.
+
+
+class Integer:
+    __slots__ = ("value",)
+
+    def __init__(self, value: int):
+        self.value = value
+
+
+class Load:
+    __slots__ = ("name", "depth", "slot")
+
+    def __init__(self, name: str, depth: int, slot: int):
+        self.name = name
+        self.depth = depth
+        self.slot = slot
+
+
+# a load of a variable that may not be initialized yet, which raises when it
+# isn't. Kept apart from Load so that other loads don't pay for the check
+class CheckedLoad(Load):
+    __slots__ = ()
+
+
+class Call:
+    __slots__ = ("name", "depth", "slot", "args", "checked", "line")
+
+    def __init__(
+        self,
+        name: str,
+        depth: int,
+        slot: int,
+        args: List[Expression],
+        checked: bool = False,
+    ):
+        self.name = name
+        self.depth = depth
+        self.slot = slot
+        self.args = args
+        # whether the function may not be defined yet
+        self.checked = checked
+        self.line: Optional[int] = None
+
+
+# a chain of operators of one precedence level, `a - b * c - d` is
+# BinOp([a, b * c, d], ["MINUS", "MINUS"]). Lara operators are right
+# associative: operands are evaluated left to right, then combined from the
+# right, a - (b * c - d)
+class BinOp:
+    __slots__ = ("operands", "operators")
+
+    def __init__(self, operands: List[Expression], operators: List[str]):
+        self.operands = operands
+        self.operators = operators
+
+
+Expression = Union[Integer, Load, Call, BinOp]
+
+
+class Print:
+    __slots__ = ("value", "line")
+
+    def __init__(self, value: Expression):
+        self.value = value
+        self.line: Optional[int] = None
+
+
+class Let:
+    __slots__ = ("name", "slot", "value", "line")
+
+    def __init__(self, name: str, slot: int, value: Expression):
+        self.name = name
+        self.slot = slot
+        self.value = value
+        self.line: Optional[int] = None
+
+
+class Assign:
+    __slots__ = ("name", "depth", "slot", "value", "line")
+
+    def __init__(self, name: str, depth: int, slot: int, value: Expression):
+        self.name = name
+        self.depth = depth
+        self.slot = slot
+        self.value = value
+        self.line: Optional[int] = None
+
+
+class Return:
+    __slots__ = ("value", "line")
+
+    def __init__(self, value: Optional[Expression]):
+        self.value = value
+        self.line: Optional[int] = None
+
+
+class Break:
+    __slots__ = ("line",)
+
+    def __init__(self) -> None:
+        self.line: Optional[int] = None
+
+
+class If:
+    __slots__ = ("branches", "otherwise", "line")
+
+    def __init__(
+        self,
+        branches: List[Tuple[Expression, List[Statement]]],
+        otherwise: Optional[List[Statement]],
+    ):
+        # (condition, body) of the if and every elif, in order
+        self.branches = branches
+        self.otherwise = otherwise
+        self.line: Optional[int] = None
+
+
+class CountedRange:
+    __slots__ = ("comparison", "bound", "step")
+
+    def __init__(self, comparison: str, bound: Expression, step: int):
+        self.comparison = comparison
+        self.bound = bound
+        self.step = step
+
+
+class For:
+    __slots__ = ("init", "condition", "update", "body", "counted", "line")
+
+    def __init__(
+        self,
+        init: Let,
+        condition: Expression,
+        update: Assign,
+        body: List[Statement],
+        counted: Optional[CountedRange],
+    ):
+        self.init = init
+        self.condition = condition
+        self.update = update
+        self.body = body
+        # set when the loop can run over a range, see CountedLoopAnalyzer
+        self.counted = counted
+        self.line: Optional[int] = None
+
+
+class While:
+    __slots__ = ("condition", "body", "line")
+
+    def __init__(self, condition: Expression, body: List[Statement]):
+        self.condition = condition
+        self.body = body
+        self.line: Optional[int] = None
+
+
+class FunctionDef:
+    __slots__ = ("name", "slot", "params", "frame_size", "body", "pure", "line")
+
+    def __init__(
+        self,
+        name: str,
+        slot: int,
+        params: List[str],
+        frame_size: int,
+        body: List[Statement],
+        pure: bool,
+    ):
+        self.name = name
+        self.slot = slot
+        self.params = params
+        self.frame_size = frame_size
+        self.body = body
+        self.pure = pure
+        self.line: Optional[int] = None
+
+
+# a call made for its side effects is a Call statement
+Statement = Union[Print, Let, Assign, Call, Return, Break, If, For, While, FunctionDef]
+
+
+class Program:
+    __slots__ = ("body", "frame_size", "pragmas")
+
+    def __init__(
+        self,
+        body: List[Statement],
+        frame_size: int,
+        pragmas: Tuple[Tuple[str, ...], ...],
+    ):
+        self.body = body
+        self.frame_size = frame_size
+        self.pragmas = pragmas
@@ -0,0 +1,208 @@
+import copy
+from typing import AbstractSet, Iterable, List, Optional
+
+from langtools.ast.ast import ASTNode
+
+from src.eval import BINARY_OPERATORS
+from src.loops import LoopOptimizer, literal_value
+from src.resolver import Resolver
+
+PASSES = ("fold", "prune", "dead-code", "strength-reduction", "licm")
+
+TERMINATORS = ("RETURN_STATEMENT", "BREAK_STATEMENT")
+
+
+# Rewrites a resolved AST in place, keeping the resolver's annotations valid so
+# every engine can run the result:
+#   fold      - constant subexpressions become integer literals
+#   prune     - if/elif/else branches and loops with constant conditions are
+#               removed or replaced by the code that always runs
+#   dead-code - statements after a return or break in the same block are dropped
+#   strength-reduction, licm - see LoopOptimizer
+class Optimizer:
+    def __init__(self, passes: Iterable[str] = PASSES):
+        self.passes = set(passes)
+        for name in self.passes:
+            if name not in PASSES:
+                raise Exception(f"Unknown optimization pass: {name}")
+        # an INTEGER node copied for every literal the folding creates
+        self.literal: Optional[ASTNode] = None
+
+    def _make_literal(self, value: int) -> ASTNode:
+        assert self.literal is not None
+        literal = copy.copy(self.literal)
+        literal.lexme = str(value)
+        literal.children = []
+        return literal
+
+    # collapses an EXPRESSION, OPERAND, TERM or FACTOR into a single literal
+    def _replace_with_literal(self, ast: ASTNode, value: int) -> None:
+        while ast.name != "FACTOR":
+            ast.children[1].children = []
+            ast = ast.children[0]
+        ast.children = [self._make_literal(value)]
+
+    def _fold_arguments(self, ast: ASTNode) -> None:
+        assert ast.name == "ARGUMENTS"
+        for child in ast.children:
+            if child.name == "ARGUMENT":
+                self._fold(child.children[0])
+
+    def _fold_factor(self, ast: ASTNode) -> Optional[int]:
+        assert ast.name == "FACTOR"
+
+        # FACTOR -> left_paren, EXPRESSION, left_paren
+        if len(ast.children) == 3:
+            value = self._fold(ast.children[1])
+            if value is not None:
+                ast.children = [self._make_literal(value)]
+            return value
+        elif ast.children[0].name == "INTEGER":
+            self.literal = ast.children[0]
+            return int(ast.children[0].lexme)
+
+        call = ast.children[0].children[1]
+        if call.children:
+            self._fold_arguments(call.children[1])
+        return None
+
+    # returns the value of a constant expression after replacing it by a literal
+    def _fold(self, ast: ASTNode) -> Optional[int]:
+        if ast.name == "FACTOR":
+            return self._fold_factor(ast)
+
+        # operators are right associative, so a chain hangs off its right
+        # spine and is folded from the innermost operation outwards
+        spine = [ast]
+        while spine[-1].children[1].children:
+            spine.append(spine[-1].children[1].children[1])
+
+        value: Optional[int] = None
+        for node in reversed(spine):
+            left = self._fold(node.children[0])
+            operator = node.children[1]
+            if not operator.children:
+                value = left
+            elif left is None or value is None:
+                value = None
+            else:
+                try:
+                    value = BINARY_OPERATORS[operator.children[0].name](left, value)
+                except ZeroDivisionError:
+                    # left for the program to fail on, if it ever runs
+                    value = None
+                else:
+                    self._replace_with_literal(node, value)
+        return value
+
+    def _fold_statement(self, statement: ASTNode) -> None:
+        if statement.name in ("OUTPUT", "VAR_ASSIGN"):
+            self._fold(statement.children[2])
+        elif statement.name == "VAR_DEF":
+            self._fold(statement.children[-1])
+        elif statement.name == "RETURN_STATEMENT":
+            if statement.children[1].children:
+                self._fold(statement.children[1].children[0])
+        elif statement.name == "ROOT_VAR_REF":
+            operator = statement.children[1]
+            if operator.children[0].name == "LEFT_PAREN":
+                self._fold_arguments(operator.children[1])
+            else:
+                self._fold(operator.children[1])
+        elif statement.name == "IF_BLOCK":
+            for branch in statement.children:
+                if branch.name != "ELSE":
+                    self._fold(branch.children[1])
+        elif statement.name == "FOR_BLOCK":
+            self._fold_statement(statement.children[2])
+            self._fold(statement.children[4])
+            self._fold_statement(statement.children[6])
+        elif statement.name == "WHILE_BLOCK":
+            self._fold(statement.children[2])
+
+    def _prune_if_block(self, ast: ASTNode, if_block: ASTNode) -> List[ASTNode]:
+        branches = []
+        for branch in if_block.children:
+            if branch.name == "ELSE":
+                branches.append(branch)
+                break
+            condition = literal_value(branch.children[1])
+            if condition == 0:
+                continue
+            branches.append(branch)
+            if condition is not None:
+                # always taken, so nothing after it can be
+                break
+
+        if not branches:
+            return []
+
+        # blocks don't open scopes, so a branch that always runs can take the
+        # place of the whole if block
+        first = branches[0]
+        if first.name == "ELSE":
+            return first.children[1].children
+        if literal_value(first.children[1]) is not None:
+            return first.children[4].children
+
+        first.name = "IF"
+        if_block.children = branches
+        return [ast]
+
+    # returns the statements that replace ast in its block
+    def _optimize_statement(self, ast: ASTNode) -> List[ASTNode]:
+        assert ast.name == "STATEMENT"
+
+        statement = ast.children[0]
+        if "fold" in self.passes:
+            self._fold_statement(statement)
+
+        if statement.name == "FUNCTION_DEF":
+            self._optimize_statements(statement.children[6])
+        elif statement.name == "IF_BLOCK":
+            for branch in statement.children:
+                self._optimize_statements(
+                    branch.children[1 if branch.name == "ELSE" else 4]
+                )
+            if "prune" in self.passes:
+                return self._prune_if_block(ast, statement)
+        elif statement.name == "FOR_BLOCK":
+            self._optimize_statements(statement.children[9])
+            if "prune" in self.passes:
+                if literal_value(statement.children[4]) == 0:
+                    # the loop variable is still defined
+                    ast.children = [statement.children[2]]
+        elif statement.name == "WHILE_BLOCK":
+            self._optimize_statements(statement.children[5])
+            if "prune" in self.passes:
+                if literal_value(statement.children[2]) == 0:
+                    return []
+
+        return [ast]
+
+    def _optimize_statements(self, ast: ASTNode) -> None:
+        assert ast.name == "STATEMENTS"
+
+        statements: List[ASTNode] = []
+        for statement in ast.children:
+            statements.extend(self._optimize_statement(statement))
+            if "dead-code" in self.passes and statements:
+                if statements[-1].children[0].name in TERMINATORS:
+                    break
+        ast.children = statements
+
+    # captured is as for LoopOptimizer.optimize
+    def optimize(
+        self, ast: ASTNode, captured: AbstractSet[int] = frozenset()
+    ) -> ASTNode:
+        # static errors are reported for the program as written, and the
+        # slots assigned here survive the rewrites
+        Resolver().resolve(ast)
+        self._optimize_statements(ast.children[1].children[0])
+        if "strength-reduction" in self.passes or "licm" in self.passes:
+            LoopOptimizer(
+                licm="licm" in self.passes,
+                strength_reduction="strength-reduction" in self.passes,
+                fold=self._fold if "fold" in self.passes else literal_value,
+            ).optimize(ast, captured)
+        return ast
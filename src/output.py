@@ -0,0 +1,86 @@
+import sys
+from typing import Any, List, Optional, Protocol
+
+DEFAULT_BUFFER_SIZE = 1 << 16
+
+
+class BinaryStream(Protocol):
+    def write(self, data: bytes) -> Any: ...
+
+    def flush(self) -> Any: ...
+
+
+# Where a program's print statements go. Engines call write() once per
+# print and flush() when the program stops
+class Output:
+    def write(self, value: Any) -> None:
+        raise NotImplementedError
+
+    def flush(self) -> None:
+        pass
+
+
+# Formats printed values into a reusable byte buffer and writes it to a
+# binary stream once it holds buffer_size bytes, or after every value when
+# line buffered
+class StreamOutput(Output):
+    def __init__(
+        self,
+        stream: BinaryStream,
+        buffer_size: int = DEFAULT_BUFFER_SIZE,
+        line_buffered: bool = False,
+    ):
+        if buffer_size < 1:
+            raise Exception(f"Invalid output buffer size: {buffer_size}")
+        self.stream = stream
+        self.buffer = bytearray()
+        self.buffer_size = 1 if line_buffered else buffer_size
+
+    def write(self, value: Any) -> None:
+        buffer = self.buffer
+        if type(value) is int:
+            buffer += b"%d\n" % value
+        else:
+            # None from functions without a return value, like print() shows it
+            buffer += f"{value}\n".encode()
+        if len(buffer) >= self.buffer_size:
+            self.flush()
+
+    def flush(self) -> None:
+        if self.buffer:
+            self.stream.write(self.buffer)
+            self.buffer.clear()
+        self.stream.flush()
+
+
+# Keeps every printed value, for embedding Lara and for tests
+class CaptureOutput(Output):
+    def __init__(self, values: Optional[List[Any]] = None):
+        self.values = values if values is not None else []
+
+    def write(self, value: Any) -> None:
+        self.values.append(value)
+
+
+# a binary stream onto whatever sys.stdout is when written to, so that
+# contextlib.redirect_stdout works as it does for print(), even with text
+# streams that have no binary buffer
+class _Stdout:
+    def write(self, data: bytes) -> None:
+        stdout = sys.stdout
+        buffer = getattr(stdout, "buffer", None)
+        if buffer is None:
+            stdout.write(data.decode())
+        else:
+            # text Python printed before comes out first
+            stdout.flush()
+            buffer.write(data)
+
+    def flush(self) -> None:
+        sys.stdout.flush()
+
+
+def stdout_output(
+    buffer_size: int = DEFAULT_BUFFER_SIZE, line_buffered: bool = False
+) -> Output:
+    return StreamOutput(_Stdout(), buffer_size, line_buffered)
@@ -0,0 +1,361 @@
+import os
+import sys
+from typing import AbstractSet, Dict, List, Optional, Sequence, Set, Tuple
+
+from langtools.parser.cfg import Epsilon, Terminal
+
+LINE_LENGTH = 88
+
+GENERATED_FILE = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "generated_parser.py"
+)
+
+HEADER = """\
+# Generated by src/parsegen.py from src/config/parser.py, do not edit.
+# Regenerate with `python -m src.parsegen` after changing the grammar.
+from typing import Callable, List, Optional, Sequence
+
+from langtools.ast.ast import ASTNode
+from langtools.lexer.token import Token
+
+from src.spans import TokenSpans
+
+
+# sets only what the parser knows, anything else ASTNode's constructor sets
+# is a class default
+class _Node(ASTNode):
+    def __init__(self, name: str, children: List[ASTNode], lexme: Optional[str] = None):
+        self.name = name
+        self.children = children
+        self.lexme = lexme
+
+
+for _name, _value in vars(ASTNode.from_dict_literal({"START": []})).items():
+    if _name not in ("name", "children", "lexme"):
+        setattr(_Node, _name, _value)
+
+
+def _no_line(index: int) -> Optional[int]:
+    return None
+
+
+class Parser:
+    # kinds are the token names, lexme gives the text of the token at an index
+    # and line the source line it starts on, when known
+    def __init__(
+        self,
+        kinds: List[str],
+        lexme: Callable[[int], Optional[str]],
+        line: Callable[[int], Optional[int]] = _no_line,
+    ):
+        self.kinds = kinds + ["EOF"]
+        self.count = len(kinds)
+        self.lexme = lexme
+        self.line = line
+        self.position = 0
+
+    def _error(self, *expected: str) -> None:
+        found = self.kinds[self.position]
+        raise Exception(
+            f"Parse error at token {self.position}: expected "
+            f"{' or '.join(expected)}, found {found}"
+        )
+
+    # the current token, already known to be of the right kind
+    def _shift(self) -> ASTNode:
+        position = self.position
+        self.position += 1
+        return _Node(self.kinds[position], [], self.lexme(position))
+
+    def _terminal(self, name: str) -> ASTNode:
+        if self.kinds[self.position] != name:
+            self._error(name)
+        return self._shift()
+"""
+
+FOOTER = """
+    def parse(self) -> ASTNode:
+        start = _Node("{start}", self.{start_method}())
+        if self.position != self.count:
+            self._error("EOF")
+        return _Node("S-Prime", [_Node("BOF", []), start, _Node("EOF", [])])
+
+    # parses the tokens as exactly one node of the given nonterminal, which
+    # records its line
+    def parse_node(self, name: str) -> ASTNode:
+        method = getattr(self, "_" + name.lower().replace("-", "_"))
+        line = self.line(self.position)
+        node = _Node(name, method())
+        node.line = line
+        if self.position != self.count:
+            self._error("EOF")
+        return node
+
+
+def parse(tokens: Sequence[Token]) -> ASTNode:
+    tokens = list(tokens)
+    kinds = [token.name for token in tokens]
+    return Parser(kinds, lambda index: tokens[index].lexme).parse()
+
+
+def parse_spans(spans: TokenSpans) -> ASTNode:
+    return Parser(spans.kind_names(), spans.lexme, spans.line).parse()
+"""
+
+Rule = Tuple[str, List[object]]
+
+
+# FIRST, FOLLOW and predict sets of a grammar, by symbol name
+class GrammarAnalysis:
+    def __init__(self, production_rules: Sequence[object], start: str):
+        self.start = start
+        self.rules: Dict[str, List[List[object]]] = {}
+        for rule in production_rules:
+            rhs = [symbol for symbol in rule.rhs if not isinstance(symbol, Epsilon)]
+            self.rules.setdefault(rule.lhs.name, []).append(rhs)
+
+        self.nullable: Set[str] = set()
+        self.first: Dict[str, Set[str]] = {name: set() for name in self.rules}
+        changed = True
+        while changed:
+            changed = False
+            for name, alternatives in self.rules.items():
+                for rhs in alternatives:
+                    first, nullable = self.first_of(rhs)
+                    if not first <= self.first[name]:
+                        self.first[name] |= first
+                        changed = True
+                    if nullable and name not in self.nullable:
+                        self.nullable.add(name)
+                        changed = True
+
+        self.follow: Dict[str, Set[str]] = {name: set() for name in self.rules}
+        self.follow[start].add("EOF")
+        changed = True
+        while changed:
+            changed = False
+            for name, alternatives in self.rules.items():
+                for rhs in alternatives:
+                    for i, symbol in enumerate(rhs):
+                        if isinstance(symbol, Terminal):
+                            continue
+                        follow, nullable = self.first_of(rhs[i + 1 :])
+                        if nullable:
+                            follow |= self.follow[name]
+                        if not follow <= self.follow[symbol.name]:
+                            self.follow[symbol.name] |= follow
+                            changed = True
+
+    def first_of(self, symbols: Sequence[object]) -> Tuple[Set[str], bool]:
+        first: Set[str] = set()
+        for symbol in symbols:
+            if isinstance(symbol, Terminal):
+                first.add(symbol.name)
+                return first, False
+            first |= self.first[symbol.name]
+            if symbol.name not in self.nullable:
+                return first, False
+        return first, True
+
+    def predict(self, name: str, rhs: Sequence[object]) -> Set[str]:
+        predict, nullable = self.first_of(rhs)
+        if nullable:
+            predict |= self.follow[name]
+        return predict
+
+    # the alternatives of a nonterminal with their predict sets, which must
+    # not overlap for a predictive parser
+    def alternatives(self, name: str) -> List[Tuple[Set[str], List[object]]]:
+        alternatives = []
+        seen: Set[str] = set()
+        for rhs in self.rules[name]:
+            predict = self.predict(name, rhs)
+            if predict & seen:
+                conflicts = ", ".join(sorted(predict & seen))
+                raise Exception(f"Grammar is not LL(1): {name} on {conflicts}")
+            seen |= predict
+            alternatives.append((predict, rhs))
+        return alternatives
+
+
+def _method(name: str) -> str:
+    return "_" + name.lower().replace("-", "_")
+
+
+def _string(name: str) -> str:
+    return f'"{name}"'
+
+
+# Writes a predictive parser with one method per nonterminal, each returning
+# the children of its node. Nodes whose children the frontend's flatten pass
+# would splice into their parent are spliced as they are built, and a
+# nonterminal at the end of an alternative continues the same method's loop
+# instead of recursing, so long statement lists, argument lists and operator
+# chains don't grow the Python stack. Nodes of the line nodes record the
+# source line they start on
+class ParserGenerator:
+    def __init__(
+        self,
+        production_rules: Sequence[object],
+        start: str,
+        flatten_rules: Dict[str, Set[str]],
+        line_nodes: AbstractSet[str] = frozenset(),
+    ):
+        self.grammar = GrammarAnalysis(production_rules, start)
+        self.flatten_rules = flatten_rules
+        self.line_nodes = line_nodes
+        self.lines: List[str] = []
+
+    def _emit(self, indent: int, line: str) -> None:
+        self.lines.append("    " * indent + line)
+
+    # emits `head item, item... tail` split the way black would, so the
+    # generated file is left alone by the formatter
+    def _emit_call(
+        self, indent: int, head: str, items: Sequence[str], tail: str
+    ) -> None:
+        line = f"{head}{', '.join(items)}{tail}"
+        if len("    " * indent + line) <= LINE_LENGTH:
+            self._emit(indent, line)
+            return
+        self._emit(indent, head)
+        body = ", ".join(items)
+        if len("    " * (indent + 1) + body) <= LINE_LENGTH:
+            self._emit(indent + 1, body)
+        else:
+            for item in items:
+                self._emit(indent + 1, f"{item},")
+        self._emit(indent, tail)
+
+    def _emit_test(self, indent: int, keyword: str, kinds: Set[str]) -> None:
+        if len(kinds) == 1:
+            self._emit(indent, f"{keyword} kind == {_string(next(iter(kinds)))}:")
+        else:
+            items = [_string(kind) for kind in sorted(kinds)]
+            self._emit_call(indent, f"{keyword} kind in (", items, "):")
+
+    # flatten splices a child into its parent when its name is listed for the
+    # parent, or is the parent's own
+    def _spliced(self, parent: str, child: str) -> bool:
+        return child == parent or child in self.flatten_rules.get(parent, set())
+
+    # the nonterminals a method may continue into, in the order first reached
+    def _states(self, name: str) -> List[str]:
+        states = [name]
+        for state in states:
+            for rhs in self.grammar.rules[state]:
+                if rhs and not isinstance(rhs[-1], Terminal):
+                    if rhs[-1].name not in states:
+                        states.append(rhs[-1].name)
+        return states
+
+    def _emit_symbol(
+        self, indent: int, parent: str, symbol: object, known: bool
+    ) -> None:
+        if isinstance(symbol, Terminal):
+            # a spliced token has no children, so it is only skipped
+            if self._spliced(parent, symbol.name):
+                if known:
+                    self._emit(indent, "self.position += 1")
+                else:
+                    self._emit(indent, f"self._terminal({_string(symbol.name)})")
+            elif known:
+                self._emit(indent, "children.append(self._shift())")
+            else:
+                terminal = f"self._terminal({_string(symbol.name)})"
+                self._emit_call(indent, "children.append(", [terminal], ")")
+        elif self._spliced(parent, symbol.name):
+            self._emit(indent, f"children.extend(self.{_method(symbol.name)}())")
+        else:
+            if symbol.name in self.line_nodes:
+                self._emit(indent, "line = self.line(self.position)")
+            call = f"_Node({_string(symbol.name)}, self.{_method(symbol.name)}())"
+            self._emit_call(indent, "children.append(", [call], ")")
+            if symbol.name in self.line_nodes:
+                self._emit(indent, "children[-1].line = line")
+
+    # emits the alternative's symbols, returns whether the state loop goes on
+    def _emit_alternative(
+        self, indent: int, parent: str, rhs: List[object], known: bool
+    ) -> Optional[str]:
+        for i, symbol in enumerate(rhs[:-1]):
+            self._emit_symbol(indent, parent, symbol, known and i == 0)
+
+        tail = rhs[-1] if rhs else None
+        if tail is None or isinstance(tail, Terminal):
+            if tail is not None:
+                self._emit_symbol(indent, parent, tail, known and len(rhs) == 1)
+            self._emit(indent, "return result")
+            return None
+
+        if not self._spliced(parent, tail.name):
+            self._emit(indent, f"children.append(_Node({_string(tail.name)}, []))")
+            self._emit(indent, "children = children[-1].children")
+        return tail.name
+
+    def _emit_state(self, indent: int, name: str, states: List[str]) -> None:
+        alternatives = self.grammar.alternatives(name)
+        expected = sorted(set().union(*(predict for predict, _ in alternatives)))
+
+        if len(alternatives) == 1:
+            ((_, rhs),) = alternatives
+            tail = self._emit_alternative(indent, name, rhs, False)
+            if tail is not None:
+                self._emit(indent, f"state = {states.index(tail)}")
+            return
+
+        self._emit(indent, "kind = self.kinds[self.position]")
+        for i, (predict, rhs) in enumerate(alternatives):
+            self._emit_test(indent, "if" if i == 0 else "elif", predict)
+            tail = self._emit_alternative(indent + 1, name, rhs, True)
+            if tail is not None:
+                self._emit(indent + 1, f"state = {states.index(tail)}")
+        self._emit(indent, "else:")
+        items = [_string(kind) for kind in expected]
+        self._emit_call(indent + 1, "self._error(", items, ")")
+
+    def _emit_method(self, name: str) -> None:
+        states = self._states(name)
+        self._emit(0, "")
+        self._emit(1, f"def {_method(name)}(self) -> List[ASTNode]:")
+        self._emit(2, "result: List[ASTNode] = []")
+        self._emit(2, "children = result")
+
+        if len(states) == 1 and all(
+            not rhs or isinstance(rhs[-1], Terminal) for rhs in self.grammar.rules[name]
+        ):
+            self._emit_state(2, name, states)
+            return
+
+        self._emit(2, "state = 0")
+        self._emit(2, "while True:")
+        for i, state in enumerate(states):
+            keyword = "if" if i == 0 else "elif"
+            self._emit(3, f"{keyword} state == {i}:  # {state}")
+            self._emit_state(4, state, states)
+
+    def generate(self) -> str:
+        self.lines = [HEADER.rstrip("\n")]
+        for name in self.grammar.rules:
+            self._emit_method(name)
+        start = self.grammar.start
+        self.lines.append(FOOTER.format(start=start, start_method=_method(start)))
+        return "\n".join(self.lines).rstrip("\n") + "\n"
+
+
+def generate() -> str:
+    from src.config.parser import PRODUCTION_RULES, START
+    from src.frontend import FLATTEN_RULES, LINE_NODES
+
+    return ParserGenerator(
+        PRODUCTION_RULES, START.name, FLATTEN_RULES, LINE_NODES
+    ).generate()
+
+
+if __name__ == "__main__":
+    source = generate()
+    if "--check" in sys.argv[1:]:
+        with open(GENERATED_FILE) as generated:
+            sys.exit(0 if generated.read() == source else 1)
+    with open(GENERATED_FILE, "w") as generated:
+        generated.write(source)
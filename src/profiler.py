@@ -0,0 +1,80 @@
+import time
+from typing import Callable, Dict, Hashable, List, Optional, Tuple
+
+from src.nodes import FunctionDef
+
+# Entries are statements keyed by their line, an int or None when unknown,
+# and functions keyed by their definition
+Entry = Hashable
+
+
+def entry_label(entry: Entry) -> str:
+    if isinstance(entry, FunctionDef):
+        return f"{entry.name}() line {'?' if entry.line is None else entry.line}"
+    return f"line {'?' if entry is None else entry}"
+
+
+# Call counts and times of the functions and statements a program runs.
+# Entries nest: a statement's time includes the functions it calls, and a
+# function's the statements it runs. Exclusive time leaves out the time
+# spent in nested entries, and inclusive time is only counted at the
+# outermost of recursive entries, so neither counts anything twice
+class Profiler:
+    def __init__(self, clock: Callable[[], float] = time.perf_counter):
+        self.clock = clock
+        # calls, inclusive and exclusive seconds by entry
+        self.entries: Dict[Entry, List[float]] = {}
+        # exclusive seconds by stack of entries, outermost first
+        self.stacks: Dict[Tuple[Entry, ...], float] = {}
+        # the open entries, when each started and the time spent in the
+        # entries nested in it so far
+        self.path: List[Entry] = []
+        self.starts: List[float] = []
+        self.nested: List[float] = []
+        self.active: Dict[Entry, int] = {}
+
+    def enter(self, entry: Entry) -> None:
+        self.path.append(entry)
+        self.nested.append(0.0)
+        self.active[entry] = self.active.get(entry, 0) + 1
+        self.starts.append(self.clock())
+
+    def exit(self) -> None:
+        elapsed = self.clock() - self.starts.pop()
+        exclusive = elapsed - self.nested.pop()
+        entry = self.path[-1]
+
+        stats = self.entries.get(entry)
+        if stats is None:
+            stats = self.entries[entry] = [0, 0.0, 0.0]
+        stats[0] += 1
+        stats[2] += exclusive
+        self.active[entry] -= 1
+        if not self.active[entry]:
+            stats[1] += elapsed
+
+        stack = tuple(self.path)
+        self.stacks[stack] = self.stacks.get(stack, 0.0) + exclusive
+        self.path.pop()
+        if self.nested:
+            self.nested[-1] += elapsed
+
+    # a table of every entry, the longest inclusive time first
+    def format_table(self, limit: Optional[int] = None) -> str:
+        rows = sorted(self.entries.items(), key=lambda item: item[1][1], reverse=True)
+        lines = [f"{'calls':>10} {'inclusive':>12} {'exclusive':>12}  entry"]
+        for entry, (calls, inclusive, exclusive) in rows[:limit]:
+            lines.append(
+                f"{calls:>10} {inclusive:>11.6f}s {exclusive:>11.6f}s  "
+                f"{entry_label(entry)}"
+            )
+        return "\n".join(lines)
+
+    # the collapsed stack format flame graph tools read, one stack per line
+    # with its exclusive time in microseconds
+    def format_stacks(self) -> str:
+        lines = []
+        for stack, seconds in self.stacks.items():
+            frames = ";".join(entry_label(entry) for entry in stack)
+            lines.append(f"{frames} {round(seconds * 1e6)}")
+        return "".join(line + "\n" for line in lines)
@@ -0,0 +1,202 @@
+from __future__ import annotations
+from typing import Dict, List, Set, Tuple
+
+from langtools.ast.ast import ASTNode
+
+# a declaration is identified by the id of the scope it lives in and its slot
+Declaration = Tuple[int, int]
+
+
+class FunctionFacts:
+    def __init__(self, ast: ASTNode, enclosing: Tuple[int, ...], position: int):
+        self.ast = ast
+        # ids of the scopes around the definition, innermost last
+        self.enclosing = enclosing
+        # how many declarations come before the definition
+        self.position = position
+        self.has_output = False
+        self.writes_outer = False
+        self.outer_reads: Set[Declaration] = set()
+        self.calls: Set[Declaration] = set()
+        self.outer_calls: Set[Declaration] = set()
+        # functions defined inside it, and its own variables read as values
+        self.nested: Set[Declaration] = set()
+        self.inner_reads: Set[Declaration] = set()
+
+
+# Finds functions whose result only depends on their arguments: no print, no
+# writes to variables outside of them, reads from outside only of variables
+# that are declared before them and never reassigned, calls only to pure
+# functions, and functions defined in them only called. Must run after the
+# Resolver; sets `pure` on every FUNCTION_DEF node.
+class PurityAnalyzer:
+    def __init__(self) -> None:
+        self.next_scope_id = 0
+        self.scopes: List[int] = []
+        self.loop_depth = 0
+        self.scope_ids: Dict[int, int] = {}
+        self.functions: Dict[Declaration, ASTNode] = {}
+        # declarations that may hold different values over time
+        self.reassigned: Set[Declaration] = set()
+        # declarations by their order in the source
+        self.positions: Dict[Declaration, int] = {}
+        self.facts: List[FunctionFacts] = []
+
+    def _new_scope(self) -> int:
+        self.next_scope_id += 1
+        return self.next_scope_id
+
+    def _declaration(self, scopes: List[int], depth: int, slot: int) -> Declaration:
+        return scopes[-1 - depth], slot
+
+    def _declare(self, slot: int) -> Declaration:
+        declaration = (self.scopes[-1], slot)
+        self.positions[declaration] = len(self.positions)
+        # a let or func inside a loop is executed again on every iteration
+        if self.loop_depth:
+            self.reassigned.add(declaration)
+        return declaration
+
+    def _statements(self, ast: ASTNode) -> List[ASTNode]:
+        assert ast.name == "STATEMENTS"
+        return [statement.children[0] for statement in ast.children]
+
+    # the blocks directly nested in a statement, with whether they loop
+    def _blocks(self, statement: ASTNode) -> List[Tuple[ASTNode, bool]]:
+        if statement.name == "IF_BLOCK":
+            return [
+                (branch.children[1 if branch.name == "ELSE" else 4], False)
+                for branch in statement.children
+            ]
+        if statement.name == "FOR_BLOCK":
+            return [(statement.children[9], True)]
+        if statement.name == "WHILE_BLOCK":
+            return [(statement.children[5], True)]
+        return []
+
+    def _collect(self, ast: ASTNode) -> None:
+        for statement in self._statements(ast):
+            if statement.name == "VAR_DEF":
+                self._declare(statement.slot)
+            elif statement.name == "FUNCTION_DEF":
+                self.functions[self._declare(statement.slot)] = statement
+                self.facts.append(
+                    FunctionFacts(statement, tuple(self.scopes), len(self.positions))
+                )
+
+                scope_id = self._new_scope()
+                self.scope_ids[id(statement)] = scope_id
+                self.scopes.append(scope_id)
+                loop_depth, self.loop_depth = self.loop_depth, 0
+                self._collect(statement.children[6])
+                self.loop_depth = loop_depth
+                self.scopes.pop()
+            elif statement.name in ("VAR_ASSIGN", "ROOT_VAR_REF"):
+                if statement.name == "VAR_ASSIGN" or (
+                    statement.children[1].children[0].name == "ASSIGN"
+                ):
+                    self.reassigned.add(
+                        self._declaration(self.scopes, statement.depth, statement.slot)
+                    )
+            elif statement.name == "FOR_BLOCK":
+                self._declare(statement.children[2].slot)
+                var_mutation = statement.children[6]
+                self.reassigned.add(
+                    self._declaration(
+                        self.scopes, var_mutation.depth, var_mutation.slot
+                    )
+                )
+
+            for block, loops in self._blocks(statement):
+                self.loop_depth += loops
+                self._collect(block)
+                self.loop_depth -= loops
+
+    def _references(self, facts: FunctionFacts) -> None:
+        scopes = list(facts.enclosing) + [self.scope_ids[id(facts.ast)]]
+        outside = len(facts.enclosing)
+
+        def record(node: ASTNode, call: bool) -> None:
+            index = len(scopes) - 1 - node.depth
+            declaration = (scopes[index], node.slot)
+            if call:
+                facts.calls.add(declaration)
+                if index < outside:
+                    facts.outer_calls.add(declaration)
+            elif index < outside:
+                facts.outer_reads.add(declaration)
+            else:
+                facts.inner_reads.add(declaration)
+
+        stack: List[ASTNode] = [facts.ast.children[6]]
+        # None marks the end of a nested function's body
+        while stack:
+            node = stack.pop()
+            if node is None:
+                scopes.pop()
+                continue
+
+            if node.name == "OUTPUT":
+                facts.has_output = True
+            elif node.name == "FUNCTION_DEF" and node is not facts.ast:
+                facts.nested.add((scopes[-1], node.slot))
+                scopes.append(self.scope_ids[id(node)])
+                stack.append(None)  # type: ignore
+                stack.append(node.children[6])
+                continue
+            elif node.name in ("VAR_ASSIGN", "ROOT_VAR_REF"):
+                assigns = node.name == "VAR_ASSIGN" or (
+                    node.children[1].children[0].name == "ASSIGN"
+                )
+                if assigns and len(scopes) - 1 - node.depth < outside:
+                    facts.writes_outer = True
+                elif not assigns:
+                    record(node, True)
+            elif node.name == "VAR_REF":
+                record(node, bool(node.children[1].children))
+
+            stack.extend(node.children)
+
+    def _locally_pure(self, facts: FunctionFacts) -> bool:
+        if facts.has_output or facts.writes_outer:
+            return False
+        if facts.outer_reads & self.reassigned:
+            return False
+        # a function defined inside it that is used as a value may be
+        # returned, and every call has to make a new one with its own state
+        if facts.nested & facts.inner_reads:
+            return False
+        # a variable declared after the function changes from unset to its
+        # value, between calls made before and after the declaration
+        if any(self.positions[read] >= facts.position for read in facts.outer_reads):
+            return False
+        # whatever is called has to be a function that is never rebound
+        return all(
+            call in self.functions and call not in self.reassigned
+            for call in facts.calls
+        )
+
+    def analyze(self, ast: ASTNode) -> None:
+        self.scopes.append(self._new_scope())
+        self._collect(ast.children[1].children[0])
+
+        for facts in self.facts:
+            self._references(facts)
+
+        # start from every candidate and drop callers of impure functions
+        # until nothing changes, so recursive functions can be pure
+        pure = {
+            id(facts.ast): facts for facts in self.facts if self._locally_pure(facts)
+        }
+        changed = True
+        while changed:
+            changed = False
+            for key, facts in list(pure.items()):
+                if any(
+                    id(self.functions[call]) not in pure for call in facts.outer_calls
+                ):
+                    del pure[key]
+                    changed = True
+
+        for facts in self.facts:
+            facts.ast.pure = id(facts.ast) in pure
@@ -0,0 +1,268 @@
+from __future__ import annotations
+from typing import Dict, List, Optional, Set, Tuple
+
+from langtools.ast.ast import ASTNode
+
+
+class ResolverScope:
+    def __init__(self, parent: Optional[ResolverScope]):
+        self.parent = parent
+        self.slots: Dict[str, int] = {}
+        # the slots certainly set where resolution is, the others may still
+        # be unset when they are read
+        self.initialized: Set[int] = set()
+        # function bodies are resolved once the enclosing scope is complete,
+        # so that functions may refer to symbols defined after them, with
+        # the slots that were initialized around their definition
+        self.pending: List[Tuple[ASTNode, List[Set[int]]]] = []
+
+    def declare(self, identifier: str) -> int:
+        if identifier in self.slots:
+            raise Exception(f"Duplicate definition of symbol: {identifier}")
+        slot = len(self.slots)
+        self.slots[identifier] = slot
+        return slot
+
+    def lookup(self, identifier: str) -> Optional[Tuple[int, int]]:
+        depth = 0
+        scope: Optional[ResolverScope] = self
+        while scope is not None:
+            if identifier in scope.slots:
+                return depth, scope.slots[identifier]
+            scope = scope.parent
+            depth += 1
+        return None
+
+    def is_initialized(self, depth: int, slot: int) -> bool:
+        scope = self
+        for _ in range(depth):
+            assert scope.parent is not None
+            scope = scope.parent
+        return slot in scope.initialized
+
+    # the initialized slots of this scope and the ones around it
+    def snapshot(self) -> List[Set[int]]:
+        initialized = []
+        scope: Optional[ResolverScope] = self
+        while scope is not None:
+            initialized.append(set(scope.initialized))
+            scope = scope.parent
+        return initialized
+
+
+# Static pass giving every identifier a (depth, slot) address, where depth is
+# the number of frames to walk up and slot an index into that frame's slots.
+# Addresses are stored on the nodes that use them:
+#   VAR_DEF, FUNCTION_DEF -> slot
+#   VAR_REF, VAR_ASSIGN, ROOT_VAR_REF -> depth, slot
+#   FUNCTION_DEF -> frame_size
+# Reads and calls also get `checked`, set when what they use may not be
+# initialized yet: a declaration skipped by a branch or a loop, or made
+# after the function that reads it. The engines raise on those when unset
+class Resolver:
+    def __init__(self) -> None:
+        self.scope: Optional[ResolverScope] = None
+        self.in_function = False
+        self.loop_depth = 0
+
+    def _lookup(self, identifier: ASTNode, message: str) -> Tuple[int, int]:
+        if identifier.lexme is None:
+            raise Exception("Identifier lexme is missing")
+
+        assert self.scope is not None
+        address = self.scope.lookup(identifier.lexme)
+        if address is None:
+            raise Exception(f"{message} {identifier.lexme}")
+        return address
+
+    def _declare(self, identifier: ASTNode) -> int:
+        if identifier.lexme is None:
+            raise Exception("Identifier lexme is missing")
+
+        assert self.scope is not None
+        return self.scope.declare(identifier.lexme)
+
+    def _resolve_scope(self, statements: ASTNode, params: List[ASTNode]) -> int:
+        self.scope = ResolverScope(self.scope)
+        for param in params:
+            self.scope.initialized.add(self._declare(param))
+
+        self._resolve_statements(statements)
+        self.resolve_pending()
+
+        frame_size = len(self.scope.slots)
+        self.scope = self.scope.parent
+        return frame_size
+
+    # resolves the function bodies waiting in the current scope, each seeing
+    # what was initialized when it was defined
+    def resolve_pending(self) -> None:
+        assert self.scope is not None
+        current = self.scope.snapshot()
+        while self.scope.pending:
+            ast, initialized = self.scope.pending.pop(0)
+            self._set_initialized(initialized)
+            self._resolve_function_body(ast)
+        self._set_initialized(current)
+
+    def _set_initialized(self, initialized: List[Set[int]]) -> None:
+        scope = self.scope
+        for slots in initialized:
+            assert scope is not None
+            scope.initialized = set(slots)
+            scope = scope.parent
+
+    def _resolve_function_body(self, ast: ASTNode) -> None:
+        assert ast.name == "FUNCTION_DEF"
+
+        params = [
+            child.children[0]
+            for child in ast.children[3].children
+            if child.name == "ARGUMENT_DEF"
+        ]
+
+        in_function, loop_depth = self.in_function, self.loop_depth
+        self.in_function, self.loop_depth = True, 0
+        ast.frame_size = self._resolve_scope(ast.children[6], params)
+        self.in_function, self.loop_depth = in_function, loop_depth
+
+    # iterative, so long operator chains don't exhaust the Python stack
+    def _resolve_expression(self, ast: ASTNode) -> None:
+        stack = [ast]
+        while stack:
+            node = stack.pop()
+            if node.name == "VAR_REF":
+                identifier, call = node.children
+                node.depth, node.slot = self._lookup(
+                    identifier, "Use of undefined symbol"
+                )
+                node.checked = not self._is_initialized(node)
+                stack.extend(call.children)
+            else:
+                stack.extend(node.children)
+
+    def _is_initialized(self, node: ASTNode) -> bool:
+        assert self.scope is not None
+        return self.scope.is_initialized(node.depth, node.slot)
+
+    # a block may not run, so what it initializes is only certain inside it
+    def _resolve_block(self, ast: ASTNode) -> Set[int]:
+        assert self.scope is not None
+        initialized = self.scope.initialized
+        self.scope.initialized = set(initialized)
+        self._resolve_statements(ast)
+        block_initialized = self.scope.initialized
+        self.scope.initialized = initialized
+        return block_initialized
+
+    def _resolve_loop_body(self, ast: ASTNode) -> None:
+        self.loop_depth += 1
+        self._resolve_block(ast)
+        self.loop_depth -= 1
+
+    def _resolve_statement(self, ast: ASTNode) -> None:
+        assert ast.name == "STATEMENT"
+
+        statement = ast.children[0]
+
+        if statement.name == "OUTPUT":
+            self._resolve_expression(statement.children[2])
+        elif statement.name == "VAR_DEF":
+            self._resolve_expression(statement.children[-1])
+            statement.slot = self._declare(statement.children[1])
+            assert self.scope is not None
+            self.scope.initialized.add(statement.slot)
+        elif statement.name == "FUNCTION_DEF":
+            statement.slot = self._declare(statement.children[1])
+            assert self.scope is not None
+            self.scope.initialized.add(statement.slot)
+            self.scope.pending.append((statement, self.scope.snapshot()))
+        elif statement.name == "RETURN_STATEMENT":
+            if not self.in_function:
+                raise Exception("Use of return outside of function")
+            self._resolve_expression(statement.children[1])
+        elif statement.name == "VAR_ASSIGN":
+            self._resolve_expression(statement.children[2])
+            statement.depth, statement.slot = self._lookup(
+                statement.children[0], "Reference of undefined symbol"
+            )
+        elif statement.name == "IF_BLOCK":
+            assert self.scope is not None
+            # initialized after the statement when initialized by every branch
+            branches = []
+            for child in statement.children:
+                if child.name in ("IF", "ELIF"):
+                    self._resolve_expression(child.children[1])
+                    branches.append(self._resolve_block(child.children[4]))
+                elif child.name == "ELSE":
+                    branches.append(self._resolve_block(child.children[1]))
+                else:
+                    raise Exception(f"Invalid conditional branch name: {child.name}")
+            if statement.children[-1].name == "ELSE":
+                self.scope.initialized = set.intersection(*branches)
+        elif statement.name == "FOR_BLOCK":
+            var_def = statement.children[2]
+            self._resolve_expression(var_def.children[-1])
+            var_def.slot = self._declare(var_def.children[1])
+            assert self.scope is not None
+            self.scope.initialized.add(var_def.slot)
+            self._resolve_expression(statement.children[4])
+            var_mutation = statement.children[6]
+            self._resolve_expression(var_mutation.children[2])
+            var_mutation.depth, var_mutation.slot = self._lookup(
+                var_mutation.children[0], "Reference of undefined symbol"
+            )
+            self._resolve_loop_body(statement.children[9])
+        elif statement.name == "WHILE_BLOCK":
+            self._resolve_expression(statement.children[2])
+            self._resolve_loop_body(statement.children[5])
+        elif statement.name == "ROOT_VAR_REF":
+            identifier, root_var_ref_operator = statement.children
+            call = root_var_ref_operator.children[0].name == "LEFT_PAREN"
+            if call:
+                message = "Use of undefined symbol"
+            else:
+                message = "Reference of undefined symbol"
+            self._resolve_expression(root_var_ref_operator.children[1])
+            statement.depth, statement.slot = self._lookup(identifier, message)
+            if call:
+                statement.checked = not self._is_initialized(statement)
+        elif statement.name == "BREAK_STATEMENT":
+            if not self.loop_depth:
+                raise Exception("Use of break outside of loop")
+        else:
+            raise Exception(f"Invalid Statement: {statement.name}")
+
+    def _resolve_statements(self, ast: ASTNode) -> None:
+        assert ast.name == "STATEMENTS"
+
+        for statement in ast.children:
+            self._resolve_statement(statement)
+
+    # returns the size of the global frame. A tree is only resolved once:
+    # optimization passes keep its annotations but may drop declarations a
+    # second resolution would need
+    def resolve(self, ast: ASTNode) -> int:
+        if not hasattr(ast, "frame_size"):
+            ast.frame_size = self._resolve_scope(ast.children[1].children[0], [])
+        return ast.frame_size
+
+    # for streaming, top-level statements are resolved one at a time into a
+    # global scope that stays open. Function bodies wait for the next
+    # statement that isn't a function definition, so functions defined
+    # together may call each other. Returns the size of the global frame
+    def resolve_global(self, ast: ASTNode) -> int:
+        if self.scope is None:
+            self.scope = ResolverScope(None)
+        if ast.children[0].name != "FUNCTION_DEF":
+            self.resolve_pending()
+        self._resolve_statement(ast)
+        return len(self.scope.slots)
+
+    # keeps the global slots the optimizer added from being declared again
+    def reserve_global(self, frame_size: int) -> None:
+        assert self.scope is not None
+        while len(self.scope.slots) < frame_size:
+            slot = len(self.scope.slots)
+            # not a valid identifier, so never looked up
+            self.scope.slots[f"<slot {slot}>"] = slot
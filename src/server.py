@@ -0,0 +1,243 @@
+import argparse
+import json
+import os
+import signal
+import socket
+import sys
+from typing import Any, List, Optional
+
+from langtools.ast.ast import ASTNode
+
+from src.client import (
+    DEFAULT_SOCKET,
+    ERROR,
+    EXIT,
+    OUTPUT,
+    private_directory,
+    send_frame,
+)
+from src.engines import ENGINES
+from src.frontend import parse_buffer
+from src.memo import MemoConfig, memo_config_from_pragmas
+from src.optimizer import PASSES, Optimizer
+from src.output import CaptureOutput, Output, StreamOutput
+from src.spans import span_lexer
+
+DEFAULT_TIMEOUT = 60.0
+DEFAULT_BACKLOG = 64
+
+# run through every engine by warm_up()
+WARM_UP_PROGRAM = b"""
+func double(a) { return a + a; }
+for (let i = 0; i < 2; i = i + 1) { print(double(i)); }
+"""
+
+
+# runs a parsed program the way `lara FILE` does
+def run_program(
+    ast: ASTNode,
+    engine: str,
+    output: Output,
+    optimize: bool = True,
+    memoize: bool = False,
+) -> None:
+    if engine not in ENGINES:
+        raise Exception(f"Unknown engine: {engine}")
+    if optimize:
+        Optimizer(PASSES).optimize(ast)
+    if memoize:
+        memo = MemoConfig()
+    else:
+        memo = memo_config_from_pragmas(getattr(ast, "pragmas", ()))
+    ENGINES[engine](ast, memo=memo, output=output).evaluate()
+
+
+# imports everything and builds the lexer tables, so processes forked
+# afterwards start ready to run
+def warm_up() -> None:
+    span_lexer()
+    for engine in ENGINES:
+        run_program(parse_buffer(WARM_UP_PROGRAM), engine, CaptureOutput())
+
+
+# A binary stream sending everything written to it as output frames. The
+# timeout is held off while a frame is sent, so it never cuts one in half
+class _FrameStream:
+    def __init__(self, connection: socket.socket):
+        self.connection = connection
+
+    def write(self, data: bytes) -> None:
+        signal.pthread_sigmask(signal.SIG_BLOCK, {signal.SIGALRM})
+        try:
+            send_frame(self.connection, OUTPUT, bytes(data))
+        finally:
+            signal.pthread_sigmask(signal.SIG_UNBLOCK, {signal.SIGALRM})
+
+    def flush(self) -> None:
+        pass
+
+
+# Runs scripts sent over a Unix domain socket. A pool of workers is forked
+# once everything is loaded, and each accepts connections from the shared
+# socket and runs one script at a time, so at most `workers` scripts run at
+# once and the rest wait in the socket's backlog. A worker that dies is
+# replaced
+class Server:
+    def __init__(
+        self,
+        socket_path: str = DEFAULT_SOCKET,
+        workers: Optional[int] = None,
+        timeout: Optional[float] = DEFAULT_TIMEOUT,
+        backlog: int = DEFAULT_BACKLOG,
+    ):
+        self.socket_path = socket_path
+        self.workers = workers or os.cpu_count() or 1
+        self.timeout = timeout or None
+        self.backlog = backlog
+        self.listener: Optional[socket.socket] = None
+        self.pids: List[int] = []
+
+    def _bind(self) -> socket.socket:
+        private_directory(self.socket_path)
+        if os.path.exists(self.socket_path):
+            # a socket left behind by a server that didn't stop cleanly
+            with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as probe:
+                try:
+                    probe.connect(self.socket_path)
+                except ConnectionRefusedError:
+                    os.unlink(self.socket_path)
+                else:
+                    raise Exception(
+                        f"A Lara server is already running on {self.socket_path}"
+                    )
+        listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        listener.bind(self.socket_path)
+        listener.listen(self.backlog)
+        return listener
+
+    def _spawn(self) -> None:
+        pid = os.fork()
+        if pid:
+            self.pids.append(pid)
+            return
+        status = 0
+        try:
+            # the server stops its workers itself
+            signal.signal(signal.SIGINT, signal.SIG_IGN)
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            signal.signal(signal.SIGALRM, self._timed_out)
+            while True:
+                connection, _ = self.listener.accept()
+                with connection:
+                    self._handle(connection)
+        except BaseException:
+            status = 1
+        finally:
+            os._exit(status)
+
+    def _timed_out(self, signum: int, frame: Any) -> None:
+        raise Exception(f"Timed out after {self.timeout:g}s")
+
+    def _handle(self, connection: socket.socket) -> None:
+        try:
+            with connection.makefile("rb") as reader:
+                request = json.loads(reader.readline())
+            output = StreamOutput(
+                _FrameStream(connection),
+                line_buffered=bool(request.get("line_buffered")),
+            )
+
+            status = 0
+            try:
+                if self.timeout is not None:
+                    signal.setitimer(signal.ITIMER_REAL, self.timeout)
+                try:
+                    run_program(
+                        parse_buffer(request["source"].encode()),
+                        request.get("engine", "tree"),
+                        output,
+                        request.get("optimize", True),
+                        request.get("memoize", False),
+                    )
+                finally:
+                    signal.setitimer(signal.ITIMER_REAL, 0)
+            except Exception as error:
+                status = 1
+                send_frame(connection, ERROR, f"{error}\n".encode())
+            send_frame(connection, EXIT, b"%d" % status)
+        except (OSError, ValueError):
+            # the client went away or didn't send a request
+            pass
+
+    def serve_forever(self) -> None:
+        warm_up()
+        self.listener = self._bind()
+        try:
+            for _ in range(self.workers):
+                self._spawn()
+            while True:
+                pid, _ = os.wait()
+                if pid in self.pids:
+                    self.pids.remove(pid)
+                    self._spawn()
+        finally:
+            self.stop()
+
+    def stop(self) -> None:
+        for pid in self.pids:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+        for pid in self.pids:
+            try:
+                os.waitpid(pid, 0)
+            except ChildProcessError:
+                pass
+        self.pids = []
+        if self.listener is not None:
+            self.listener.close()
+            self.listener = None
+            os.unlink(self.socket_path)
+
+
+def _terminated(signum: int, frame: Any) -> None:
+    sys.exit(0)
+
+
+def main(argv: List[str]) -> int:
+    arg_parser = argparse.ArgumentParser(prog="lara serve")
+    arg_parser.add_argument("--socket", default=DEFAULT_SOCKET, metavar="PATH")
+    arg_parser.add_argument(
+        "--workers",
+        type=int,
+        metavar="N",
+        help="scripts run at once, one per CPU by default",
+    )
+    arg_parser.add_argument(
+        "--timeout",
+        type=float,
+        default=DEFAULT_TIMEOUT,
+        metavar="SECONDS",
+        help="longest a script may run, 0 for no limit",
+    )
+    arg_parser.add_argument(
+        "--backlog",
+        type=int,
+        default=DEFAULT_BACKLOG,
+        metavar="N",
+        help="connections waiting for a free worker before more are refused",
+    )
+    args = arg_parser.parse_args(argv)
+
+    server = Server(args.socket, args.workers, args.timeout, args.backlog)
+    signal.signal(signal.SIGTERM, _terminated)
+    print(
+        f"serving on {server.socket_path} with {server.workers} worker(s)",
+        file=sys.stderr,
+    )
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    return 0
@@ -0,0 +1,243 @@
+import contextlib
+import functools
+import mmap
+import multiprocessing
+import os
+import sys
+from array import array
+from typing import Dict, Iterator, List, Optional, Tuple, Union
+
+from src.config.lexer import KEYWORDS, TOKENIZER
+
+Buffer = Union[bytes, mmap.mmap]
+
+WHITE_SPACE = frozenset(b" \t\n\r\f\v")
+
+# the only tokens whose text the parse tree keeps
+LEXME_KINDS = ("INTEGER", "IDENTIFIER")
+
+# inputs smaller than this are lexed in one process, starting a pool would
+# cost more than it saves
+PARALLEL_THRESHOLD = 1 << 20
+
+
+# The lexed tokens of a buffer as parallel arrays, the kind of every token
+# as an index into names and its text as a [start, end) byte range. Text is
+# only decoded when asked for.
+class TokenSpans:
+    __slots__ = (
+        "source",
+        "names",
+        "kinds",
+        "starts",
+        "ends",
+        "with_lexme",
+        "line_start",
+        "line_number",
+    )
+
+    def __init__(self, source: Buffer, names: Tuple[str, ...]):
+        self.source = source
+        self.names = names
+        self.kinds = array("B")
+        self.starts = array("q")
+        self.ends = array("q")
+        self.with_lexme = frozenset(
+            kind for kind, name in enumerate(names) if name in LEXME_KINDS
+        )
+        # the last line asked for and the offset it was found at
+        self.line_start = 0
+        self.line_number = 1
+
+    def __len__(self) -> int:
+        return len(self.kinds)
+
+    def append(self, kind: int, start: int, end: int) -> None:
+        self.kinds.append(kind)
+        self.starts.append(start)
+        self.ends.append(end)
+
+    def kind_names(self) -> List[str]:
+        names = self.names
+        return [names[kind] for kind in self.kinds]
+
+    def lexme(self, index: int) -> Optional[str]:
+        if self.kinds[index] not in self.with_lexme:
+            return None
+        text = self.source[self.starts[index] : self.ends[index]]
+        return sys.intern(text.decode())
+
+    # the line the token starts on. The parser asks in order, so newlines are
+    # counted on from the last token asked for
+    def line(self, index: int) -> int:
+        start = self.starts[index]
+        if start < self.line_start:
+            self.line_start = 0
+            self.line_number = 1
+        self.line_number += self.source[self.line_start : start].count(b"\n")
+        self.line_start = start
+        return self.line_number
+
+
+# The tokenizer's DFA as flat tables over bytes: the next state of state s
+# on byte b is transitions[s * 256 + b], -1 when there is none
+class SpanLexer:
+    def __init__(self, dfa: object, keywords: Dict[str, object]):
+        names: List[str] = []
+        states = [dfa.start]
+        index = {id(dfa.start): 0}
+        for state in states:
+            for target in state.transitions.values():
+                if id(target) not in index:
+                    index[id(target)] = len(states)
+                    states.append(target)
+
+        self.transitions = [-1] * (len(states) * 256)
+        self.accepts: List[int] = []
+        for i, state in enumerate(states):
+            for char, target in state.transitions.items():
+                if ord(char) < 256:
+                    self.transitions[i * 256 + ord(char)] = index[id(target)]
+            if state.token is None:
+                self.accepts.append(-1)
+            else:
+                if state.token.name not in names:
+                    names.append(state.token.name)
+                self.accepts.append(names.index(state.token.name))
+
+        self.keywords: Dict[bytes, int] = {}
+        for text, token in keywords.items():
+            if token.name not in names:
+                names.append(token.name)
+            self.keywords[text.encode()] = names.index(token.name)
+        self.identifier = names.index("IDENTIFIER")
+        self.names = tuple(names)
+
+    # yields the (kind, start, end) of every token in turn, lexing no further
+    # ahead than the token asked for
+    def scan(
+        self, source: Buffer, position: int = 0, stop: Optional[int] = None
+    ) -> Iterator[Tuple[int, int, int]]:
+        transitions = self.transitions
+        accepts = self.accepts
+        keywords = self.keywords
+        identifier = self.identifier
+
+        end = len(source) if stop is None else stop
+        while position < end:
+            if source[position] in WHITE_SPACE:
+                position += 1
+                continue
+
+            # longest match
+            state = 0
+            kind = -1
+            token_end = current = position
+            while current < end:
+                state = transitions[state * 256 + source[current]]
+                if state < 0:
+                    break
+                current += 1
+                if accepts[state] >= 0:
+                    kind = accepts[state]
+                    token_end = current
+            if kind < 0:
+                raise Exception(f"Lexing error at byte {position}")
+
+            if kind == identifier:
+                kind = keywords.get(source[position:token_end], identifier)
+            yield kind, position, token_end
+            position = token_end
+
+    def lex(
+        self, source: Buffer, position: int = 0, stop: Optional[int] = None
+    ) -> TokenSpans:
+        spans = TokenSpans(source, self.names)
+        add_kind = spans.kinds.append
+        add_start = spans.starts.append
+        add_end = spans.ends.append
+        for kind, start, end in self.scan(source, position, stop):
+            add_kind(kind)
+            add_start(start)
+            add_end(end)
+        return spans
+
+
+@functools.lru_cache(maxsize=None)
+def span_lexer() -> SpanLexer:
+    return SpanLexer(TOKENIZER, KEYWORDS)
+
+
+def lex_spans(source: Buffer, position: int = 0) -> TokenSpans:
+    return span_lexer().lex(source, position)
+
+
+# the contents of a file, mapped into memory rather than read
+@contextlib.contextmanager
+def mapped_file(path: str) -> Iterator[Buffer]:
+    with open(path, "rb") as source_file:
+        if os.fstat(source_file.fileno()).st_size == 0:
+            # an empty file can't be mapped
+            yield b""
+            return
+        with mmap.mmap(source_file.fileno(), 0, access=mmap.ACCESS_READ) as source:
+            yield source
+
+
+# [start, end) ranges splitting source into about `shards` pieces. Every
+# piece ends just after a semicolon: Lara has no strings or comments, so a
+# semicolon is always a token of its own and no token crosses the split
+def shard_bounds(
+    source: Buffer, shards: int, position: int = 0
+) -> List[Tuple[int, int]]:
+    bounds = []
+    size = (len(source) - position) // shards
+    start = position
+    for _ in range(shards - 1):
+        split = source.find(b";", max(start, position + size * (len(bounds) + 1)))
+        if split < 0:
+            break
+        bounds.append((start, split + 1))
+        start = split + 1
+    bounds.append((start, len(source)))
+    return bounds
+
+
+def _lex_shard(shard: Tuple[str, int, int]) -> Tuple[array, array, array]:
+    path, start, stop = shard
+    with mapped_file(path) as source:
+        spans = span_lexer().lex(source, start, stop)
+    return spans.kinds, spans.starts, spans.ends
+
+
+# lex_spans for a mapped file, with shards lexed by a pool of jobs processes
+# and joined in order. Token positions are offsets into the whole file, so
+# the result is the same as lexing it in one go
+def lex_file(
+    path: str,
+    source: Buffer,
+    position: int = 0,
+    jobs: Optional[int] = None,
+    threshold: int = PARALLEL_THRESHOLD,
+) -> TokenSpans:
+    jobs = jobs or os.cpu_count() or 1
+    # workers are forked, so they start with the tables and no script reruns
+    # the command line
+    if (
+        jobs == 1
+        or len(source) - position < threshold
+        or "fork" not in multiprocessing.get_all_start_methods()
+    ):
+        return lex_spans(source, position)
+
+    spans = TokenSpans(source, span_lexer().names)
+    shards = [
+        (path, start, stop) for start, stop in shard_bounds(source, jobs, position)
+    ]
+    with multiprocessing.get_context("fork").Pool(jobs) as pool:
+        # in order, so the first lexing error in the file is the one raised
+        for kinds, starts, ends in pool.imap(_lex_shard, shards):
+            spans.kinds.extend(kinds)
+            spans.starts.extend(starts)
+            spans.ends.extend(ends)
+    return spans
@@ -0,0 +1,141 @@
+import contextlib
+import json
+import time
+import tracemalloc
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from langtools.ast.ast import ASTNode
+
+from src.nodes import Call, CheckedLoad, Load
+
+STATS_FORMATS = ("text", "json")
+
+
+# the number of nodes in a tree and its depth, without recursing
+def tree_size(ast: ASTNode) -> Tuple[int, int]:
+    nodes = 0
+    depth = 0
+    stack = [(ast, 1)]
+    while stack:
+        node, node_depth = stack.pop()
+        nodes += 1
+        depth = max(depth, node_depth)
+        stack.extend((child, node_depth + 1) for child in node.children)
+    return nodes, depth
+
+
+# Counts what the tree engine does, installed on one Evaluator by wrapping
+# its methods so that an uncounted run is untouched. Every load and call
+# walks `depth` scopes up from the current one to find its symbol
+class EvaluatorCounters:
+    def __init__(self):
+        self.statements = 0
+        self.calls = 0
+        self.scope_depths: Dict[int, int] = {}
+
+    def install(self, evaluator: Any) -> None:
+        evaluate_statement = evaluator._evaluate_statement
+        evaluate_expression = evaluator._evaluate_expression
+        evaluate_call = evaluator._evaluate_call
+        depths = self.scope_depths
+
+        def counted_statement(ast: Any) -> None:
+            self.statements += 1
+            evaluate_statement(ast)
+
+        def counted_expression(ast: Any) -> Any:
+            if type(ast) is Load or type(ast) is CheckedLoad:
+                depths[ast.depth] = depths.get(ast.depth, 0) + 1
+            return evaluate_expression(ast)
+
+        def counted_call(ast: Call) -> Any:
+            self.calls += 1
+            depths[ast.depth] = depths.get(ast.depth, 0) + 1
+            return evaluate_call(ast)
+
+        evaluator._evaluate_statement = counted_statement
+        evaluator._evaluate_expression = counted_expression
+        evaluator._evaluate_call = counted_call
+
+    # every call that isn't answered from a memo cache gets a new scope, on
+    # top of the global one
+    def counters(self, memo_hits: int = 0) -> Dict[str, Any]:
+        return {
+            "statements": self.statements,
+            "calls": self.calls,
+            "scopes": 1 + self.calls - memo_hits,
+            "scope_depths": dict(sorted(self.scope_depths.items())),
+        }
+
+
+# Wall time of each phase of a run, and with trace_memory the peak of the
+# memory Python allocated during it on top of what was already in use.
+# Tracing memory slows everything down, times included
+class Stats:
+    def __init__(self, trace_memory: bool = False):
+        self.trace_memory = trace_memory
+        # (name, seconds, peak bytes or None) in the order they ran
+        self.phases: List[Tuple[str, float, Optional[int]]] = []
+        self.counters: Dict[str, Any] = {}
+        if trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    def add_phase(self, name: str, seconds: float, peak: Optional[int] = None) -> None:
+        self.phases.append((name, seconds, peak))
+
+    @contextlib.contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        if self.trace_memory:
+            tracemalloc.reset_peak()
+            in_use = tracemalloc.get_traced_memory()[0]
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            seconds = time.perf_counter() - start
+            peak = None
+            if self.trace_memory:
+                peak = tracemalloc.get_traced_memory()[1] - in_use
+            self.add_phase(name, seconds, peak)
+
+    def count(self, name: str, value: Any) -> None:
+        self.counters[name] = value
+
+    def report(self) -> Dict[str, Any]:
+        return {
+            "phases": [
+                {"name": name, "seconds": seconds, "peak_bytes": peak}
+                for name, seconds, peak in self.phases
+            ],
+            "total_seconds": sum(seconds for _, seconds, _ in self.phases),
+            "counters": self.counters,
+        }
+
+    def format(self, stats_format: str = "text") -> str:
+        if stats_format == "json":
+            return json.dumps(self.report())
+        if stats_format != "text":
+            raise Exception(f"Unknown stats format: {stats_format}")
+
+        lines = [f"{'phase':<16} {'seconds':>12} {'peak memory':>14}"]
+        for name, seconds, peak in self.phases:
+            memory = "-" if peak is None else f"{peak / 1024:.1f} KiB"
+            lines.append(f"{name:<16} {seconds:>11.6f}s {memory:>14}")
+        lines.append(f"{'total':<16} {self.report()['total_seconds']:>11.6f}s")
+        for name, value in self.counters.items():
+            if isinstance(value, dict):
+                value = "  ".join(f"{key}: {count}" for key, count in value.items())
+            lines.append(f"{name.replace('_', ' '):<16} {value}")
+        return "\n".join(lines)
+
+
+# stands in when no stats are collected, at the cost of an empty with block
+class _NoStats(Stats):
+    def phase(self, name: str) -> Any:
+        return contextlib.nullcontext()
+
+    def count(self, name: str, value: Any) -> None:
+        pass
+
+
+NO_STATS: Stats = _NoStats()
@@ -0,0 +1,126 @@
+from typing import Iterable, Iterator, List, Optional, Set
+
+from langtools.ast.ast import ASTNode
+
+from src.eval import Evaluator
+from src.generated_parser import Parser
+from src.loops import CountedLoopAnalyzer, captured_writes
+from src.lower import Lowerer
+from src.optimizer import PASSES, Optimizer
+from src.output import Output
+from src.resolver import Resolver
+from src.spans import Buffer, TokenSpans, span_lexer
+
+
+# splits the token stream of a buffer into the tokens of each top-level
+# statement, lexing no further ahead than the statement's last token. A
+# statement ends with a semicolon outside any brackets, or with a closing
+# curly brace not followed by elif or else
+def top_level_statements(source: Buffer, position: int = 0) -> Iterator[TokenSpans]:
+    lexer = span_lexer()
+    names = lexer.names
+    opening = {names.index("LEFT_CURLY"), names.index("LEFT_PAREN")}
+    closing = {names.index("RIGHT_CURLY"), names.index("RIGHT_PAREN")}
+    right_curly = names.index("RIGHT_CURLY")
+    semi_colon = names.index("SEMI_COLON")
+    continuations = {names.index("ELIF"), names.index("ELSE")}
+
+    spans = TokenSpans(source, names)
+    depth = 0
+    closed = False
+    for kind, start, end in lexer.scan(source, position):
+        if closed and kind not in continuations:
+            yield spans
+            spans = TokenSpans(source, names)
+        closed = False
+
+        spans.append(kind, start, end)
+        if kind in opening:
+            depth += 1
+        elif kind in closing:
+            depth -= 1
+            closed = depth == 0 and kind == right_curly
+        elif kind == semi_colon and depth == 0:
+            yield spans
+            spans = TokenSpans(source, names)
+
+    if len(spans):
+        yield spans
+
+
+def _program(statements: List[ASTNode], frame_size: int) -> ASTNode:
+    ast = ASTNode.from_dict_literal(
+        {"S-Prime": [{"BOF": []}, {"START": [{"STATEMENTS": []}]}, {"EOF": []}]}
+    )
+    ast.children[1].children[0].children = statements
+    ast.frame_size = frame_size
+    return ast
+
+
+# Parses, resolves and runs a script one top-level statement at a time, so
+# output starts right away and only function definitions outlive their
+# statement. Function definitions run together with the next statement
+# that isn't one. Memoization isn't supported, purity depends on the
+# whole program
+class StreamingEvaluator:
+    def __init__(
+        self,
+        source: Buffer,
+        position: int = 0,
+        passes: Iterable[str] = PASSES,
+        output: Optional[Output] = None,
+    ):
+        self.statements = top_level_statements(source, position)
+        self.resolver = Resolver()
+        self.optimizer = Optimizer(passes)
+        # flushed after every statement
+        self.evaluator = Evaluator(_program([], 0), output=output)
+        self.memoizer = None
+        self.frame_size = 0
+        # global slots assigned by the functions run so far, which the loop
+        # passes can't see in a statement on its own
+        self.captured: Set[int] = set()
+        # function definitions waiting for the next statement
+        self.functions: List[ASTNode] = []
+
+    # resolves a statement, or with None the functions still waiting
+    def _resolve(self, statement: Optional[ASTNode]) -> None:
+        try:
+            if statement is None:
+                self.resolver.resolve_pending()
+            else:
+                self.frame_size = self.resolver.resolve_global(statement)
+        except Exception as error:
+            if "undefined symbol" not in str(error):
+                raise
+            raise Exception(
+                f"{error} (when streaming, a statement can only use what is "
+                "defined before it)"
+            ) from error
+
+    def _run(self, statements: List[ASTNode]) -> None:
+        ast = _program(statements, self.frame_size)
+        self.optimizer.optimize(ast, self.captured)
+        # the loop passes may have added variables
+        self.frame_size = ast.frame_size
+        self.resolver.reserve_global(self.frame_size)
+
+        CountedLoopAnalyzer().analyze(ast, self.captured)
+        self.captured |= captured_writes(ast.children[1].children[0])
+        program = Lowerer().lower(ast)
+        self.evaluator.evaluate_statements(program.body, self.frame_size)
+
+    def evaluate(self) -> None:
+        for spans in self.statements:
+            parser = Parser(spans.kind_names(), spans.lexme)
+            statement = parser.parse_node("STATEMENT")
+            self._resolve(statement)
+            if statement.children[0].name == "FUNCTION_DEF":
+                self.functions.append(statement)
+                continue
+            self._run(self.functions + [statement])
+            self.functions = []
+
+        if self.functions:
+            self._resolve(None)
+            self._run(self.functions)
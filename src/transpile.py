@@ -0,0 +1,301 @@
+from __future__ import annotations
+from types import CodeType
+from typing import Any, Callable, Dict, List, Optional, Set
+
+from langtools.ast.ast import ASTNode
+
+from src.eval import UNSET, check_set
+from src.lower import lower
+from src.memo import MISSING, MemoConfig, Memoizer, memo_key
+from src.nodes import (
+    Assign,
+    BinOp,
+    Break,
+    Call,
+    CheckedLoad,
+    Expression,
+    For,
+    FunctionDef,
+    If,
+    Integer,
+    Let,
+    Load,
+    Print,
+    Program,
+    Return,
+    Statement,
+    While,
+)
+from src.output import Output, stdout_output
+
+PYTHON_OPERATORS = {
+    "PLUS": "+",
+    "MINUS": "-",
+    "MULTIPLY": "*",
+    "DIVIDE": "//",
+    "LESS": "<",
+    "GREATER": ">",
+    "LESS_EQUAL": "<=",
+    "GREATER_EQUAL": ">=",
+}
+
+COMPARISONS = {"LESS", "GREATER", "LESS_EQUAL", "GREATER_EQUAL"}
+
+# a + (b + c) == a + b + c, so these chains are emitted without nesting
+ASSOCIATIVE = {"PLUS", "MULTIPLY"}
+
+
+class TranspilerScope:
+    def __init__(self, scope_id: int, names: Dict[int, str]):
+        self.scope_id = scope_id
+        # Python identifier of every slot, made unique per scope so that
+        # shadowing in Lara never turns into Python's local/global confusion
+        self.names = {slot: f"{name}_{scope_id}" for slot, name in names.items()}
+        self.nonlocals: Set[str] = set()
+        # variables read by checked loads, which start out as lara_unset
+        self.unset: Set[str] = set()
+
+
+# Turns a resolved AST into Python source. Every Lara scope becomes a Python
+# function (the program itself runs in one), so variables are fast locals or
+# closure cells and the CPython interpreter does all the work
+class PythonTranspiler:
+    # pure functions are decorated with lara_memoize when memoize is set
+    def __init__(self, memoize: bool = False) -> None:
+        self.memoize = memoize
+        self.lines: List[str] = []
+        self.indent = 0
+        self.scopes: List[TranspilerScope] = []
+
+    def _emit(self, line: str) -> None:
+        self.lines.append("    " * self.indent + line)
+
+    def _declarations(
+        self, ast: List[Statement], names: Dict[int, str]
+    ) -> Dict[int, str]:
+        for statement in ast:
+            if isinstance(statement, (Let, FunctionDef)):
+                names[statement.slot] = statement.name
+            elif isinstance(statement, For):
+                names[statement.init.slot] = statement.init.name
+                self._declarations(statement.body, names)
+            elif isinstance(statement, While):
+                self._declarations(statement.body, names)
+            elif isinstance(statement, If):
+                for _, body in statement.branches:
+                    self._declarations(body, names)
+                if statement.otherwise is not None:
+                    self._declarations(statement.otherwise, names)
+        return names
+
+    def _name(self, depth: int, slot: int) -> str:
+        scope = self.scopes[-1 - depth]
+        # the optimizer may have removed the declaration, but not the slot
+        return scope.names.setdefault(slot, f"slot{slot}_{scope.scope_id}")
+
+    def _target(self, depth: int, slot: int) -> str:
+        name = self._name(depth, slot)
+        if depth:
+            self.scopes[-1].nonlocals.add(name)
+        return name
+
+    # Python raises its own error on a variable that was never assigned, so
+    # the ones that may be read unset are assigned lara_unset up front
+    def _checked_name(self, depth: int, slot: int, name: str) -> str:
+        python_name = self._name(depth, slot)
+        self.scopes[-1 - depth].unset.add(python_name)
+        return f"lara_check({python_name}, {name!r})"
+
+    def _transpile_call(self, ast: Call) -> str:
+        arguments = ", ".join(self._transpile_expression(arg) for arg in ast.args)
+        if ast.checked:
+            return f"{self._checked_name(ast.depth, ast.slot, ast.name)}({arguments})"
+        return f"{self._name(ast.depth, ast.slot)}({arguments})"
+
+    # Lara operators are right associative, so the chain is built from the
+    # right and every link is parenthesized
+    def _transpile_binop(self, ast: BinOp) -> str:
+        operands = [self._transpile_expression(operand) for operand in ast.operands]
+        right = operands.pop()
+        previous = None
+        for op in reversed(ast.operators):
+            # a + (b + c) == a + b + c, so these links are emitted without nesting
+            if op in ASSOCIATIVE and op == previous:
+                right = right[1:-1]
+            expression = f"{operands.pop()} {PYTHON_OPERATORS[op]} {right}"
+            if op in COMPARISONS:
+                right = f"(1 if {expression} else 0)"
+            else:
+                right = f"({expression})"
+            previous = op
+        return right
+
+    def _transpile_expression(self, ast: Expression) -> str:
+        if isinstance(ast, Integer):
+            return f"({ast.value})" if ast.value < 0 else str(ast.value)
+        elif isinstance(ast, CheckedLoad):
+            return self._checked_name(ast.depth, ast.slot, ast.name)
+        elif isinstance(ast, Load):
+            return self._name(ast.depth, ast.slot)
+        elif isinstance(ast, Call):
+            return self._transpile_call(ast)
+        elif isinstance(ast, BinOp):
+            return self._transpile_binop(ast)
+        else:
+            raise Exception(f"Invalid expression: {type(ast).__name__}")
+
+    # conditions only need truthiness, so comparisons skip the cast to 1/0
+    def _transpile_condition(self, ast: Expression) -> str:
+        if not isinstance(ast, BinOp) or ast.operators[0] not in COMPARISONS:
+            return self._transpile_expression(ast)
+
+        left = self._transpile_expression(ast.operands[0])
+        if len(ast.operands) == 2:
+            right = self._transpile_expression(ast.operands[1])
+        else:
+            right = self._transpile_binop(BinOp(ast.operands[1:], ast.operators[1:]))
+        return f"{left} {PYTHON_OPERATORS[ast.operators[0]]} {right}"
+
+    def _transpile_statements(self, ast: List[Statement]) -> None:
+        if not ast:
+            self._emit("pass")
+
+        for statement in ast:
+            self._transpile_statement(statement)
+
+    def _transpile_block(self, header: str, body: List[Statement]) -> None:
+        self._emit(header)
+        self.indent += 1
+        self._transpile_statements(body)
+        self.indent -= 1
+
+    def _transpile_function(
+        self, name: str, params: Optional[List[str]], body: List[Statement]
+    ) -> None:
+        if params is None:
+            self._emit(f"def {name}():")
+        else:
+            # missing arguments are left unset and extra ones ignored, as in Evaluator
+            signature = ", ".join([f"{param}=None" for param in params] + ["*_"])
+            self._emit(f"def {name}({signature}):")
+        self.indent += 1
+
+        header = len(self.lines)
+        self._transpile_statements(body)
+        scope = self.scopes.pop()
+        for name in sorted(scope.unset, reverse=True):
+            self.lines.insert(header, "    " * self.indent + f"{name} = lara_unset")
+        if scope.nonlocals:
+            nonlocals = ", ".join(sorted(scope.nonlocals))
+            self.lines.insert(header, "    " * self.indent + f"nonlocal {nonlocals}")
+
+        self.indent -= 1
+
+    def _transpile_function_definition(self, ast: FunctionDef) -> None:
+        scope = TranspilerScope(
+            len(self.scopes), self._declarations(ast.body, dict(enumerate(ast.params)))
+        )
+        name = self._name(0, ast.slot)
+
+        self.scopes.append(scope)
+        if self.memoize and ast.pure:
+            self._emit(f"@lara_memoize({ast.name!r})")
+        self._transpile_function(
+            name, [scope.names[slot] for slot in range(len(ast.params))], ast.body
+        )
+
+    def _transpile_statement(self, ast: Statement) -> None:
+        if isinstance(ast, Print):
+            self._emit(f"print({self._transpile_expression(ast.value)})")
+        elif isinstance(ast, Let):
+            value = self._transpile_expression(ast.value)
+            self._emit(f"{self._name(0, ast.slot)} = {value}")
+        elif isinstance(ast, FunctionDef):
+            self._transpile_function_definition(ast)
+        elif isinstance(ast, Return):
+            # If there is a return value provided
+            if ast.value is not None:
+                self._emit(f"return {self._transpile_expression(ast.value)}")
+            else:
+                self._emit("return")
+        elif isinstance(ast, Assign):
+            value = self._transpile_expression(ast.value)
+            self._emit(f"{self._target(ast.depth, ast.slot)} = {value}")
+        elif isinstance(ast, If):
+            for i, (condition, body) in enumerate(ast.branches):
+                keyword = "elif" if i else "if"
+                header = f"{keyword} {self._transpile_condition(condition)}:"
+                self._transpile_block(header, body)
+            if ast.otherwise is not None:
+                self._transpile_block("else:", ast.otherwise)
+        elif isinstance(ast, For):
+            self._transpile_statement(ast.init)
+            condition = self._transpile_condition(ast.condition)
+            self._transpile_block(f"while {condition}:", ast.body)
+            self.indent += 1
+            self._transpile_statement(ast.update)
+            self.indent -= 1
+        elif isinstance(ast, Call):
+            self._emit(self._transpile_call(ast))
+        elif isinstance(ast, Break):
+            self._emit("break")
+        elif isinstance(ast, While):
+            condition = self._transpile_condition(ast.condition)
+            self._transpile_block(f"while {condition}:", ast.body)
+        else:
+            raise Exception(f"Invalid Statement: {type(ast).__name__}")
+
+    def transpile(self, program: Program) -> str:
+        self.scopes.append(TranspilerScope(0, self._declarations(program.body, {})))
+        self._transpile_function("lara_main", None, program.body)
+        self._emit("lara_main()")
+        return "\n".join(self.lines) + "\n"
+
+
+class PythonEvaluator:
+    def __init__(
+        self,
+        ast: ASTNode,
+        memo: Optional[MemoConfig] = None,
+        output: Optional[Output] = None,
+    ):
+        program = lower(ast, purity=memo is not None)
+        self.memoizer = Memoizer(memo) if memo is not None else None
+        self.output = output if output is not None else stdout_output()
+        self.source = PythonTranspiler(self.memoizer is not None).transpile(program)
+        self.code: CodeType = compile(self.source, "<lara>", "exec")
+
+    # decorator for pure functions, every definition gets a cache of its own
+    def _memoize(self, name: str) -> Callable[[Callable], Callable]:
+        assert self.memoizer is not None
+        memoizer = self.memoizer
+
+        def decorate(function: Callable) -> Callable:
+            cache = memoizer.new_cache(name)
+
+            def memoized(*args: Any) -> Any:
+                key = memo_key(args)
+                if key is None:
+                    return function(*args)
+                value = cache.lookup(key)
+                if value is MISSING:
+                    value = function(*args)
+                    cache.store(key, value)
+                return value
+
+            return memoized
+
+        return decorate
+
+    def evaluate(self) -> None:
+        # the generated source prints with print(), which goes to the output
+        namespace = {
+            "lara_memoize": self._memoize,
+            "lara_unset": UNSET,
+            "lara_check": check_set,
+            "print": self.output.write,
+        }
+        try:
+            exec(self.code, namespace)
+        finally:
+            self.output.flush()
@@ -0,0 +1,141 @@
+from typing import List
+
+from langtools.ast.ast import ASTNode
+
+OPERATOR_SYMBOLS = {
+    "PLUS": "+",
+    "MINUS": "-",
+    "MULTIPLY": "*",
+    "DIVIDE": "/",
+    "LESS": "<",
+    "GREATER": ">",
+    "LESS_EQUAL": "<=",
+    "GREATER_EQUAL": ">=",
+}
+
+
+# Turns a (possibly optimized) AST back into Lara source
+class Unparser:
+    def __init__(self) -> None:
+        self.lines: List[str] = []
+        self.indent = 0
+
+    def _emit(self, line: str) -> None:
+        self.lines.append("    " * self.indent + line)
+
+    def _arguments(self, ast: ASTNode) -> str:
+        assert ast.name == "ARGUMENTS"
+        return ", ".join(
+            self._expression(child.children[0])
+            for child in ast.children
+            if child.name == "ARGUMENT"
+        )
+
+    def _factor(self, ast: ASTNode) -> str:
+        assert ast.name == "FACTOR"
+
+        if len(ast.children) == 3:
+            return f"({self._expression(ast.children[1])})"
+        elif ast.children[0].name == "INTEGER":
+            return str(ast.children[0].lexme)
+
+        name, call = ast.children[0].children
+        if call.children:
+            return f"{name.lexme}({self._arguments(call.children[1])})"
+        return str(name.lexme)
+
+    # operators are right associative, so a chain is printed flat along its
+    # right spine and parses back into the same tree
+    def _expression(self, ast: ASTNode) -> str:
+        if ast.name == "FACTOR":
+            return self._factor(ast)
+
+        parts = []
+        while True:
+            lhs, operator = ast.children
+            parts.append(self._expression(lhs))
+            if not operator.children:
+                break
+            op, ast = operator.children
+            parts.append(OPERATOR_SYMBOLS[op.name])
+        return " ".join(parts)
+
+    def _block(self, header: str, body: ASTNode) -> None:
+        self._emit(header + " {")
+        self.indent += 1
+        self._statements(body)
+        self.indent -= 1
+        self._emit("}")
+
+    def _statement(self, ast: ASTNode) -> None:
+        statement = ast.children[0] if ast.name == "STATEMENT" else ast
+
+        if statement.name == "OUTPUT":
+            self._emit(f"print({self._expression(statement.children[2])});")
+        elif statement.name == "VAR_DEF":
+            name = statement.children[1].lexme
+            self._emit(f"let {name} = {self._expression(statement.children[-1])};")
+        elif statement.name == "VAR_ASSIGN":
+            name = statement.children[0].lexme
+            self._emit(f"{name} = {self._expression(statement.children[2])};")
+        elif statement.name == "FUNCTION_DEF":
+            params = ", ".join(
+                child.children[0].lexme
+                for child in statement.children[3].children
+                if child.name == "ARGUMENT_DEF"
+            )
+            header = f"func {statement.children[1].lexme}({params})"
+            self._block(header, statement.children[6])
+        elif statement.name == "RETURN_STATEMENT":
+            if statement.children[1].children:
+                value = self._expression(statement.children[1].children[0])
+                self._emit(f"return {value};")
+            else:
+                self._emit("return;")
+        elif statement.name == "BREAK_STATEMENT":
+            self._emit("break;")
+        elif statement.name == "ROOT_VAR_REF":
+            name = statement.children[0].lexme
+            operator = statement.children[1]
+            if operator.children[0].name == "LEFT_PAREN":
+                self._emit(f"{name}({self._arguments(operator.children[1])});")
+            else:
+                self._emit(f"{name} = {self._expression(operator.children[1])};")
+        elif statement.name == "IF_BLOCK":
+            for i, branch in enumerate(statement.children):
+                closing = self.lines.pop().strip() + " " if i else ""
+                if branch.name == "ELSE":
+                    self._block(closing + "else", branch.children[1])
+                else:
+                    keyword = "if" if branch.name == "IF" else "elif"
+                    condition = self._expression(branch.children[1])
+                    self._block(f"{closing}{keyword} ({condition})", branch.children[4])
+        elif statement.name == "FOR_BLOCK":
+            var_def = statement.children[2]
+            var_mutation = statement.children[6]
+            header = "for (let {} = {}; {}; {} = {})".format(
+                var_def.children[1].lexme,
+                self._expression(var_def.children[-1]),
+                self._expression(statement.children[4]),
+                var_mutation.children[0].lexme,
+                self._expression(var_mutation.children[2]),
+            )
+            self._block(header, statement.children[9])
+        elif statement.name == "WHILE_BLOCK":
+            condition = self._expression(statement.children[2])
+            self._block(f"while ({condition})", statement.children[5])
+        else:
+            raise Exception(f"Invalid Statement: {statement.name}")
+
+    def _statements(self, ast: ASTNode) -> None:
+        assert ast.name == "STATEMENTS"
+        for statement in ast.children:
+            self._statement(statement)
+
+    def unparse(self, ast: ASTNode) -> str:
+        self._statements(ast.children[1].children[0])
+        return "".join(line + "\n" for line in self.lines)
+
+
+def unparse(ast: ASTNode) -> str:
+    return Unparser().unparse(ast)
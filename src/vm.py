@@ -0,0 +1,222 @@
+from __future__ import annotations
+from typing import List, Optional, Tuple
+
+from langtools.ast.ast import ASTNode
+
+from src.bytecode import (
+    ADD,
+    CALL,
+    CONST,
+    DIVIDE,
+    GREATER,
+    GREATER_EQUAL,
+    HALT,
+    JUMP,
+    JUMP_IF_FALSE,
+    LESS,
+    LESS_EQUAL,
+    LOAD,
+    LOAD_CHECKED,
+    LOAD_LOCAL,
+    MAKE_FUNCTION,
+    MULTIPLY,
+    POP,
+    PRINT,
+    RETURN,
+    RETURN_NONE,
+    STORE,
+    STORE_LOCAL,
+    SUBTRACT,
+    TAIL_CALL,
+    BytecodeCompiler,
+    CodeObject,
+)
+from src.eval import ScopeTreeNode, check_set
+from src.lower import lower
+from src.memo import MISSING, MemoCache, MemoConfig, Memoizer, memo_key
+from src.output import Output, stdout_output
+
+# a call whose result is stored in its function's cache once it returns
+PendingMemo = Optional[Tuple[MemoCache, Tuple[int, ...]]]
+
+
+class VMFunction:
+    __slots__ = ("code", "scope", "cache")
+
+    def __init__(
+        self, code: CodeObject, scope: ScopeTreeNode, cache: Optional[MemoCache]
+    ):
+        self.code = code
+        # the frame the function was defined in, parent of every call's frame
+        self.scope = scope
+        self.cache = cache
+
+
+class VirtualMachine:
+    def __init__(
+        self,
+        ast: ASTNode,
+        memo: Optional[MemoConfig] = None,
+        output: Optional[Output] = None,
+    ):
+        program = lower(ast, purity=memo is not None)
+        self.memoizer = Memoizer(memo) if memo is not None else None
+        self.output = output if output is not None else stdout_output()
+        self.scope_tree = ScopeTreeNode(None, program.frame_size)
+        self.main = BytecodeCompiler().compile(program)
+
+    def evaluate(self) -> None:
+        try:
+            self._run()
+        finally:
+            self.output.flush()
+
+    def _run(self) -> None:
+        stack: List[Optional[int]] = []
+        # return addresses live on the heap, so Lara recursion never recurses in Python
+        call_stack: List[Tuple[CodeObject, int, ScopeTreeNode, PendingMemo]] = []
+        memoizer = self.memoizer
+        write = self.output.write
+
+        function = self.main
+        code = function.code
+        constants = function.constants
+        scope = self.scope_tree
+        slots = scope.slots
+        pc = 0
+
+        # opcodes are tested roughly in order of how often they execute
+        while True:
+            opcode = code[pc]
+
+            if opcode == LOAD_LOCAL:
+                stack.append(slots[code[pc + 1]])
+                pc += 2
+            elif opcode == CONST:
+                stack.append(constants[code[pc + 1]])
+                pc += 2
+            elif opcode == STORE_LOCAL:
+                slots[code[pc + 1]] = stack.pop()
+                pc += 2
+            elif opcode == JUMP_IF_FALSE:
+                if stack.pop():
+                    pc += 2
+                else:
+                    pc = code[pc + 1]
+            elif opcode == ADD:
+                right = stack.pop()
+                stack[-1] += right
+                pc += 1
+            elif opcode == SUBTRACT:
+                right = stack.pop()
+                stack[-1] -= right
+                pc += 1
+            elif opcode == LESS:
+                right = stack.pop()
+                stack[-1] = 1 if stack[-1] < right else 0
+                pc += 1
+            elif opcode == JUMP:
+                pc = code[pc + 1]
+            elif opcode == LOAD:
+                target = scope
+                for _ in range(code[pc + 1]):
+                    target = target.parent
+                stack.append(target.slots[code[pc + 2]])
+                pc += 3
+            elif opcode == STORE:
+                target = scope
+                for _ in range(code[pc + 1]):
+                    target = target.parent
+                target.slots[code[pc + 2]] = stack.pop()
+                pc += 3
+            elif opcode == MULTIPLY:
+                right = stack.pop()
+                stack[-1] *= right
+                pc += 1
+            elif opcode == DIVIDE:
+                right = stack.pop()
+                stack[-1] //= right
+                pc += 1
+            elif opcode == GREATER:
+                right = stack.pop()
+                stack[-1] = 1 if stack[-1] > right else 0
+                pc += 1
+            elif opcode == LESS_EQUAL:
+                right = stack.pop()
+                stack[-1] = 1 if stack[-1] <= right else 0
+                pc += 1
+            elif opcode == GREATER_EQUAL:
+                right = stack.pop()
+                stack[-1] = 1 if stack[-1] >= right else 0
+                pc += 1
+            elif opcode == CALL or opcode == TAIL_CALL:
+                argc = code[pc + 1]
+                args = stack[len(stack) - argc :]
+                del stack[len(stack) - argc :]
+                callee = stack.pop()
+                if not isinstance(callee, VMFunction):
+                    raise Exception(f"Call of non-function value: {callee}")
+
+                # a tail call returns straight to our caller, so it needs no
+                # return address and the current frame can be dropped. The
+                # caller's pending memo then receives the tail callee's result,
+                # which is also its own. A memoized callee is called normally,
+                # to look up and fill its own cache like the other engines
+                if opcode == CALL or callee.cache is not None:
+                    pending = None
+                    if callee.cache is not None:
+                        key = memo_key(args)
+                        if key is not None:
+                            value = callee.cache.lookup(key)
+                            if value is not MISSING:
+                                stack.append(value)
+                                pc += 2
+                                continue
+                            pending = (callee.cache, key)
+                    call_stack.append((function, pc + 2, scope, pending))
+
+                function = callee.code
+                code = function.code
+                constants = function.constants
+                scope = ScopeTreeNode(callee.scope, function.frame_size)
+                slots = scope.slots
+                slots[: function.num_params] = args[: function.num_params]
+                if len(args) < function.num_params:
+                    # missing arguments are None
+                    slots[len(args) : function.num_params] = [None] * (
+                        function.num_params - len(args)
+                    )
+                pc = 0
+            elif opcode == RETURN or opcode == RETURN_NONE:
+                if opcode == RETURN_NONE:
+                    stack.append(None)
+                function, pc, scope, pending = call_stack.pop()
+                if pending is not None:
+                    pending[0].store(pending[1], stack[-1])
+                code = function.code
+                constants = function.constants
+                slots = scope.slots
+            elif opcode == PRINT:
+                write(stack.pop())
+                pc += 1
+            elif opcode == POP:
+                stack.pop()
+                pc += 1
+            elif opcode == MAKE_FUNCTION:
+                function_code = constants[code[pc + 1]]
+                cache = None
+                if memoizer is not None and function_code.pure:
+                    cache = memoizer.new_cache(function_code.name)
+                stack.append(VMFunction(function_code, scope, cache))
+                pc += 2
+            elif opcode == LOAD_CHECKED:
+                target = scope
+                for _ in range(code[pc + 1]):
+                    target = target.parent
+                value = target.slots[code[pc + 2]]
+                stack.append(check_set(value, constants[code[pc + 3]]))
+                pc += 4
+            elif opcode == HALT:
+                return
+            else:
+                raise Exception(f"Invalid opcode: {opcode}")
@@ -0,0 +1,66 @@
+import os
+import tempfile
+import unittest
+
+from src.batch import batch_files, format_summary, run_batch
+
+SCRIPTS = {
+    "a.lr": "print(1 + 1);",
+    "b.lr": "func f(a) { return a * 3; } print(f(2));",
+    os.path.join("sub", "c.lr"): "print(y);",
+    os.path.join("sub", "d.lr"): "let i = 0; while (1) { i = i + 1; }",
+    "notes.txt": "not a script",
+}
+
+
+class BatchTests(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        for name, source in SCRIPTS.items():
+            path = os.path.join(self.directory.name, name)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, "w") as script:
+                script.write(source)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def path(self, name: str) -> str:
+        return os.path.join(self.directory.name, name)
+
+    def test__batch_files(self):
+        self.assertEqual(
+            batch_files([self.path("b.lr"), self.directory.name]),
+            [self.path(name) for name in ["b.lr", "a.lr", "sub/c.lr", "sub/d.lr"]],
+        )
+        self.assertEqual(
+            batch_files([self.path("**/*.lr")]),
+            [self.path(name) for name in ["a.lr", "b.lr", "sub/c.lr", "sub/d.lr"]],
+        )
+        with self.assertRaises(Exception):
+            batch_files([self.path("*.lara")])
+
+    def test__run_batch(self):
+        paths = batch_files([self.directory.name])
+        for jobs in [1, 2]:
+            with self.subTest(jobs=jobs):
+                results = list(run_batch(paths, "closure", jobs, timeout=0.5))
+                self.assertEqual([result["path"] for result in results], paths)
+                self.assertEqual(
+                    [(result["status"], result["output"]) for result in results],
+                    [(0, "2\n"), (0, "6\n"), (1, ""), (1, "")],
+                )
+                self.assertIn("undefined symbol y", results[2]["error"])
+                self.assertEqual(results[3]["error"], "Timed out after 0.5s")
+
+    def test__format_summary(self):
+        results = [
+            {"path": "a.lr", "status": 0, "seconds": 0.25},
+            {"path": "b.lr", "status": 1, "seconds": 0.5},
+        ]
+        self.assertEqual(
+            format_summary(results, 2.0, slowest=1),
+            "ran 2 script(s) in 2.00s, 1.0 scripts/s, 1 failed\n"
+            "slowest:\n"
+            "     0.500s  b.lr",
+        )
@@ -0,0 +1,48 @@
+import io
+import unittest
+
+from contextlib import redirect_stdout
+
+from benchmarks.harness import (
+    PHASES,
+    benchmark_sources,
+    find_regressions,
+    long_expression,
+    time_phases,
+)
+from src.engines import ENGINES
+from src.frontend import parse_buffer
+
+
+class HarnessTests(unittest.TestCase):
+    def test__benchmarks__run_on_every_engine(self):
+        sources = benchmark_sources()
+        self.assertTrue(
+            {"fib", "nested_loops", "call_chain", "print_loop"} <= set(sources)
+        )
+        for engine in ENGINES:
+            with self.subTest(engine=engine):
+                output = io.StringIO()
+                with redirect_stdout(output):
+                    ENGINES[engine](parse_buffer(sources["call_chain"])).evaluate()
+                self.assertEqual(output.getvalue(), "278850\n")
+
+    def test__time_phases(self):
+        times = time_phases(long_expression(50), repeat=2)
+        self.assertEqual(tuple(times), PHASES)
+        self.assertTrue(all(seconds > 0 for seconds in times.values()))
+
+    def test__find_regressions(self):
+        baseline = {"fib": {"parse": 0.010, "evaluate": 1.0}}
+        results = {
+            "fib": {"parse": 0.0125, "evaluate": 1.5},
+            "new": {"parse": 9.0},
+        }
+        self.assertEqual(
+            find_regressions(baseline, results, threshold=0.2, min_seconds=0.01),
+            ["fib evaluate: 1.000000s -> 1.500000s"],
+        )
+        self.assertEqual(
+            len(find_regressions(baseline, results, threshold=0.2, min_seconds=0)), 2
+        )
+        self.assertEqual(find_regressions(baseline, results, threshold=0.6), [])
@@ -0,0 +1,104 @@
+import io
+import os
+import tempfile
+import unittest
+
+from unittest import mock
+
+from src import cache
+from src.frontend import parse, parse_buffer, parse_file, precompile
+from src.larac import decode_ast, encode_ast
+
+
+class LoadOrBuildTests(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        patcher = mock.patch.dict(os.environ, {"LARA_CACHE_DIR": self.directory.name})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(self.directory.cleanup)
+        self.builds = 0
+
+    def build(self):
+        self.builds += 1
+        return {"table": [1, 2, 3]}
+
+    def test__load_or_build__builds_once(self):
+        self.assertEqual(cache.load_or_build("test", self.build), {"table": [1, 2, 3]})
+        self.assertEqual(cache.load_or_build("test", self.build), {"table": [1, 2, 3]})
+        self.assertEqual(self.builds, 1)
+
+    def test__load_or_build__rebuilds_when_definitions_change(self):
+        cache.load_or_build("test", self.build)
+        with mock.patch.object(cache, "definitions_hash", return_value="changed"):
+            cache.load_or_build("test", self.build)
+        self.assertEqual(self.builds, 2)
+        self.assertEqual(
+            os.listdir(self.directory.name),
+            [f"test-{cache.checkout_hash()}-changed.pickle"],
+        )
+
+    def test__load_or_build__keeps_entries_of_others(self):
+        others = ["test-othercheckout-old.pickle", f"test-{cache.checkout_hash()}-old"]
+        others.append(f"test-{cache.checkout_hash()}-old.pickle.123.tmp")
+        for filename in others:
+            with open(os.path.join(self.directory.name, filename), "wb"):
+                pass
+        cache.load_or_build("test", self.build)
+        self.assertEqual(
+            sorted(os.listdir(self.directory.name)),
+            sorted(
+                others
+                + [f"test-{cache.checkout_hash()}-{cache.definitions_hash()}.pickle"]
+            ),
+        )
+
+    def test__load_or_build__rebuilds_corrupt_entry(self):
+        cache.load_or_build("test", self.build)
+        (filename,) = os.listdir(self.directory.name)
+        with open(os.path.join(self.directory.name, filename), "wb") as entry:
+            entry.write(b"not a pickle")
+        self.assertEqual(cache.load_or_build("test", self.build), {"table": [1, 2, 3]})
+        self.assertEqual(self.builds, 2)
+
+
+def ast_shape(ast):
+    return (ast.name, ast.lexme, [ast_shape(child) for child in ast.children])
+
+
+class CompiledProgramTests(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        patcher = mock.patch.dict(os.environ, {"LARA_CACHE_DIR": self.directory.name})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(self.directory.cleanup)
+
+    def test__encode_ast__round_trip(self):
+        source = "func f(a, b) { return a * (b - 1); } print(f(2, 3));"
+        ast = parse(io.StringIO(source))
+        self.assertEqual(ast_shape(decode_ast(encode_ast(ast))), ast_shape(ast))
+
+    def test__parse_file__reuses_compiled_program(self):
+        path = os.path.join(self.directory.name, "script.lr")
+        with open(path, "w") as script:
+            script.write("let a = 1; print(a + 1);")
+
+        self.assertEqual(precompile([self.directory.name]), 1)
+        with mock.patch("src.frontend.parse_buffer") as reparse:
+            ast = parse_file(path)
+        reparse.assert_not_called()
+        with open(path, "rb") as script:
+            self.assertEqual(ast_shape(ast), ast_shape(parse_buffer(script.read())))
+
+    def test__parse_file__replaces_older_versions(self):
+        path = os.path.join(self.directory.name, "script.lr")
+        other = os.path.join(self.directory.name, "other.lr")
+        for source in ("print(1);", "print(2);", "print(3);"):
+            for script_path in (path, other):
+                with open(script_path, "w") as script:
+                    script.write(source)
+                parse_file(script_path)
+        self.assertEqual(
+            len(os.listdir(os.path.join(self.directory.name, "programs"))), 2
+        )
@@ -0,0 +1,494 @@
+import io
+import os
+import unittest
+
+from contextlib import redirect_stdout
+from typing import List
+
+from src.bytecode import disassemble
+from src.engines import ENGINES
+from src.frontend import parse
+from src.eval import Evaluator
+from src.loops import CountedLoopAnalyzer
+from src.memo import MemoConfig
+from src.output import CaptureOutput, StreamOutput
+from src.purity import PurityAnalyzer
+from src.resolver import Resolver
+from src.vm import VirtualMachine
+
+PROGRAMS_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), "programs")
+
+
+def run(source: str, engine: str = "tree") -> List[str]:
+    output = io.StringIO()
+    with redirect_stdout(output):
+        ENGINES[engine](parse(io.StringIO(source))).evaluate()
+    return output.getvalue().split()
+
+
+class ScopeTests(unittest.TestCase):
+    def test__evaluate__closure(self):
+        source = """
+        func outer(a, b) {
+            let c = 1;
+            func inner(a, b) {
+                return a + b + c;
+            }
+            return inner(a, b);
+        }
+        print(outer(1, 1));
+        """
+        self.assertEqual(run(source), ["3"])
+
+    def test__evaluate__global_mutation(self):
+        source = """
+        let counter = 0;
+        func bump(n) {
+            counter = counter + n;
+        }
+        bump(2);
+        bump(3);
+        print(counter);
+        """
+        self.assertEqual(run(source), ["5"])
+
+    def test__evaluate__recursion(self):
+        source = """
+        func fib(n) {
+            if (n < 2) {
+                return n;
+            }
+            return fib(n - 1) + fib(n - 2);
+        }
+        print(fib(10));
+        """
+        self.assertEqual(run(source), ["55"])
+
+    def test__evaluate__call_to_later_function(self):
+        source = """
+        func even(n) {
+            if (n < 1) {
+                return 1;
+            }
+            return odd(n - 1);
+        }
+        func odd(n) {
+            if (n < 1) {
+                return 0;
+            }
+            return even(n - 1);
+        }
+        print(even(7));
+        """
+        self.assertEqual(run(source), ["0"])
+
+    def test__evaluate__scope_restored_after_call(self):
+        source = """
+        func f() {
+            print(1);
+        }
+        f();
+        let a = 2;
+        f();
+        print(a);
+        """
+        self.assertEqual(run(source), ["1", "1", "2"])
+
+
+class UninitializedTests(unittest.TestCase):
+    def assertUndefined(self, source: str, output: List[str], name: str) -> None:
+        for engine in ENGINES:
+            with self.subTest(engine=engine):
+                printed = io.StringIO()
+                with redirect_stdout(printed):
+                    with self.assertRaisesRegex(
+                        Exception, f"Use of undefined symbol {name}$"
+                    ):
+                        ENGINES[engine](parse(io.StringIO(source))).evaluate()
+                self.assertEqual(printed.getvalue().split(), output)
+
+    def test__evaluate__read_before_declaration(self):
+        source = """
+        func f() { return x; }
+        print(1);
+        print(f());
+        let x = 5;
+        """
+        self.assertUndefined(source, ["1"], "x")
+
+    def test__evaluate__declaration_skipped(self):
+        source = """
+        if (0) {
+            let y = 1;
+        }
+        print(y);
+        """
+        self.assertUndefined(source, [], "y")
+        source = """
+        let n = 0;
+        while (n < 0) {
+            let z = 1;
+            n = n + 1;
+        }
+        func g() { return z; }
+        print(g());
+        """
+        self.assertUndefined(source, [], "z")
+
+    def test__evaluate__call_before_definition(self):
+        source = """
+        func a() { return b(); }
+        print(a());
+        func b() { return 1; }
+        """
+        self.assertUndefined(source, [], "b")
+
+    def test__evaluate__initialized(self):
+        source = """
+        func f() { return x; }
+        func g(a, b) { return b; }
+        let x = 5;
+        print(f());
+        if (x > 1) {
+            let y = 1;
+            print(y);
+        } else {
+            let w = 2;
+        }
+        print(g(1));
+        """
+        for engine in ENGINES:
+            with self.subTest(engine=engine):
+                self.assertEqual(run(source, engine), ["5", "1", "None"])
+
+
+class ResolverErrorTests(unittest.TestCase):
+    def assertResolveError(self, source: str, message: str) -> None:
+        output = io.StringIO()
+        with redirect_stdout(output):
+            with self.assertRaisesRegex(Exception, message):
+                Evaluator(parse(io.StringIO(source))).evaluate()
+        # errors are reported before anything runs
+        self.assertEqual(output.getvalue(), "")
+
+    def test__resolve__undefined_symbol(self):
+        self.assertResolveError("print(1); print(a);", "Use of undefined symbol a")
+
+    def test__resolve__undefined_assignment(self):
+        self.assertResolveError("print(1); a = 1;", "Reference of undefined symbol a")
+
+    def test__resolve__duplicate_definition(self):
+        self.assertResolveError(
+            "print(1); let a = 1; let a = 2;", "Duplicate definition of symbol: a"
+        )
+
+    def test__resolve__undefined_in_uncalled_function(self):
+        self.assertResolveError(
+            "print(1); func f() { return b; }", "Use of undefined symbol b"
+        )
+
+    def test__resolve__return_outside_function(self):
+        self.assertResolveError("print(1); return 1;", "return outside of function")
+
+
+class VirtualMachineTests(unittest.TestCase):
+    def test__evaluate__deep_recursion(self):
+        source = """
+        func down(n) {
+            if (n < 1) {
+                return 0;
+            }
+            return 1 + down(n - 1);
+        }
+        print(down(20000));
+        """
+        self.assertEqual(run(source, "vm"), ["20000"])
+
+    def test__evaluate__tail_calls(self):
+        source = """
+        func count(n, total) {
+            if (n < 1) {
+                return total;
+            }
+            return count(n - 1, total + n);
+        }
+        print(count(100000, 0));
+        """
+        listing = disassemble(VirtualMachine(parse(io.StringIO(source))).main)
+        self.assertIn("TAIL_CALL", listing)
+        self.assertEqual(run(source, "vm"), ["5000050000"])
+
+    def test__evaluate__long_expression(self):
+        source = "print(" + " - ".join(str(i) for i in range(250)) + ");"
+        expected = 0
+        for i in reversed(range(250)):
+            expected = i - expected
+        self.assertEqual(run(source, "vm"), [str(expected)])
+
+    def test__disassemble__functions(self):
+        source = "func add(a, b) { return a + b; } print(add(1, 2));"
+        listing = disassemble(VirtualMachine(parse(io.StringIO(source))).main)
+        self.assertIn("add (params=2, frame=2):", listing)
+        self.assertIn("CALL          2", listing)
+        self.assertIn("ADD", listing)
+
+
+class MemoizationTests(unittest.TestCase):
+    def pure_functions(self, source: str) -> List[str]:
+        ast = parse(io.StringIO(source))
+        Resolver().resolve(ast)
+        PurityAnalyzer().analyze(ast)
+
+        pure = []
+        stack = [ast]
+        while stack:
+            node = stack.pop()
+            if node.name == "FUNCTION_DEF" and node.pure:
+                pure.append(node.children[1].lexme)
+            stack.extend(node.children)
+        return sorted(pure)
+
+    def test__analyze__purity(self):
+        source = """
+        let k = 3;
+        let g = 1;
+        let counter = 0;
+        func add_k(n) { return n + k; }
+        func add_g(n) { return n + g; }
+        func bump(n) { counter = counter + n; return counter; }
+        func noisy(n) { print(n); return n; }
+        func calls_noisy(n) { return noisy(n); }
+        func even(n) { if (n < 1) { return 1; } return odd(n - 1); }
+        func odd(n) { if (n < 1) { return 0; } return even(n - 1); }
+        func local_state(n) {
+            let total = 0;
+            func add(m) { total = total + m; }
+            add(n);
+            add(n);
+            return total;
+        }
+        g = 2;
+        """
+        self.assertEqual(
+            self.pure_functions(source), ["add_k", "even", "local_state", "odd"]
+        )
+
+    def test__analyze__purity__later_declaration(self):
+        source = """
+        let early = 1;
+        func reads_early() { return early; }
+        func reads_late() { return late; }
+        func outer() {
+            func inner() { return later; }
+            return inner();
+        }
+        let late = 2;
+        let later = 3;
+        """
+        self.assertEqual(self.pure_functions(source), ["reads_early"])
+
+    def test__evaluate__memoized_later_declaration(self):
+        source = """
+        func f() { return x; }
+        print(f());
+        let x = 5;
+        print(f());
+        """
+        # the first call fails as it does without memoization, rather than
+        # caching what x was before its declaration
+        for engine, evaluator_class in ENGINES.items():
+            with self.subTest(engine=engine):
+                evaluator = evaluator_class(
+                    parse(io.StringIO(source)), memo=MemoConfig()
+                )
+                with self.assertRaisesRegex(Exception, "Use of undefined symbol x"):
+                    evaluator.evaluate()
+
+    def test__evaluate__memoized_closures(self):
+        source = """
+        func counter() {
+            let count = 0;
+            func inc() {
+                count = count + 1;
+                return count;
+            }
+            return inc;
+        }
+        let a = counter();
+        let b = counter();
+        print(a());
+        print(a());
+        print(b());
+        """
+        self.assertEqual(self.pure_functions(source), [])
+        for engine, evaluator_class in ENGINES.items():
+            with self.subTest(engine=engine):
+                evaluator = evaluator_class(
+                    parse(io.StringIO(source)), memo=MemoConfig()
+                )
+                output = io.StringIO()
+                with redirect_stdout(output):
+                    evaluator.evaluate()
+                self.assertEqual(output.getvalue(), "1\n2\n1\n")
+
+    def test__evaluate__memoized_engines(self):
+        source = """
+        func fib(n) {
+            if (n < 2) {
+                return n;
+            }
+            return fib(n - 1) + fib(n - 2);
+        }
+        func noisy(n) { print(n); return n; }
+        print(fib(80));
+        print(noisy(1) + noisy(1));
+        """
+        for engine, evaluator_class in ENGINES.items():
+            for eviction in ("lru", "fifo"):
+                with self.subTest(engine=engine, eviction=eviction):
+                    evaluator = evaluator_class(
+                        parse(io.StringIO(source)), memo=MemoConfig(64, eviction)
+                    )
+                    output = io.StringIO()
+                    with redirect_stdout(output):
+                        evaluator.evaluate()
+
+                    self.assertEqual(
+                        output.getvalue().split(), ["23416728348467685", "1", "1", "2"]
+                    )
+                    self.assertEqual(evaluator.memoizer.stats(), {"fib": (78, 81, 64)})
+
+    def test__evaluate__memoized_tail_calls(self):
+        source = """
+        func count(n, total) {
+            if (n < 1) {
+                return total;
+            }
+            return count(n - 1, total + n);
+        }
+        print(count(10, 0));
+        print(count(10, 0));
+        """
+        for engine, evaluator_class in ENGINES.items():
+            with self.subTest(engine=engine):
+                evaluator = evaluator_class(
+                    parse(io.StringIO(source)), memo=MemoConfig(64)
+                )
+                output = io.StringIO()
+                with redirect_stdout(output):
+                    evaluator.evaluate()
+
+                self.assertEqual(output.getvalue().split(), ["55", "55"])
+                self.assertEqual(evaluator.memoizer.stats(), {"count": (1, 11, 11)})
+
+    def test__parse__memoize_pragma(self):
+        ast = parse(io.StringIO("#pragma memoize 16 fifo\nprint(1);\n"))
+        self.assertEqual(ast.pragmas, (("memoize", "16", "fifo"),))
+
+
+class CountedLoopTests(unittest.TestCase):
+    def counted_loops(self, source: str) -> List[bool]:
+        ast = parse(io.StringIO(source))
+        Resolver().resolve(ast)
+        CountedLoopAnalyzer().analyze(ast)
+
+        loops = []
+        stack = [ast]
+        while stack:
+            node = stack.pop()
+            if node.name == "FOR_BLOCK":
+                loops.append(node.counted is not None)
+            stack.extend(reversed(node.children))
+        return loops
+
+    def test__analyze__counted_loops(self):
+        source = """
+        let n = 10;
+        func bump() { n = n + 1; }
+        for (let a = 0; a < n; a = a + 1) { print(a); }
+        for (let b = n; b >= 0; b = b - 2) { print(b); }
+        for (let c = 0; c < n; c = c + 1) { c = c + 1; }
+        for (let d = 0; d < n; d = d + 1) { n = n - 1; }
+        for (let e = 0; e < n; e = e + 1) { bump(); }
+        for (let f = 0; f < n; f = f - 1) { break; }
+        for (let g = 0; g * 2 < n; g = g + 1) { print(g); }
+        for (let h = 1; h < n; h = h * 2) { print(h); }
+        """
+        self.assertEqual(
+            self.counted_loops(source),
+            [True, True, False, False, False, False, False, False],
+        )
+
+    def test__evaluate__counted_loops(self):
+        source = """
+        let total = 0;
+        for (let i = 0; i <= 10; i = i + 3) { total = total + i; }
+        print(total);
+        print(i);
+        for (let j = 5; j > 0; j = j - 1) {
+            if (j < 3) { break; }
+        }
+        print(j);
+        for (let k = 4; k < 2; k = k + 1) { print(k); }
+        print(k);
+        func first_over(limit) {
+            for (let m = 0; m < 100; m = m + 7) {
+                if (m > limit) { return m; }
+            }
+        }
+        print(first_over(30));
+        """
+        self.assertEqual(run(source), ["18", "12", "2", "4", "35"])
+
+
+class EngineTests(unittest.TestCase):
+    def test__evaluate__programs(self):
+        for filename in sorted(os.listdir(PROGRAMS_DIR)):
+            if not filename.endswith(".lr"):
+                continue
+            path = os.path.join(PROGRAMS_DIR, filename)
+            with open(path) as source:
+                program = source.read()
+            with open(path[: -len(".lr")] + ".out") as expected:
+                expected_output = expected.read().split()
+            for engine in ENGINES:
+                with self.subTest(program=filename, engine=engine):
+                    self.assertEqual(run(program, engine), expected_output)
+
+
+class OutputTests(unittest.TestCase):
+    source = """
+    func nothing() {
+        return;
+    }
+    for (let i = 0; i < 3; i = i + 1) {
+        print(i * 10);
+    }
+    print(nothing());
+    """
+
+    def test__evaluate__capture_output(self):
+        for engine, evaluator_class in ENGINES.items():
+            with self.subTest(engine=engine):
+                output = CaptureOutput()
+                ast = parse(io.StringIO(self.source))
+                evaluator_class(ast, output=output).evaluate()
+                self.assertEqual(output.values, [0, 10, 20, None])
+
+    def test__stream_output__buffering(self):
+        stream = io.BytesIO()
+        output = StreamOutput(stream, buffer_size=8)
+        for value in (1, 22, 333):
+            output.write(value)
+        # flushed once the buffer reached 8 bytes
+        self.assertEqual(stream.getvalue(), b"1\n22\n333\n")
+        output.write(4)
+        self.assertEqual(stream.getvalue(), b"1\n22\n333\n")
+        output.flush()
+        self.assertEqual(stream.getvalue(), b"1\n22\n333\n4\n")
+
+    def test__stream_output__line_buffered(self):
+        stream = io.BytesIO()
+        output = StreamOutput(stream, line_buffered=True)
+        output.write(-5)
+        self.assertEqual(stream.getvalue(), b"-5\n")
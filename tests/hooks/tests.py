@@ -0,0 +1,134 @@
+import unittest
+
+from src.coverage import Coverage, format_ranges, statement_lines
+from src.eval import Evaluator
+from src.frontend import parse_buffer
+from src.hooks import Hooks
+from src.nodes import FunctionDef
+from src.output import CaptureOutput
+from src.profiler import Profiler
+
+SOURCE = b"""
+func double(a) {
+    return a * 2;
+}
+for (let i = 0; i < 2; i = i + 1) {
+    print(double(i));
+}
+let j = 0;
+while (j < 3) {
+    j = j + 1;
+}
+"""
+
+
+class Recorder(Hooks):
+    def __init__(self):
+        self.events = []
+
+    def statement(self, ast):
+        self.events.append(("statement", ast.line))
+
+    def call(self, function, args):
+        self.events.append(("call", function.name, args))
+
+    def returned(self, function, value):
+        self.events.append(("returned", function.name, value))
+
+    def iteration(self, loop):
+        self.events.append(("iteration", loop.line))
+
+    def print(self, value):
+        self.events.append(("print", value))
+
+
+class Prints(Hooks):
+    def __init__(self):
+        self.values = []
+
+    def print(self, value):
+        self.values.append(value)
+
+
+def run(source: bytes, **options) -> Evaluator:
+    evaluator = Evaluator(parse_buffer(source), output=CaptureOutput(), **options)
+    evaluator.evaluate()
+    return evaluator
+
+
+class HooksTests(unittest.TestCase):
+    def test__events(self):
+        recorder = Recorder()
+        run(SOURCE, hooks=[recorder])
+        turn = [("iteration", 5), ("statement", 6), ("call", "double", [0])]
+        self.assertEqual(
+            recorder.events[:9],
+            [("statement", 2), ("statement", 5)]
+            + turn
+            + [("statement", 3), ("returned", "double", 0), ("print", 0)]
+            + [("iteration", 5)],
+        )
+        self.assertEqual(
+            [event for event in recorder.events if event[0] == "iteration"],
+            [("iteration", 5)] * 2 + [("iteration", 9)] * 3,
+        )
+        self.assertEqual(recorder.events[-2:], [("iteration", 9), ("statement", 10)])
+
+    def test__only_overridden_events(self):
+        prints = Prints()
+        evaluator = run(SOURCE, hooks=[prints])
+        self.assertEqual(prints.values, [0, 2])
+        self.assertNotIn("_evaluate_statement", vars(evaluator))
+        self.assertNotIn("function_type", vars(evaluator))
+
+    def test__no_hooks(self):
+        evaluator = run(SOURCE, hooks=[])
+        for name in ("_evaluate_statement", "_evaluate_statements", "function_type"):
+            self.assertNotIn(name, vars(evaluator))
+        self.assertIs(type(evaluator.output), CaptureOutput)
+
+    def test__with_profiler(self):
+        recorder = Recorder()
+        profiler = Profiler()
+        run(SOURCE, hooks=[recorder], profiler=profiler)
+        functions = [
+            entry for entry in profiler.entries if isinstance(entry, FunctionDef)
+        ]
+        self.assertEqual([function.name for function in functions], ["double"])
+        self.assertEqual(profiler.entries[functions[0]][0], 2)
+        self.assertEqual(
+            [event for event in recorder.events if event[0] == "returned"],
+            [("returned", "double", 0), ("returned", "double", 2)],
+        )
+
+
+class CoverageTests(unittest.TestCase):
+    def test__coverage(self):
+        source = b"""
+func unused() {
+    print(0);
+}
+let x = 1;
+if (x > 5) {
+    print(x);
+    print(x);
+}
+print(x);
+"""
+        ast = parse_buffer(source)
+        coverage = Coverage(statement_lines(ast))
+        run(source, hooks=[coverage])
+        self.assertEqual(coverage.lines, {2, 3, 5, 6, 7, 8, 10})
+        self.assertEqual(coverage.hits, {2: 1, 5: 1, 6: 1, 10: 1})
+        self.assertEqual(coverage.missed(), [3, 7, 8])
+        self.assertEqual(
+            coverage.format("test.lr"),
+            "test.lr: 4 of 7 lines, 57.1%, missed 3, 7-8",
+        )
+        lcov = coverage.format_lcov("/test.lr").splitlines()
+        self.assertEqual(lcov[:3], ["TN:", "SF:/test.lr", "DA:2,1"])
+        self.assertEqual(lcov[-3:], ["LH:4", "LF:7", "end_of_record"])
+
+    def test__format_ranges(self):
+        self.assertEqual(format_ranges([1, 2, 3, 7, 9, 10]), "1-3, 7, 9-10")
+        self.assertEqual(format_ranges([]), "")
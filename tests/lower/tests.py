@@ -0,0 +1,60 @@
+import io
+import unittest
+
+from contextlib import redirect_stdout
+
+from src.engines import ENGINES
+from src.frontend import parse
+from src.lower import lower
+from src.nodes import BinOp, Call, For, FunctionDef, Integer, Load, Print, Return
+
+
+def lower_source(source: str):
+    return lower(parse(io.StringIO(source)))
+
+
+class LoweringTests(unittest.TestCase):
+    def test__lower__operator_chains(self):
+        program = lower_source("let x = 1; print(x - 2 * 3 - (4 - 5));")
+        _, output = program.body
+        self.assertIsInstance(output, Print)
+
+        chain = output.value
+        self.assertIsInstance(chain, BinOp)
+        self.assertEqual(chain.operators, ["MINUS", "MINUS"])
+        x, product, group = chain.operands
+        self.assertEqual((x.name, x.depth, x.slot), ("x", 0, 0))
+        self.assertEqual(product.operators, ["MULTIPLY"])
+        self.assertEqual([operand.value for operand in product.operands], [2, 3])
+        self.assertEqual(group.operators, ["MINUS"])
+
+    def test__lower__functions_and_loops(self):
+        program = lower_source("""
+            func add(a, b) { return (add2(a, b)); }
+            func add2(a, b) { return a + b; }
+            for (let i = 0; i < 10; i = i + 2) { print(add(i, 1)); }
+            """)
+        add, _, loop = program.body
+        self.assertIsInstance(add, FunctionDef)
+        self.assertEqual(
+            (add.name, add.params, add.slot, add.frame_size), ("add", ["a", "b"], 0, 2)
+        )
+        (statement,) = add.body
+        self.assertIsInstance(statement, Return)
+        self.assertIsInstance(statement.value, Call)
+        self.assertEqual([type(arg) for arg in statement.value.args], [Load, Load])
+
+        self.assertIsInstance(loop, For)
+        self.assertEqual(loop.init.name, "i")
+        self.assertEqual(loop.counted.step, 2)
+        self.assertIsInstance(loop.counted.bound, Integer)
+        self.assertEqual(program.frame_size, 3)
+
+    def test__evaluate__long_chains(self):
+        source = "let x = 1; print(" + " - ".join(["x"] * 3000) + ");"
+        for engine in ("tree", "closure", "vm"):
+            with self.subTest(engine=engine):
+                output = io.StringIO()
+                with redirect_stdout(output):
+                    ENGINES[engine](parse(io.StringIO(source))).evaluate()
+                self.assertEqual(output.getvalue().split(), ["0"])
@@ -0,0 +1,72 @@
+import gc
+import json
+import unittest
+
+from src.eval import Evaluator
+from src.frontend import parse_buffer
+from src.memprofile import EvaluatorMemory, MemoryProfile
+from src.nodes import FunctionDef
+from src.output import CaptureOutput
+
+SOURCE = b"""
+func make(n) {
+    func add(a) {
+        return a + n;
+    }
+    return add(n);
+}
+for (let i = 0; i < 3; i = i + 1) {
+    print(make(i));
+}
+"""
+
+
+def profile(source: bytes) -> EvaluatorMemory:
+    memory = EvaluatorMemory()
+    # tracemalloc is running while MemoryProfile lives
+    stats = MemoryProfile()
+    stats.evaluation = memory
+    with stats.phase("evaluate"):
+        evaluator = Evaluator(
+            parse_buffer(source), output=CaptureOutput(), memory=memory
+        )
+        evaluator.evaluate()
+    gc.collect()
+    return memory
+
+
+class MemoryProfileTests(unittest.TestCase):
+    def test__live_objects(self):
+        memory = profile(SOURCE)
+        # the global scope and make stay. make's scope and the add defined in
+        # it refer to each other, so they only go once the collector runs
+        self.assertEqual(memory.live["scopes"][0], 1)
+        self.assertEqual(memory.live["functions"][0], 1)
+        self.assertGreaterEqual(memory.live["scopes"][1], 3)
+        self.assertGreaterEqual(memory.live["functions"][1], 2)
+        self.assertGreater(memory.live["scopes"][3], 0)
+
+    def test__entries(self):
+        memory = profile(SOURCE)
+        calls = {
+            entry.name if isinstance(entry, FunctionDef) else entry: stats[0]
+            for entry, stats in memory.entries.items()
+        }
+        self.assertEqual(
+            calls, {2: 1, 8: 1, 9: 3, "make": 3, 3: 3, 6: 3, "add": 3, 4: 3}
+        )
+        self.assertFalse(memory.stack)
+
+    def test__report(self):
+        stats = MemoryProfile()
+        stats.evaluation = EvaluatorMemory()
+        with stats.phase("allocate"):
+            data = [bytearray(1 << 16)]
+        report = json.loads(stats.format("json"))
+        (snapshot,) = report["snapshots"]
+        self.assertEqual(snapshot["phase"], "allocate")
+        self.assertGreaterEqual(snapshot["growth"][0]["bytes"], 1 << 16)
+        self.assertIn(__file__, snapshot["growth"][0]["site"])
+        self.assertEqual(report["evaluation"]["entries"], [])
+        self.assertIn("after allocate", stats.format("text"))
+        del data
@@ -0,0 +1,256 @@
+import glob
+import io
+import os
+import unittest
+
+from contextlib import redirect_stdout
+from typing import Iterable
+
+from src.engines import ENGINES
+from src.frontend import parse
+from src.optimizer import PASSES, Optimizer
+from src.unparse import unparse
+
+PROGRAMS_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), "programs")
+
+
+def optimize(source: str, passes: Iterable[str] = PASSES) -> str:
+    return unparse(Optimizer(passes).optimize(parse(io.StringIO(source))))
+
+
+class OptimizerTests(unittest.TestCase):
+    def test__optimize__constant_folding(self):
+        source = """
+        let x = 2 * (3 + 4);
+        print(x - 10 - 3);
+        print(10 / 5 - 2 < 1);
+        print(x / (4 - 4));
+        """
+        self.assertEqual(
+            optimize(source),
+            "let x = 14;\nprint(x - 7);\nprint(1);\nprint(x / 0);\n",
+        )
+
+    def test__optimize__prune_branches(self):
+        source = """
+        let x = 1;
+        if (0) {
+            print(1);
+        } elif (x) {
+            print(2);
+        } elif (1) {
+            print(3);
+        } else {
+            print(4);
+        }
+        if (1 < 2) {
+            print(5);
+        } else {
+            print(6);
+        }
+        while (0) {
+            print(7);
+        }
+        for (let i = 0; 0; i = i + 1) {
+            print(8);
+        }
+        """
+        self.assertEqual(
+            optimize(source),
+            "let x = 1;\n"
+            "if (x) {\n    print(2);\n} elif (1) {\n    print(3);\n}\n"
+            "print(5);\n"
+            "let i = 0;\n",
+        )
+
+    def test__optimize__dead_code(self):
+        source = """
+        func f() {
+            print(1);
+            return;
+            print(2);
+        }
+        while (1) {
+            break;
+            print(3);
+        }
+        """
+        self.assertEqual(
+            optimize(source),
+            "func f() {\n    print(1);\n    return;\n}\n"
+            "while (1) {\n    break;\n}\n",
+        )
+
+    def test__optimize__pass_toggles(self):
+        source = "if (1 + 1) { print(2 * 3); }"
+        self.assertEqual(optimize(source, ["fold"]), "if (2) {\n    print(6);\n}\n")
+        self.assertEqual(
+            optimize(source, ["prune"]), "if (1 + 1) {\n    print(2 * 3);\n}\n"
+        )
+        self.assertEqual(optimize(source, []), "if (1 + 1) {\n    print(2 * 3);\n}\n")
+
+    def test__optimize__pruned_declaration_keeps_slot(self):
+        source = "if (0) { let y = 1; } let z = 2; print(z);"
+        for engine, evaluator_class in ENGINES.items():
+            with self.subTest(engine=engine):
+                ast = Optimizer().optimize(parse(io.StringIO(source)))
+                output = io.StringIO()
+                with redirect_stdout(output):
+                    evaluator_class(ast).evaluate()
+                self.assertEqual(output.getvalue(), "2\n")
+
+    def test__evaluate__optimized_programs(self):
+        for path in sorted(glob.glob(os.path.join(PROGRAMS_DIR, "*.lr"))):
+            with open(path) as source:
+                program = source.read()
+            with open(path[: -len(".lr")] + ".out") as expected:
+                expected_output = expected.read()
+
+            for engine, evaluator_class in ENGINES.items():
+                with self.subTest(program=os.path.basename(path), engine=engine):
+                    ast = Optimizer().optimize(parse(io.StringIO(program)))
+                    output = io.StringIO()
+                    with redirect_stdout(output):
+                        evaluator_class(ast).evaluate()
+                    self.assertEqual(output.getvalue(), expected_output)
+
+
+class LoopOptimizerTests(unittest.TestCase):
+    def test__optimize__hoists_invariants(self):
+        source = """
+        let n = 5;
+        let total = 0;
+        let j = 0;
+        while (j < n - 1) {
+            total = total + (n + 1) * 2;
+            j = j + 1;
+        }
+        """
+        self.assertEqual(
+            optimize(source, ["licm"]),
+            "let n = 5;\nlet total = 0;\nlet j = 0;\n"
+            "if (j < n - 1) {\n"
+            "    let invariant0 = n - 1;\n    let invariant1 = (n + 1) * 2;\n}\n"
+            "while (j < invariant0) {\n"
+            "    total = total + invariant1;\n    j = j + 1;\n}\n",
+        )
+
+    def test__optimize__calls_block_hoisting(self):
+        source = """
+        let c = 0;
+        func bump() {
+            c = c + 1;
+            return c;
+        }
+        let acc = 0;
+        for (let i = 0; i < 3; i = i + 1) {
+            acc = acc + bump() + c * 10;
+        }
+        """
+        self.assertNotIn("invariant", optimize(source, ["licm"]))
+
+    def test__optimize__strength_reduction(self):
+        source = """
+        let s = 0;
+        for (let i = 10; i > 0; i = i - 2) {
+            s = s + 7 * i;
+        }
+        """
+        self.assertEqual(
+            optimize(source, ["strength-reduction"]),
+            "let s = 0;\nlet induction0 = 70;\n"
+            "for (let i = 10; i > 0; i = i - 2) {\n"
+            "    s = s + induction0;\n    induction0 = induction0 - 14;\n}\n",
+        )
+
+    def test__optimize__assigned_induction_variable(self):
+        source = """
+        for (let i = 0; i < 3; i = i + 1) {
+            i = i + 1;
+            print(i * 2);
+        }
+        """
+        self.assertNotIn("induction", optimize(source, ["strength-reduction"]))
+
+    def test__optimize__conditional_code_not_hoisted(self):
+        source = """
+        let n = 5;
+        for (let i = 0; i < 3; i = i + 1) {
+            if (i > 5) {
+                print(n * 2 + i * n);
+            }
+        }
+        """
+        optimized = optimize(source)
+        self.assertNotIn("invariant", optimized)
+        self.assertNotIn("induction", optimized)
+
+    def test__evaluate__loops_that_never_run(self):
+        programs = [
+            """
+            let i = 0;
+            while (i < 0) {
+                print(x + 1);
+                i = i + 1;
+            }
+            """,
+            """
+            for (let i = 2; i < 0; i = i + 1) {
+                print(i * x);
+            }
+            """,
+            """
+            for (let i = 0; i < 3; i = i + 1) {
+                if (i > 5) {
+                    print(x + 1);
+                }
+                if (i > 5) {
+                    print(i * x);
+                }
+            }
+            """,
+            """
+            let i = 0;
+            while (i < 3) {
+                i = i + 1;
+                if (i > 0) {
+                    break;
+                }
+                print(i * 2 + 1);
+                print(x * 2);
+            }
+            """,
+        ]
+        for program in programs:
+            source = "func nothing() { return; }\nlet x = nothing();\n"
+            source += program + "print(7);\n"
+            for engine, evaluator_class in ENGINES.items():
+                with self.subTest(program=program, engine=engine):
+                    ast = Optimizer().optimize(parse(io.StringIO(source)))
+                    output = io.StringIO()
+                    with redirect_stdout(output):
+                        evaluator_class(ast).evaluate()
+                    self.assertEqual(output.getvalue().split()[-1], "7")
+
+    def test__evaluate__loop_variable_after_loop_that_never_runs(self):
+        source = """
+        func f(a, n, k) {
+            let s = 0;
+            for (let i = a; i < n; i = i + 1) {
+                s = s + i * k;
+            }
+            print(i);
+            return s;
+        }
+        print(f(5, 3, 2));
+        print(f(1, 3, 2));
+        """
+        optimized = optimize(source)
+        for program in (source, optimized):
+            for engine, evaluator_class in ENGINES.items():
+                with self.subTest(program=program, engine=engine):
+                    ast = Optimizer().optimize(parse(io.StringIO(program)))
+                    output = io.StringIO()
+                    with redirect_stdout(output):
+                        evaluator_class(ast).evaluate()
+                    self.assertEqual(output.getvalue(), "5\n0\n3\n6\n")
@@ -1,16 +1,25 @@
+import glob
+import os
+import tempfile
 import unittest
 
-from typing import List, Dict
+from typing import Dict, Iterable
 
 from langtools.lexer.token import Token
 from langtools.parser.cfg import CFG
 from langtools.ast.ast import ASTNode
 
+from src import generated_parser, parsegen
 from src.config.tokens import *
 from src.config.parser import PRODUCTION_RULES, START
+from src.frontend import lex, parse_buffer, parse_file, split_pragmas
+from src.spans import lex_file, lex_spans, mapped_file, shard_bounds
 
+PROGRAMS_DIR = os.path.join(os.path.dirname(__file__), "..", "programs")
 
-def parse(tokens: List[Token]) -> ASTNode:
+
+def parse(tokens: Iterable[Token]) -> ASTNode:
+    tokens = list(tokens)
     lara_grammar = CFG(
         production_rules=PRODUCTION_RULES,
         alphabet=[chr(i) for i in range(128)],
@@ -28,9 +37,17 @@ def parse(tokens: List[Token]) -> ASTNode:
             # "EXPRESSION": {"TERM_OPERATOR"},
         }
     )
+    # the generated parser must build the same tree without a flatten pass
+    generated = generated_parser.parse(tokens)
+    if shape(generated) != shape(ast):
+        raise AssertionError("generated parser built a different tree")
     return ast
 
 
+def shape(ast: ASTNode) -> tuple:
+    return (ast.name, ast.lexme, [shape(child) for child in ast.children])
+
+
 def compare_ast(ast1: ASTNode, ast2: ASTNode) -> bool:
     if ast1.name != ast2.name:
         print(f"{ast1.name} != {ast2.name}")
@@ -318,3 +335,94 @@ class IOTests(unittest.TestCase):
             SemiColonToken,
         ]
         ast = parse(tokens)
+
+
+class GeneratedParserTests(unittest.TestCase):
+    def test__generated_parser__up_to_date(self):
+        with open(parsegen.GENERATED_FILE) as generated:
+            self.assertEqual(generated.read(), parsegen.generate())
+
+    def test__generated_parser__long_chain(self):
+        tokens = [PrintToken, LeftParenToken, IntegerToken]
+        for _ in range(3000):
+            tokens += [MinusToken, IntegerToken]
+        tokens += [RightParenToken, SemiColonToken]
+
+        ast = generated_parser.parse(tokens)
+        expression = ast.children[1].children[0].children[0].children[0].children[2]
+        self.assertEqual(expression.name, "EXPRESSION")
+
+    def test__generated_parser__syntax_error(self):
+        with self.assertRaisesRegex(Exception, "expected SEMI_COLON"):
+            generated_parser.parse(
+                [PrintToken, LeftParenToken, IntegerToken, RightParenToken]
+            )
+
+    def test__generated_parser__programs(self):
+        for path in sorted(glob.glob(os.path.join(PROGRAMS_DIR, "*.lr"))):
+            with open(path) as source:
+                _, text = split_pragmas(source.read())
+            # compares the two parsers' trees
+            parse(lex(text))
+
+
+class LexerTests(unittest.TestCase):
+    def test__lex__keywords(self):
+        tokens = lex("if iffy elif else_ while for func return break print let")
+        self.assertEqual(
+            [token.name for token in tokens],
+            ["IF", "IDENTIFIER", "ELIF", "IDENTIFIER", "WHILE", "FOR", "FUNC"]
+            + ["RETURN", "BREAK", "PRINT", "LET"],
+        )
+        self.assertEqual(tokens[1].lexme, "iffy")
+
+    def test__lex__interned_identifiers(self):
+        first, second = lex("count count")
+        self.assertIs(first.lexme, second.lexme)
+
+
+class SpanLexerTests(unittest.TestCase):
+    def test__lex_spans__same_tokens(self):
+        for path in sorted(glob.glob(os.path.join(PROGRAMS_DIR, "*.lr"))):
+            with open(path) as source:
+                _, text = split_pragmas(source.read())
+            spans = lex_spans(text.encode())
+            tokens = lex(text)
+            self.assertEqual(spans.kind_names(), [token.name for token in tokens])
+
+    def test__lex_spans__lexmes(self):
+        spans = lex_spans(b"let count = 12;")
+        self.assertEqual(
+            [spans.lexme(i) for i in range(len(spans))],
+            [None, "count", None, "12", None],
+        )
+        self.assertEqual((spans.starts[1], spans.ends[1]), (4, 9))
+
+    def test__parse_file__mapped(self):
+        path = os.path.join(PROGRAMS_DIR, "fib.lr")
+        expected = parse_file(path)
+        ast = parse_file(path, mapped=True)
+        self.assertTrue(compare_ast(ast, expected))
+        self.assertEqual(ast.pragmas, expected.pragmas)
+
+    def test__parse_buffer__pragmas(self):
+        ast = parse_buffer(b"\n#pragma memoize 16 fifo\nprint(1);")
+        self.assertEqual(ast.pragmas, (("memoize", "16", "fifo"),))
+
+    def test__lex_file__parallel(self):
+        with open(os.path.join(PROGRAMS_DIR, "readme.lr"), "rb") as source:
+            text = source.read() * 20
+        with tempfile.NamedTemporaryFile(suffix=".lr") as script:
+            script.write(text)
+            script.flush()
+            with mapped_file(script.name) as mapped:
+                bounds = shard_bounds(mapped, 3)
+                parallel = lex_file(script.name, mapped, jobs=3, threshold=0)
+                sequential = lex_spans(mapped)
+
+        self.assertEqual(len(bounds), 3)
+        for _, end in bounds[:-1]:
+            self.assertEqual(text[end - 1 : end], b";")
+        self.assertEqual(parallel.kinds, sequential.kinds)
+        self.assertEqual(parallel.starts, sequential.starts)
+        self.assertEqual(parallel.ends, sequential.ends)
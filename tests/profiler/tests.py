@@ -0,0 +1,71 @@
+import itertools
+import unittest
+
+from src.eval import Evaluator
+from src.frontend import parse_buffer
+from src.output import CaptureOutput
+from src.profiler import Profiler, entry_label
+
+SOURCE = b"""#pragma memoize
+func fact(n) {
+    if (n < 2) {
+        return 1;
+    }
+    return n * fact(n - 1);
+}
+print(fact(3));
+"""
+
+
+def profile(source: bytes) -> Profiler:
+    # every reading of the clock is one second after the last
+    profiler = Profiler(clock=itertools.count().__next__)
+    Evaluator(
+        parse_buffer(source), output=CaptureOutput(), profiler=profiler
+    ).evaluate()
+    return profiler
+
+
+class ProfilerTests(unittest.TestCase):
+    def test__profile__lines_and_calls(self):
+        profiler = profile(SOURCE)
+        calls = {
+            entry_label(entry): stats[0] for entry, stats in profiler.entries.items()
+        }
+        self.assertEqual(
+            calls,
+            {
+                "line 2": 1,
+                "line 8": 1,
+                "fact() line 2": 3,
+                "line 3": 3,
+                "line 4": 1,
+                "line 6": 2,
+            },
+        )
+
+    def test__profile__times_add_up(self):
+        entries = {
+            entry_label(entry): stats
+            for entry, stats in profile(SOURCE).entries.items()
+        }
+        # nothing is counted twice
+        self.assertEqual(
+            sum(stats[2] for stats in entries.values()),
+            entries["line 2"][1] + entries["line 8"][1],
+        )
+        # the outermost call covers the recursive ones
+        self.assertLess(entries["fact() line 2"][1], entries["line 8"][1])
+        self.assertLess(entries["fact() line 2"][2], entries["fact() line 2"][1])
+
+    def test__profile__stacks(self):
+        stacks = dict(
+            line.rsplit(" ", 1) for line in profile(SOURCE).format_stacks().splitlines()
+        )
+        self.assertIn("line 8;fact() line 2;line 6;fact() line 2;line 3", stacks)
+        self.assertTrue(all(time.isdigit() for time in stacks.values()))
+
+    def test__profile__table(self):
+        table = profile(SOURCE).format_table(limit=2).splitlines()
+        self.assertEqual(len(table), 3)
+        self.assertTrue(table[1].endswith("line 8"))
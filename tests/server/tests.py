@@ -0,0 +1,101 @@
+import io
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import unittest
+
+from typing import Tuple
+from unittest import mock
+
+from src import client
+from src.client import private_directory, run_remote
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+LARA = os.path.join(ROOT_DIR, "lara")
+
+
+class ServerTests(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.directory = tempfile.TemporaryDirectory()
+        cls.socket_path = os.path.join(cls.directory.name, "lara.sock")
+        cls.server = subprocess.Popen(
+            [sys.executable, LARA, "serve", "--socket", cls.socket_path]
+            + ["--workers", "2", "--timeout", "1"],
+            stderr=subprocess.DEVNULL,
+        )
+        for _ in range(200):
+            if os.path.exists(cls.socket_path):
+                break
+            time.sleep(0.05)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.terminate()
+        cls.server.wait()
+        cls.directory.cleanup()
+
+    def run_remote(self, source: str, engine: str = "tree") -> Tuple[int, str, str]:
+        stdout = io.BytesIO()
+        stderr = io.BytesIO()
+        status = run_remote(
+            self.socket_path, source, engine, stdout=stdout, stderr=stderr
+        )
+        return status, stdout.getvalue().decode(), stderr.getvalue().decode()
+
+    def test__serve__engines(self):
+        source = """
+        func double(a) { return a + a; }
+        for (let i = 0; i < 3; i = i + 1) { print(double(i)); }
+        """
+        for engine in ["tree", "closure", "vm", "python"]:
+            with self.subTest(engine=engine):
+                self.assertEqual(self.run_remote(source, engine), (0, "0\n2\n4\n", ""))
+
+    def test__serve__error(self):
+        status, stdout, stderr = self.run_remote("print(1); print(y);")
+        self.assertEqual(status, 1)
+        self.assertIn("undefined symbol y", stderr)
+        self.assertEqual(
+            self.run_remote("print(1);", "fast"), (1, "", "Unknown engine: fast\n")
+        )
+
+    def test__serve__timeout(self):
+        status, _, stderr = self.run_remote("let i = 0; while (1) { i = i + 1; }")
+        self.assertEqual((status, stderr), (1, "Timed out after 1s\n"))
+        # the worker carries on
+        self.assertEqual(self.run_remote("print(7);"), (0, "7\n", ""))
+
+    def test__serve__timeout_while_printing(self):
+        source = "let i = 0; while (1) { print(i); i = i + 1; }"
+        status, stdout, stderr = self.run_remote(source)
+        self.assertEqual((status, stderr), (1, "Timed out after 1s\n"))
+        # only whole frames arrived, so the output is whole lines from 0 up
+        lines = stdout.splitlines()
+        self.assertEqual(lines, [str(i) for i in range(len(lines))])
+
+
+class PrivateDirectoryTests(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        self.fallback = os.path.join(self.directory.name, "lara")
+        patcher = mock.patch.object(client, "FALLBACK_DIR", self.fallback)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test__private_directory__created(self):
+        private_directory(os.path.join(self.fallback, "lara.sock"))
+        self.assertEqual(os.stat(self.fallback).st_mode & 0o777, 0o700)
+
+    def test__private_directory__shared(self):
+        os.mkdir(self.fallback, 0o755)
+        os.chmod(self.fallback, 0o755)
+        with self.assertRaisesRegex(Exception, "only you can access"):
+            private_directory(os.path.join(self.fallback, "lara.sock"))
+
+    def test__private_directory__other_paths(self):
+        private_directory(os.path.join(self.directory.name, "lara.sock"))
+        self.assertFalse(os.path.exists(self.fallback))
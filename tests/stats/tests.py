@@ -0,0 +1,87 @@
+import json
+import unittest
+
+from src.eval import Evaluator
+from src.frontend import parse_buffer
+from src.memo import MemoConfig
+from src.output import CaptureOutput
+from src.stats import EvaluatorCounters, Stats, tree_size
+
+SOURCE = b"""
+let base = 10;
+func add(a) { return a + base; }
+for (let i = 0; i < 3; i = i + 1) { print(add(i)); }
+"""
+
+
+def count(source: bytes, memo=None) -> EvaluatorCounters:
+    counters = EvaluatorCounters()
+    evaluator = Evaluator(
+        parse_buffer(source), memo=memo, output=CaptureOutput(), counters=counters
+    )
+    evaluator.evaluate()
+    hits = 0
+    if evaluator.memoizer is not None:
+        hits = sum(hits for hits, _, _ in evaluator.memoizer.stats().values())
+    return counters.counters(hits)
+
+
+class StatsTests(unittest.TestCase):
+    def test__parse_buffer__phases(self):
+        stats = Stats()
+        ast = parse_buffer(SOURCE, stats=stats)
+        self.assertEqual(
+            [name for name, _, _ in stats.phases], ["lexer-tables", "lex", "parse"]
+        )
+        self.assertEqual(stats.counters, {"tokens": 44})
+        nodes, depth = tree_size(ast)
+        self.assertGreater(nodes, 44)
+        self.assertGreater(depth, 10)
+
+    def test__stats__memory(self):
+        stats = Stats(trace_memory=True)
+        with stats.phase("allocate"):
+            data = [bytearray(1 << 16)]
+        ((name, seconds, peak),) = stats.phases
+        self.assertGreaterEqual(peak, 1 << 16)
+        del data
+
+    def test__stats__formats(self):
+        stats = Stats()
+        stats.add_phase("lex", 0.5)
+        stats.count("tokens", 3)
+        stats.count("scope_depths", {0: 2, 1: 1})
+        self.assertEqual(
+            json.loads(stats.format("json")),
+            {
+                "phases": [{"name": "lex", "seconds": 0.5, "peak_bytes": None}],
+                "total_seconds": 0.5,
+                "counters": {"tokens": 3, "scope_depths": {"0": 2, "1": 1}},
+            },
+        )
+        self.assertEqual(
+            stats.format("text").splitlines()[1:],
+            [
+                "lex                 0.500000s              -",
+                "total               0.500000s",
+                "tokens           3",
+                "scope depths     0: 2  1: 1",
+            ],
+        )
+
+    def test__counters(self):
+        # let, func, for, then a print and a return on each of 3 turns. Each
+        # turn loads i and a and calls add in the current scope, and loads
+        # base one scope up
+        self.assertEqual(
+            count(SOURCE),
+            {
+                "statements": 9,
+                "calls": 3,
+                "scopes": 4,
+                "scope_depths": {0: 9, 1: 3},
+            },
+        )
+        # a memo hit needs no scope
+        source = b"func one() { return 1; } print(one()); print(one());"
+        self.assertEqual(count(source, MemoConfig())["scopes"], 3 - 1)
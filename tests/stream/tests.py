@@ -0,0 +1,85 @@
+import glob
+import io
+import os
+import unittest
+
+from contextlib import redirect_stdout
+from typing import List
+
+from src.stream import StreamingEvaluator, top_level_statements
+
+PROGRAMS_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), "programs")
+
+
+def run(source: str) -> List[str]:
+    output = io.StringIO()
+    with redirect_stdout(output):
+        StreamingEvaluator(source.encode()).evaluate()
+    return output.getvalue().split()
+
+
+class StatementSplitTests(unittest.TestCase):
+    def test__top_level_statements__blocks(self):
+        source = b"""
+        let x = 1;
+        if (x) { print(1); } elif (x) { print(2); } else { print(3); }
+        for (let i = 0; i < 2; i = i + 1) { print(i); }
+        func f() { return 1; }
+        print(f());
+        """
+        statements = list(top_level_statements(source))
+        self.assertEqual(
+            [spans.kind_names()[0] for spans in statements],
+            ["LET", "IF", "FOR", "FUNC", "PRINT"],
+        )
+        self.assertEqual(statements[1].kind_names().count("ELSE"), 1)
+
+
+class StreamingTests(unittest.TestCase):
+    def test__stream__programs(self):
+        for path in sorted(glob.glob(os.path.join(PROGRAMS_DIR, "*.lr"))):
+            with open(path) as source, open(path[:-3] + ".out") as expected:
+                self.assertEqual(run(source.read()), expected.read().split(), path)
+
+    def test__stream__functions_defined_together(self):
+        source = """
+        func even(n) {
+            if (n < 1) {
+                return 1;
+            }
+            return odd(n - 1);
+        }
+        func odd(n) {
+            if (n < 1) {
+                return 0;
+            }
+            return even(n - 1);
+        }
+        print(even(10));
+        """
+        self.assertEqual(run(source), ["1"])
+
+    def test__stream__forward_call(self):
+        source = """
+        main();
+        func main() {
+            print(1);
+        }
+        """
+        with self.assertRaisesRegex(Exception, "undefined symbol main.*streaming"):
+            run(source)
+
+    def test__stream__loop_sees_earlier_function_writes(self):
+        source = """
+        let c = 0;
+        func bump() {
+            c = c + 1;
+            return c;
+        }
+        let acc = 0;
+        for (let a = 0; a < 3; a = a + 1) {
+            acc = acc + bump() + a * c;
+        }
+        print(acc);
+        """
+        self.assertEqual(run(source), ["14"])